@@ -0,0 +1,93 @@
+"""Closed-loop tracking benchmark: every flight script against every scenario.
+
+    python bench_tracking.py --out results.json
+    python bench_tracking.py --scripts practica1.py --scenarios yaw_offset far -- --profile gains.json
+
+Each run is `SCRIPT --headless --replay synthetic:SCENARIO --replay-fast`
+in its own process, so the script's own detection, estimator and control
+law fly the simulated drone (fake_tello.SyntheticTello). Arguments after
+`--` are passed to every script (profiles, --roi, --engine ...). Results
+are one JSON document; compare two of them to spot regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from scenarios import SCENARIOS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ('practica1.py', 'practica2.py')
+COLUMNS = ('detected_fraction', 'locked_fraction', 'time_to_center_s', 'steady_error_x', 'steady_error_y', 'overshoot_x', 'overshoot_y',
+           'commands_per_s', 'cpu_ms_per_frame', 'loop_ms_p95', 'vision_ms_mean', 'vision_ms_p95')
+
+
+def run(script, scenario, extra, timeout):
+    """One headless, as-fast-as-possible closed-loop run; the script's metrics or an error."""
+    handle, path = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    # scripts are looked up next to this file, whatever the working directory
+    command = [sys.executable, os.path.join(HERE, script), '--headless', '--replay', f'synthetic:{scenario}',
+               '--replay-fast', '--bench-out', path] + extra
+    try:
+        done = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=timeout)
+        with open(path) as f:
+            text = f.read()
+        if done.returncode or not text:
+            return {'error': (done.stderr or done.stdout).strip().splitlines()[-1:] or ['no results']}
+        return json.loads(text)
+    except subprocess.TimeoutExpired:
+        return {'error': [f'timed out after {timeout} s']}
+    finally:
+        os.remove(path)
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Closed-loop synthetic-scene tracking benchmark.')
+    parser.add_argument('--scripts', nargs='+', default=list(SCRIPTS), help='flight scripts to compare')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS),
+                        help='scenarios to fly (default: all)')
+    parser.add_argument('--out', help='write the results JSON here (default: stdout only)')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds per run (default 300)')
+    parser.add_argument('extra', nargs=argparse.REMAINDER, help='-- then arguments for every script')
+    args = parser.parse_args()
+    extra = args.extra[1:] if args.extra[:1] == ['--'] else args.extra
+
+    runs = []
+    for script in args.scripts:
+        for scenario in args.scenarios:
+            result = run(script, scenario, extra, args.timeout)
+            runs.append({'script': script, 'scenario': scenario, **result})
+            summary = ', '.join(f"{key}={result[key]}" for key in COLUMNS if key in result)
+            print(f"{script:16} {scenario:14} {summary or result.get('error')}")
+
+    report = {
+        'revision': revision(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'extra_args': extra,
+        'runs': runs,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results in {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
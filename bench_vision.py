@@ -0,0 +1,254 @@
+"""Per-stage timing of the HSV vision pipeline, to see where the milliseconds go.
+
+    python bench_vision.py                                  # synthetic corpus, all sizes
+    python bench_vision.py --frames recordings/20261018-101500 --sizes 650x500 --repeat 20
+    python bench_vision.py --save-corpus corpus/            # store the synthetic frames as PNG
+
+Three groups are timed on every corpus frame at every size:
+
+  pipeline  each stage of vision.make_pipeline, as the flight scripts run it
+  legacy    the per-frame path of color_filter.py: BGR2RGB + BGR2HSV, 15x15
+            GaussianBlur, inRange, erode/dilate, findContours with
+            CHAIN_APPROX_NONE and CHAIN_APPROX_SIMPLE, and its contour
+            statistics (contourArea, arcLength, approxPolyDP, boundingRect)
+  hud       the scripts' guides and labels drawn per frame vs hud.Hud
+
+The synthetic corpus is a green ball covering a fixed share of the frame
+(mask density), at several positions. Stored corpora are image
+directories, video files or --record sessions, taken as drone (RGB) frames.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from hud import Hud
+from params import load_hsv_range
+from tello_sim import SyntheticScene
+from vision import BufferPool, VisionContext, make_pipeline
+
+SIZES = ('960x720', '650x500', '325x250', '162x125')
+DENSITIES = (0.0, 0.01, 0.05, 0.2, 0.5)
+# practica2.py / color_tracking.py start values for green
+DEFAULT_RANGE = ((40, 55, 30), (110, 192, 214))
+IMAGE_TYPES = ('*.png', '*.jpg', '*.jpeg', '*.bmp')
+
+
+def synthetic_corpus(density, count=16):
+    """`count` frames with the ball covering `density` of the frame, moving along a loop."""
+    scene = SyntheticScene()
+    width, height = scene.size
+    radius = int(math.sqrt(density * width * height / math.pi))
+    frames = []
+    for i in range(count):
+        image = scene.background.copy()
+        if radius:
+            angle = 2 * math.pi * i / count
+            x = int(width / 2 + (width / 2 - radius) * 0.8 * math.cos(angle))
+            y = int(height / 2 + max(height / 2 - radius, 0) * 0.8 * math.sin(2 * angle))
+            cv2.circle(image, (x, y), radius, scene.color, -1)
+        frames.append(image)
+    return frames
+
+
+def load_frames(path, limit):
+    """RGB frames from an image directory, a video file or a --record session."""
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, 'video.mp4')):
+        path = os.path.join(path, 'video.mp4')
+    frames = []
+    if os.path.isdir(path):
+        files = sorted(f for pattern in IMAGE_TYPES for f in glob.glob(os.path.join(path, pattern)))
+        for name in files[:limit]:
+            image = cv2.imread(name)
+            if image is not None:
+                frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    else:
+        capture = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ok, image = capture.read()
+            if not ok:
+                break
+            frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        capture.release()
+    if not frames:
+        raise IOError(f"No frames in {path}")
+    return frames
+
+
+def summary(samples):
+    ms = 1000 * np.asarray(samples)
+    mean = float(ms.mean())
+    return {
+        'mean_ms': round(mean, 4),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'fps': round(1000 / mean, 1) if mean > 0 else None,
+    }
+
+
+class Bench:
+    """Times every group on one display size; `run(frame)` does one pass."""
+
+    def __init__(self, width, height, lower, upper):
+        self.size = (width, height)
+        self.lower = np.array(lower)
+        self.upper = np.array(upper)
+        self.pipeline = make_pipeline(width, height, lower, upper, pool=BufferPool())
+        self.samples = defaultdict(list)     # (group, name) -> seconds
+        self.density = []
+
+        # the flight scripts' dead-zone and labels
+        tx, ty = int(0.15 * width), int(0.15 * height)
+        self.guides = [
+            (cv2.rectangle, (width // 2 - tx, height // 2 - ty), (width // 2 + tx, height // 2 + ty), (0, 0, 255)),
+            (cv2.line, (width // 2 - tx, 0), (width // 2 - tx, height), (255, 0, 0)),
+            (cv2.line, (width // 2 + tx, 0), (width // 2 + tx, height), (255, 0, 0)),
+            (cv2.line, (0, height // 2 - ty), (width, height // 2 - ty), (255, 0, 0)),
+            (cv2.line, (0, height // 2 + ty), (width, height // 2 + ty), (255, 0, 0)),
+        ]
+        self.labels = [('Rotate', (10, 30)), ('Up', (10, 60)), ('Battery: 87%', (10, height - 10))]
+        self.hud = Hud()
+        for draw, pt1, pt2, color in self.guides:
+            (self.hud.rectangle if draw is cv2.rectangle else self.hud.line)(pt1, pt2, color, 2)
+        for text, org in self.labels:
+            self.hud.text(text, text, org, (255, 0, 0))
+        self.canvas = np.empty((height, width, 3), np.uint8)
+
+    def _time(self, group, name, start):
+        now = time.perf_counter()
+        self.samples[group, name].append(now - start)
+        return now
+
+    def run(self, image, record=True):
+        if not record:
+            saved, self.samples = self.samples, defaultdict(list)
+        self._pipeline(image)
+        frame = self._legacy(image)
+        self._hud(frame)
+        if not record:
+            self.samples = saved
+
+    def _pipeline(self, image):
+        ctx = VisionContext(image, self.pipeline.pool)
+        total = time.perf_counter()
+        for stage in self.pipeline.stages:
+            start = time.perf_counter()
+            stage(ctx)
+            self._time('pipeline', stage.name, start)
+        self._time('pipeline', 'total', total)
+        self.density.append(np.count_nonzero(ctx.mask) / ctx.mask.size)
+
+    def _legacy(self, image):
+        total = start = time.perf_counter()
+        frame = cv2.resize(image, self.size)
+        start = self._time('legacy', 'resize', start)
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        start = self._time('legacy', 'bgr2rgb', start)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        start = self._time('legacy', 'bgr2hsv', start)
+        blurred = cv2.GaussianBlur(hsv, (15, 15), 0)
+        start = self._time('legacy', 'blur15', start)
+        mask = cv2.inRange(blurred, self.lower, self.upper)
+        start = self._time('legacy', 'inrange', start)
+        mask = cv2.erode(mask, None, iterations=2)
+        mask = cv2.dilate(mask, None, iterations=2)
+        start = self._time('legacy', 'erode_dilate', start)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        start = self._time('legacy', 'contours_none', start)
+        for contour in contours:
+            cv2.contourArea(contour)
+            perimeter = cv2.arcLength(contour, True)
+            cv2.boundingRect(cv2.approxPolyDP(contour, 0.02 * perimeter, True))
+        self._time('legacy', 'contour_stats', start)
+        self._time('legacy', 'total', total)
+        # the compressed-outline variant on the same mask, not part of the total
+        start = time.perf_counter()
+        cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        self._time('legacy', 'contours_simple', start)
+        return frame
+
+    def _hud(self, frame):
+        np.copyto(self.canvas, frame)
+        start = time.perf_counter()
+        for draw, pt1, pt2, color in self.guides:
+            draw(self.canvas, pt1, pt2, color, 2)
+        for text, org in self.labels:
+            cv2.putText(self.canvas, text, org, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+        self._time('hud', 'draw', start)
+        np.copyto(self.canvas, frame)
+        start = time.perf_counter()
+        self.hud.apply(self.canvas)
+        self._time('hud', 'cached', start)
+
+    def report(self):
+        return {f'{group}.{name}': summary(samples) for (group, name), samples in self.samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-stage microbenchmark of the HSV vision pipeline.')
+    parser.add_argument('--frames', nargs='+', default=[],
+                        help='stored corpora: image directories, video files or --record sessions '
+                             '(default: synthetic frames at each --densities)')
+    parser.add_argument('--densities', nargs='+', type=float, default=list(DENSITIES),
+                        help='mask densities of the synthetic corpus (share of the frame covered)')
+    parser.add_argument('--sizes', nargs='+', default=list(SIZES), help='display sizes WxH to run at')
+    parser.add_argument('--limit', type=int, default=64, help='most frames read from each corpus')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed passes over each corpus first')
+    parser.add_argument('--repeat', type=int, default=10, help='timed passes over each corpus')
+    parser.add_argument('--profile', help='JSON profile with the HSV range (default: green)')
+    parser.add_argument('--save-corpus', metavar='DIR', help='write the synthetic corpus as PNG and exit')
+    parser.add_argument('--json', metavar='PATH', help='write the results as JSON')
+    args = parser.parse_args()
+
+    if args.frames:
+        corpora = {os.path.basename(os.path.normpath(path)): load_frames(path, args.limit) for path in args.frames}
+    else:
+        corpora = {f'density-{100 * d:g}%': synthetic_corpus(d) for d in args.densities}
+
+    if args.save_corpus:
+        for name, frames in corpora.items():
+            directory = os.path.join(args.save_corpus, name.replace('%', ''))
+            os.makedirs(directory, exist_ok=True)
+            for i, image in enumerate(frames):
+                cv2.imwrite(os.path.join(directory, f'{i:04d}.png'), cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        print(f"Corpus written to {args.save_corpus}")
+        return
+
+    lower, upper = load_hsv_range(args.profile) if args.profile else DEFAULT_RANGE
+    results = []
+    for size in args.sizes:
+        width, height = (int(v) for v in size.lower().split('x'))
+        for name, frames in corpora.items():
+            bench = Bench(width, height, lower, upper)
+            for _ in range(args.warmup):
+                for image in frames:
+                    bench.run(image, record=False)
+            bench.density = []
+            for _ in range(args.repeat):
+                for image in frames:
+                    bench.run(image)
+            stages = bench.report()
+            results.append({'size': size, 'corpus': name, 'frames': len(frames),
+                            'mask_density': round(float(np.mean(bench.density)), 4), 'stages': stages})
+
+            print(f"\n{size}  {name}  ({len(frames)} frames x {args.repeat}, "
+                  f"mask density {results[-1]['mask_density']:.3f})")
+            print(f"  {'stage':26} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'fps':>9}")
+            for stage, s in stages.items():
+                print(f"  {stage:26} {s['mean_ms']:9.3f} {s['p50_ms']:9.3f} {s['p99_ms']:9.3f} {s['fps'] or 0:9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'opencv': cv2.__version__,
+                       'warmup': args.warmup, 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"\nResults in {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+
+from hsv_lut import MAX_RANGES
+
+# lowest set bit of a range-bits value -> 1 + range index (0: no bit set)
+_FIRST_RANGE = np.zeros(256, np.intp)
+for _bits in range(1, 256):
+    _FIRST_RANGE[_bits] = 1 + ((_bits & -_bits).bit_length() - 1)
+
+
+class Blobs:
+    """Statistics of every blob in a mask as parallel NumPy arrays.
+
+    area: (N,) pixels, bbox: (N, 4) x, y, w, h, centroid: (N, 2) x, y,
+    all in display coordinates, confidence: (N,) 0..1 (always 1 for a
+    threshold mask) and color: (N,) index of the HSV range the blob matched
+    most. Filtering and selection index the arrays instead of looping over
+    contours in Python.
+    """
+
+    def __init__(self, area, bbox, centroid, confidence=None, color=None):
+        self.area = area
+        self.bbox = bbox
+        self.centroid = centroid
+        self.confidence = np.ones(len(area)) if confidence is None else confidence
+        self.color = np.zeros(len(area), np.intp) if color is None else color
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0), np.zeros((0, 4), np.int32), np.zeros((0, 2)))
+
+    def __len__(self):
+        return len(self.area)
+
+    def __getitem__(self, index):
+        return Blobs(self.area[index], self.bbox[index], self.centroid[index],
+                     self.confidence[index], self.color[index])
+
+    @property
+    def extent(self):
+        """Fraction of each bounding box covered by the blob."""
+        return self.area / np.maximum(self.bbox[:, 2] * self.bbox[:, 3], 1)
+
+    def filter(self, min_area=0, max_area=None):
+        keep = self.area > min_area
+        if max_area is not None:
+            keep &= self.area <= max_area
+        return self[keep]
+
+    def top_k(self, k):
+        """The k largest blobs, largest first."""
+        if len(self) > k:
+            index = np.argpartition(self.area, -k)[-k:]
+        else:
+            index = np.arange(len(self))
+        return self[index[np.argsort(self.area[index])[::-1]]]
+
+    def largest(self):
+        """Index of the largest blob, or None if there are none."""
+        return int(np.argmax(self.area)) if len(self) else None
+
+    def box(self, i):
+        """(x, y, w, h) of blob i as plain ints, ready for cv2 drawing calls."""
+        return tuple(int(v) for v in self.bbox[i])
+
+    def center(self, i):
+        return int(round(self.centroid[i, 0])), int(round(self.centroid[i, 1]))
+
+
+class LargestContour:
+    """Pipeline stage: only the largest blob, from findContours outlines.
+
+    For scripts that follow a single target this beats labeling every
+    pixel (BlobStats) by an order of magnitude. Area is cv2.contourArea,
+    as the scripts always used; `ctx.blobs` holds at most one blob. With
+    several HSV ranges its `color` is the range most pixels inside its
+    box matched.
+    """
+    name = 'blobs'
+
+    def __call__(self, ctx):
+        contours, _ = cv2.findContours(ctx.mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            ctx.blobs = Blobs.empty()
+            return
+        contour = max(contours, key=cv2.contourArea)
+        area = cv2.contourArea(contour)
+        x, y, w, h = cv2.boundingRect(contour)
+        moments = cv2.moments(contour)
+        if moments['m00'] > 0:
+            centroid = np.array([[moments['m10'] / moments['m00'], moments['m01'] / moments['m00']]])
+        else:
+            centroid = np.array([[x + w / 2, y + h / 2]])
+        color = None
+        if ctx.colors > 1:
+            first = _FIRST_RANGE[ctx.bits[y:y + h, x:x + w]]
+            color = np.array([np.bincount(first.ravel(), minlength=MAX_RANGES + 1)[1:].argmax()])
+        (x0, y0), (x1, y1) = np.rint(ctx.to_display(np.array([[x, y], [x + w, y + h]], np.float64))).astype(np.int32)
+        ctx.blobs = Blobs(np.array([area / (ctx.scale * ctx.scale)]), np.array([[x0, y0, x1 - x0, y1 - y0]], np.int32),
+                          ctx.to_display(centroid), color=color)
+
+
+class BlobStats:
+    """Pipeline stage: one connected-components pass instead of findContours.
+
+    Area is the blob's pixel count, which can differ by a few pixels from
+    cv2.contourArea on the outline; holes inside a blob don't count.
+
+    With several HSV ranges (hsv_lut.LutThreshold) the combined mask is
+    still labeled once; each blob's `color` is the range most of its pixels
+    matched, counted in a single bincount over the labels and range bits.
+    Touching blobs of different colours come out as one blob.
+    """
+    name = 'blobs'
+
+    def __init__(self, connectivity=8):
+        self.connectivity = connectivity
+
+    def __call__(self, ctx):
+        n, labels, stats, centroids = cv2.connectedComponentsWithStats(
+            ctx.mask, labels=ctx.buffer('labels', ctx.mask.shape, np.int32),
+            connectivity=self.connectivity, ltype=cv2.CV_32S)
+        # label 0 is the background
+        area = stats[1:n, cv2.CC_STAT_AREA].astype(np.float64)
+        bbox = stats[1:n, :4]
+        centroid = centroids[1:n]
+        color = None
+        if ctx.colors > 1 and n > 1:
+            color = self._colors(labels, ctx.bits, n)
+        if ctx.roi is not None:
+            bbox = bbox.copy()
+            bbox[:, :2] += ctx.roi
+            centroid = centroid + ctx.roi
+        if ctx.scale != 1.0:
+            inverse = 1.0 / ctx.scale
+            area = area * inverse * inverse
+            bbox = np.rint(bbox * inverse).astype(np.int32)
+            centroid = centroid * inverse
+        ctx.blobs = Blobs(area, bbox, centroid, color=color)
+
+    @staticmethod
+    def _colors(labels, bits, n):
+        slots = MAX_RANGES + 1
+        first = _FIRST_RANGE[bits]
+        # pixels per (label, range), background label and "no range" column dropped
+        counts = np.bincount((labels * slots + first).ravel(), minlength=n * slots)
+        return counts.reshape(n, slots)[1:, 1:].argmax(axis=1)
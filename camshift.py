@@ -0,0 +1,180 @@
+import os
+
+import cv2
+import numpy as np
+
+from blobs import Blobs
+from vision import DRONE_TO_HSV
+
+# hue-saturation histogram: 30 hue bins over 0..179, 32 saturation bins
+HIST_BINS = (30, 32)
+HIST_RANGES = [0, 180, 0, 256]
+
+
+def _detect_box(ctx, box):
+    """Display-pixel box to a slice of the (possibly cropped) detection frame."""
+    height, width = ctx.detect.shape[:2]
+    ox, oy = ctx.roi if ctx.roi is not None else (0, 0)
+    x, y, w, h = box
+    x0 = min(max(int(x * ctx.scale) - ox, 0), width - 1)
+    y0 = min(max(int(y * ctx.scale) - oy, 0), height - 1)
+    x1 = min(max(int(np.ceil((x + w) * ctx.scale)) - ox, x0 + 1), width)
+    y1 = min(max(int(np.ceil((y + h) * ctx.scale)) - oy, y0 + 1), height)
+    return slice(y0, y1), slice(x0, x1)
+
+
+def target_histogram(ctx, box, bins=HIST_BINS):
+    """Normalised H-S histogram of the masked pixels inside `box` (display pixels)."""
+    rows, cols = _detect_box(ctx, box)
+    hist = cv2.calcHist([ctx.hsv[rows, cols]], [0, 1], ctx.mask[rows, cols], list(bins), HIST_RANGES)
+    cv2.normalize(hist, hist, 0, 255, cv2.NORM_MINMAX)
+    return hist
+
+
+def _spread_box(ctx, moments, shape, offset):
+    """Display box two standard deviations either side of a back-projection's centroid."""
+    mass = moments['m00']
+    cx, cy = moments['m10'] / mass, moments['m01'] / mass
+    half_w, half_h = 2 * np.sqrt(moments['mu20'] / mass), 2 * np.sqrt(moments['mu02'] / mass)
+    height, width = shape
+    corners = np.array([[max(cx - half_w, 0), max(cy - half_h, 0)],
+                        [min(cx + half_w, width), min(cy + half_h, height)]])
+    (x0, y0), (x1, y1) = np.rint(ctx.to_display(corners + offset)).astype(np.int32)
+    return int(x0), int(y0), int(x1 - x0), int(y1 - y0)
+
+
+def save_histogram(path, hist):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.save(path, hist)
+
+
+def load_histogram(path):
+    return np.load(path).astype(np.float32)
+
+
+class CamShiftEngine:
+    """Back-projection tracker, selectable instead of the HSV threshold path.
+
+    Placed right after the 'roi' stage. Once it holds a hue-saturation
+    histogram and a window, it converts only a search region around the
+    last window to HSV, back-projects the histogram there and runs CamShift
+    (or MeanShift, which keeps the window size). The result goes into
+    `ctx.blobs` like the blobs stage's (one blob, with a confidence) and ends the
+    pass, so blur, threshold, morphology and labeling are skipped.
+
+    Without a histogram or a window, or when the mean back-projection in
+    the window drops below `min_confidence`, the stage does nothing and
+    the threshold stages after it run; HistogramLearner then relocks.
+    """
+    name = 'camshift'
+
+    def __init__(self, code=DRONE_TO_HSV, hist=None, method='camshift', margin=0.5,
+                 min_confidence=0.15, min_area=0):
+        self.code = code
+        self.hist = hist
+        self.fixed = hist is not None    # a calibration histogram is never relearned
+        self.method = method
+        self.margin = margin
+        self.min_confidence = min_confidence
+        self.min_area = min_area
+        self.criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 1)
+        self.window = None              # x, y, w, h in display pixels
+        self.tracked_frames = 0
+        self.detect_frames = 0
+        self.losses = 0
+
+    def reset(self):
+        self.window = None
+        if not self.fixed:
+            self.hist = None
+
+    def __call__(self, ctx):
+        # buffers sized for the whole detection frame up front, so a growing search region never reallocates
+        full = ctx.frame_detect_shape if ctx.roi is not None else ctx.detect.shape[:2]
+        ctx.buffer('camshift_hsv', tuple(full) + ctx.detect.shape[2:])
+        ctx.buffer('backproject', tuple(full))
+        if self.hist is None or self.window is None:
+            self.detect_frames += 1
+            return
+        x, y, w, h = self.window
+        rows, cols = _detect_box(ctx, (x - self.margin * w, y - self.margin * h,
+                                       w * (1 + 2 * self.margin), h * (1 + 2 * self.margin)))
+        region = ctx.detect[rows, cols]
+        hsv = cv2.cvtColor(region, self.code, dst=ctx.buffer('camshift_hsv', region.shape))
+        prob = cv2.calcBackProject([hsv], [0, 1], self.hist, HIST_RANGES, 1,
+                                   dst=ctx.buffer('backproject', region.shape[:2]))
+
+        # the last window, in region pixels
+        track_rows, track_cols = _detect_box(ctx, self.window)
+        start = (track_cols.start - cols.start, track_rows.start - rows.start,
+                 track_cols.stop - track_cols.start, track_rows.stop - track_rows.start)
+        if self.method == 'meanshift':
+            _, (tx, ty, tw, th) = cv2.meanShift(prob, start, self.criteria)
+        else:
+            _, (tx, ty, tw, th) = cv2.CamShift(prob, start, self.criteria)
+
+        patch = prob[ty:ty + th, tx:tx + tw]
+        confidence = patch.mean() / 255 if patch.size else 0.0
+        if confidence < self.min_confidence:
+            self.losses += 1
+            self.window = None
+            self.detect_frames += 1
+            return
+
+        moments = cv2.moments(patch)
+        if moments['m00'] > 0:
+            centroid = np.array([[tx + moments['m10'] / moments['m00'], ty + moments['m01'] / moments['m00']]])
+        else:
+            centroid = np.array([[tx + tw / 2, ty + th / 2]])
+        offset = np.array((cols.start, rows.start))
+        corners = ctx.to_display(np.array([[tx, ty], [tx + tw, ty + th]], np.float64) + offset)
+        (x0, y0), (x1, y1) = np.rint(corners).astype(np.int32)
+        self.window = (int(x0), int(y0), int(x1 - x0), int(y1 - y0))
+        box = self.window
+        if self.method == 'meanshift':
+            # MeanShift never resizes its window, so neither the window nor the mass inside it grow with
+            # the target: measure the blob over the whole search region instead, as CamShift sizes its window
+            moments = cv2.moments(prob)
+            box = _spread_box(ctx, moments, prob.shape, offset)
+        # back-projection mass in pixels, the equivalent of a blob's pixel count
+        area = moments['m00'] / 255 / (ctx.scale * ctx.scale)
+
+        ctx.blobs = Blobs(np.array([area]), np.array([box], np.int32),
+                          ctx.to_display(centroid + offset), np.array([confidence]))
+        ctx.done = True
+        self.tracked_frames += 1
+
+    def learner(self):
+        """The stage that goes last in the pipeline to (re)lock this engine."""
+        return HistogramLearner(self)
+
+    def stats(self):
+        return {
+            'tracked_frames': self.tracked_frames,
+            'detect_frames': self.detect_frames,
+            'losses': self.losses,
+        }
+
+
+class HistogramLearner:
+    """Last stage of the CamShift pipeline: lock onto the threshold path's result.
+
+    Runs only on frames the engine could not track. The largest blob above
+    the engine's `min_area` becomes its window and, unless a calibration
+    histogram was given, the source of its histogram.
+    """
+    name = 'learn'
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __call__(self, ctx):
+        largest = ctx.blobs.largest()
+        if largest is None or ctx.blobs.area[largest] <= self.engine.min_area:
+            return
+        box = ctx.blobs.box(largest)
+        if not self.engine.fixed:
+            self.engine.hist = target_histogram(ctx, box)
+        self.engine.window = box
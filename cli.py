@@ -0,0 +1,140 @@
+import argparse
+
+from display import Display
+from fake_tello import FakeTello, SyntheticTello
+from params import ProfileFile, SocketSource, load_hsv_range
+from recorder import FlightRecorder
+from scenarios import SCENARIOS
+from viewer import MjpegViewer
+
+
+def make_parser(description, vision=True, targets=False):
+    """Command-line options shared by the entry points.
+
+    `vision=False` gives main.py's subset; `targets=True` adds the
+    multi-colour / multi-target options of color_tracking.py.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--headless', action='store_true',
+                        help='no windows: keys are read from stdin and nothing is drawn')
+    parser.add_argument('--viewer-port', type=int,
+                        help='serve the annotated view as MJPEG on this port (http://host:PORT/)')
+    parser.add_argument('--viewer-quality', type=int, default=80,
+                        help='JPEG quality of the viewer stream (default 80)')
+    parser.add_argument('--viewer-fps', type=float, default=15,
+                        help='most frames per second sent to viewers (default 15)')
+    parser.add_argument('--tello-host', metavar='HOST[:PORT]',
+                        help='drone address, e.g. a tello_sim.py drone at 127.0.0.1:9889 '
+                             '(default 192.168.10.1:8889)')
+    parser.add_argument('--video-port', type=int,
+                        help='UDP port the drone streams video to (default 11111)')
+    parser.add_argument('--record', nargs='?', const='recordings', metavar='DIR',
+                        help='record video, telemetry and rc commands to a new session under DIR '
+                             '(default recordings/; flight scripts and main.py)')
+    if not vision:
+        return parser
+    parser.add_argument('--profile',
+                        help='JSON parameter profile (HSV range, gains); reloaded when the file changes')
+    parser.add_argument('--param-port', type=int,
+                        help='also take JSON parameter updates on this local UDP port')
+    parser.add_argument('--detect-scale', type=float,
+                        help='run segmentation at this fraction of the display size (e.g. 0.5, 0.25)')
+    parser.add_argument('--direct-lut', action='store_true',
+                        help='threshold camera pixels through one precompiled table, skipping the HSV '
+                             'conversion and blur (slower start-up and range changes)')
+    parser.add_argument('--vision-budget', type=float, metavar='MS',
+                        help='keep vision under this many ms per frame by lowering detection scale, '
+                             'blur and morphology (overrides --detect-scale; flight scripts)')
+    parser.add_argument('--roi', action='store_true',
+                        help='once a target is locked, only search a window around it (flight scripts)')
+    parser.add_argument('--flow', action='store_true',
+                        help='between colour detections, follow the target with optical flow (flight scripts)')
+    parser.add_argument('--engine', choices=('threshold', 'camshift', 'meanshift'), default='threshold',
+                        help='detector: HSV threshold every frame, or histogram back-projection once locked')
+    parser.add_argument('--hist',
+                        help='H-S histogram saved by ctest.py (h key) for the camshift/meanshift engines')
+    parser.add_argument('--replay', metavar='PATH',
+                        help='fly a FakeTello playing back a --record session or a video file, or '
+                             'synthetic:SCENARIO for a closed-loop simulated flight (flight scripts)')
+    parser.add_argument('--replay-fast', action='store_true',
+                        help='with --replay, process every frame as fast as possible on the recording\'s '
+                             'clock instead of at its real pace (repeatable runs)')
+    parser.add_argument('--bench-out', metavar='PATH',
+                        help='with --replay synthetic:SCENARIO, write the lock-on metrics to this JSON file')
+    if not targets:
+        return parser
+    parser.add_argument('--color', action='append', default=[],
+                        help='extra HSV profile to detect in the same pass (repeatable); '
+                             'blobs report which range they matched')
+    parser.add_argument('--target-policy', choices=('largest', 'closest', 'oldest'), default='largest',
+                        help='which tracked blob to follow when the current one is lost')
+    parser.add_argument('--target-color', type=int,
+                        help='only follow blobs of this range: 0 = trackbars, 1.. = --color profiles')
+    return parser
+
+
+def make_drone(args):
+    """Tello at --tello-host, or with --replay a FakeTello playing back the recording."""
+    if getattr(args, 'replay', None):
+        kind, _, name = args.replay.partition(':')
+        if kind == 'synthetic':
+            if name not in SCENARIOS:
+                raise ValueError(f"Unknown scenario: {name} (one of {', '.join(SCENARIOS)})")
+            return SyntheticTello(name, SCENARIOS[name], realtime=not args.replay_fast, results=args.bench_out)
+        return FakeTello(args.replay, realtime=not args.replay_fast)
+    # only the flight scripts need djitellopy; ctest.py runs on a webcam without it
+    from djitellopy import Tello
+    if args.tello_host is None and args.video_port is None:
+        return Tello()
+    host, _, port = (args.tello_host or Tello.TELLO_IP).partition(':')
+    drone = Tello(host, vs_udp=args.video_port) if args.video_port else Tello(host)
+    if port:
+        # djitellopy sends every command to drone.address and matches replies by ip only
+        drone.address = (host, int(port))
+    return drone
+
+
+def frame_read(drone):
+    """drone.get_frame_read(), ending the drone link at once when no video comes.
+
+    Left to djitellopy, that clean-up runs from Tello.__del__ at interpreter
+    exit, when its reply thread no longer runs: every streamoff then times
+    out (3 x 7 s) although the drone answered.
+    """
+    try:
+        return drone.get_frame_read()
+    except Exception:
+        drone.end()
+        raise
+
+
+def make_display(args, streams=()):
+    """Display for --headless, plus the MJPEG viewer of `streams` when --viewer-port is set."""
+    viewer = None
+    if args.viewer_port:
+        viewer = MjpegViewer(args.viewer_port, quality=args.viewer_quality, fps=args.viewer_fps).start()
+        print(f"Viewer on http://0.0.0.0:{args.viewer_port}/")
+    return Display(args.headless, viewer, streams)
+
+
+def start_recorder(args, grabber, telemetry, arbiter):
+    """FlightRecorder attached to the flight's sources when --record is set, else None."""
+    if args.record is None:
+        return None
+    recorder = FlightRecorder(args.record).start().attach(grabber, telemetry, arbiter)
+    print(f"Recording to {recorder.directory}")
+    return recorder
+
+
+def start_param_sources(params, args):
+    """Apply parameter flags and start the profile watcher / parameter socket."""
+    if args.detect_scale:
+        params.set('detect_scale', args.detect_scale)
+    if getattr(args, 'color', None):
+        params.set('colors', [load_hsv_range(path) for path in args.color])
+    sources = []
+    if args.profile:
+        sources.append(ProfileFile(params, args.profile).start())
+    if args.param_port:
+        sources.append(SocketSource(params, args.param_port).start())
+    return sources
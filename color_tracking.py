@@ -1,223 +1,279 @@
-from djitellopy import Tello
 import time
 import cv2
 # pip install opencv-python
-import numpy as np
-# pip install numpy
+
+from frame_grabber import FrameGrabber
+from telemetry import Telemetry
+from rc_arbiter import RcArbiter
+from scheduler import FixedRateScheduler
+from vision import make_pipeline, BufferPool, TELLO_FRAME_SHAPE
+from params import ParamStore
+from targets import TargetTracker
+from governor import QualityGovernor, QUALITY_SCALES
+from hud import Hud
+from cli import make_parser, make_display, make_drone, frame_read, start_param_sources, start_recorder
+
 width = 650
 height = 500    
 area_min = 0.05 * (width * height)  # Área mínima para detectar objetos
 threshold_x = int(0.15 *width)
 threshold_y = int(0.15 *height)
+control_hz = 30  # Paquetes rc por segundo, fijo sin importar el costo de la vision
+
+# Parametros en vivo: valores por defecto, se pueden cambiar con --profile / --param-port
+params = ParamStore({'h_min': 40, 'h_max': 110, 's_min': 55, 's_max': 192, 'v_min': 30, 'v_max': 214})
+args = make_parser('Seguimiento de un objeto de color con el Tello.', targets=True).parse_args()
+param_sources = start_param_sources(params, args)
 
-#Conectar al dron
-drone = Tello()
+#Conectar al dron (--replay: un FakeTello reproduce una grabacion; --replay-fast usa su reloj en todas las etapas)
+drone = make_drone(args)
+clock = drone.clock if args.replay else time.monotonic
 drone.connect()
 
 #iniciar stream de video
 drone.streamon()
 time.sleep(3)
-
-def callback(x):
-    pass
+grabber = FrameGrabber(frame_read(drone), clock=clock, synchronous=args.replay_fast).start()
+telemetry = Telemetry(drone, clock=clock)
+arbiter = RcArbiter(drone, clock=clock)
+# --record: cuadros, telemetria y paquetes rc a una sesion, escritos fuera del lazo de control
+recorder = start_recorder(args, grabber, telemetry, arbiter)
+# Buffers intermedios de la vision reservados una sola vez y reutilizados en cada cuadro
+# (con --vision-budget tambien en cada escala de deteccion a la que puede bajar el gobernador)
+pipeline = make_pipeline(width, height, *params.hsv_range(),
+                         pool=BufferPool(), direct=args.direct_lut, blobs='all')
+pipeline.preallocate(TELLO_FRAME_SHAPE, params, scales=QUALITY_SCALES if args.vision_budget else ())
 
 # Inicia la captura de la webcam
 cap = cv2.VideoCapture(0)
 
-# Crea una ventana para las trackbars
-cv2.namedWindow('Trackbars')
-# Define un tamaño personalizado para la ventana de trackbars
-cv2.resizeWindow('Trackbars', 600, 400)  # Ancho = 600 píxeles, Alto = 400 píxeles
+# Ventanas y teclado, o con --headless: teclas por stdin y nada de dibujo
+display = make_display(args, streams=('Original', 'Mask', 'Filtrado'))
 
-# Crea trackbars para ajustar los valores H, S, V
-cv2.createTrackbar('H Min', 'Trackbars', 40, 179, callback)
-cv2.createTrackbar('H Max', 'Trackbars', 110, 179, callback)
-cv2.createTrackbar('S Min', 'Trackbars', 55, 255, callback)
-cv2.createTrackbar('S Max', 'Trackbars', 192, 255, callback)
-cv2.createTrackbar('V Min', 'Trackbars', 30, 255, callback)
-cv2.createTrackbar('V Max', 'Trackbars', 214, 255, callback)
+# Crea la ventana de trackbars (600x400) para ajustar los valores H, S, V (cada cambio va directo a los parametros)
+trackbars = display.trackbars(params)
 
-drone.takeoff()
-flyings = True
+# IDs persistentes para cada objeto; el control sigue a uno solo (--target-policy / --target-color)
+tracker = TargetTracker((width, height), policy=args.target_policy, color=args.target_color)
 
-while True:
-    # Lee la imagen de la webcam
-    # ret, frame = cap.read()
+# Las guias no cambian: se dibujan una sola vez y se estampan en cada cuadro junto con los textos
+hud = Hud()
+# Lineas verticales y horizontales alrededor del centro de la imagen
+hud.line((width // 2 - threshold_x, 0), (width // 2 - threshold_x, height), (255, 0, 0), 2)
+hud.line((width // 2 + threshold_x, 0), (width // 2 + threshold_x, height), (255, 0, 0), 2)
+hud.line((0, height // 2 - threshold_y), (width, height // 2 - threshold_y), (255, 0, 0), 2)
+hud.line((0, height // 2 + threshold_y), (width, height // 2 + threshold_y), (255, 0, 0), 2)
+# Rectángulo en el centro de la imagen del area de detección
+hud.rectangle((width // 2 - threshold_x, height // 2 - threshold_y), (width // 2 + threshold_x, height // 2 + threshold_y), (0, 0, 255), 2)
 
-    # if not ret:
-    #     break
-
-    frame = drone.get_frame_read().frame
-    if frame is None:
-        print('No se recibio el cuadro')
-        continue
+# --vision-budget: baja o sube la calidad de la deteccion para cumplir el tiempo por cuadro
+governor = QualityGovernor(params, args.vision_budget / 1000) if args.vision_budget else None
 
-    frame = cv2.resize(frame, (width, height))  # Redimensiona la imagen
-    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    # Convierte la imagen de BGR a HSV
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+drone.takeoff()
+flying = True
+last_seq = 0
 
-    # Obtiene los valores de las trackbars
-    h_min = cv2.getTrackbarPos('H Min', 'Trackbars')
-    s_min = cv2.getTrackbarPos('S Min', 'Trackbars')
-    v_min = cv2.getTrackbarPos('V Min', 'Trackbars')
-    h_max = cv2.getTrackbarPos('H Max', 'Trackbars')
-    s_max = cv2.getTrackbarPos('S Max', 'Trackbars')
-    v_max = cv2.getTrackbarPos('V Max', 'Trackbars')
+# Etapa de control en su propio hilo: un paquete rc combinado por tick
+control_loop = FixedRateScheduler(arbiter.tick, control_hz, clock=clock, inline=args.replay_fast).start()
+state = telemetry.refresh()
 
-    # Define los límites del filtro HSV
-    lower_hsv = np.array([h_min, s_min, v_min])
-    upper_hsv = np.array([h_max, s_max, v_max])
+while True:
+    # Una sola lectura de teclado por vuelta, tambien en vueltas sin cuadro nuevo
+    key = display.key()
 
-    # Aplica desenfoque gaussiano para reducir el ruido
-    blurred = cv2.GaussianBlur(hsv, (15, 15), 0)
+    # Salir cuando se presiona 'q'
+    if key == ord('q'):
+        break
 
-    # Aplica el filtro de color en la imagen desenfocada
-    mask = cv2.inRange(blurred, lower_hsv, upper_hsv)
+    if key == ord('l'):
+        if flying:
+            drone.land()
+            flying = False
+        else:
+            pass
+
+    if key == ord('t'):
+        if flying:
+            pass
+        else:
+            # Sin paquete de estado todavia la bateria es None: no se despega
+            if state.battery is None or state.battery <= 15:
+                pass
+            else:
+                drone.takeoff()
+                flying = True
 
-    # Erosión y dilatación para eliminar ruido en la máscara
-    mask = cv2.erode(mask, None, iterations=2)
-    mask = cv2.dilate(mask, None, iterations=2)
+    # Lee la imagen de la webcam
+    # ret, frame = cap.read()
 
-    # Aplica la máscara a la imagen original
-    result = cv2.bitwise_and(frame, frame, mask=mask)
+    # if not ret:
+    #     break
 
-    # Encuentra objetos segun el filtro de color
-    contours, hierarchy = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    # Sin cuadro nuevo se conserva la deteccion y el comando enviado (sin ventanas se espera aqui al video)
+    latest = grabber.wait_newer(last_seq, display.frame_timeout)
+    if latest is None:
+        if grabber.finished:
+            break
+        if grabber.seq == 0:
+            print('No se recibio el cuadro')
+        continue
+    last_seq = latest.seq
+    # --replay-fast: los ticks rc que tocan en el reloj de la grabacion se corren aqui y no en un hilo
+    control_loop.poll()
+
+    # Una sola lectura del estado por cuadro
+    state = telemetry.refresh()
+
+    # Actualiza los límites del filtro HSV solo si cambio algun parametro
+    if pipeline.sync(params) and trackbars is not None:
+        trackbars.sync()
+
+    # Redimensiona, convierte RGB a HSV una sola vez, desenfoca, filtra, limpia y mide los objetos
+    processed = pipeline.run(latest.image)
+    mask = processed.mask
+    if governor is not None:
+        governor.observe(processed.elapsed)
+
+    # Copia en BGR e imagen filtrada solo si alguien esta mirando
+    show = display.attached
+    if show:
+        frame = cv2.cvtColor(processed.frame, cv2.COLOR_RGB2BGR,
+                             dst=pipeline.pool.get('display', processed.frame.shape))
+
+        # Aplica la máscara a la imagen original (fuera de la máscara el buffer se deja en negro)
+        result = pipeline.pool.get('filtrado', frame.shape)
+        result.fill(0)
+        cv2.bitwise_and(frame, frame, dst=result, mask=mask)
     # Area min 5% del ancho y alto de la imagen
 
+    hud.text('battery', "Battery: {}%".format('--' if state.battery is None else state.battery), (10, 30), (0, 255, 0), 1)
+
+
+
+    # Area, caja, centro y color de todos los objetos vienen en arreglos; solo se siguen los que pasan area_min
+    blobs = processed.blobs.filter(area_min)
+    tracker.update(blobs)
+
+    # Todos los objetos visibles con su ID y rango de color; el seleccionado con linea gruesa
+    for track in tracker.tracks if show else ():
+        if track.missed:
+            continue
+        x, y, w, h = track.box
+        selected = track.id == tracker.selected
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0) if selected else (0, 165, 255), 5 if selected else 2)
+        cv2.putText(frame, "#{} c{}".format(track.id, track.color), (x, max(y - 8, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0) if selected else (0, 165, 255), 2)
+
+    # Un solo objetivo manda los comandos en cada cuadro, aunque haya varios objetos del mismo color
+    target = tracker.target()
+    if args.replay:
+        # La repeticion evalua el objetivo seguido, no solo lo que se vio
+        drone.vision(processed.elapsed, target.box if target is not None and not target.missed else None,
+                     (width, height))
+    if target is not None and not target.missed:
+        x, y, w, h = target.box
+        center = target.center()
+        if show:
+            cv2.circle(frame, center, 5, (0, 0, 255), cv2.FILLED)
 
+        
+        
+        
+        # revisamos si el objrto esta en la parte izquierda
+        if x + w // 2 < width // 2 - threshold_x:
+            hud.text('horizontal', "Izquierda", (10,20), (255, 0, 0), 0.5)
+            error = width // 2 - threshold_x - (x + w // 2)
+            # Si el objeto está a la izquierda, envía un comando al dron para girar a la izquierda implementando un control PID
+            if error > 0:
+                arbiter.demand('vision', yaw=-int(error*0.5))
+            else:
+                arbiter.demand('vision', yaw=0)
 
-    key = cv2.waitKey(50) & 0xFF
-
-    cv2.putText(frame, "Battery: {}%".format(drone.get_battery()), 
-                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-
-
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if area > area_min:
-            cv2.drawContours(frame, contour, -1, (255, 0, 255), 7)
-            perimeter = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-            x, y, w, h = cv2.boundingRect(approx)
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 5)
-            center = (x + w // 2, y + h // 2)
-            cv2.circle(frame, center, 5, (0, 0, 255), cv2.FILLED)
 
-            
-            
-            
-            # revisamos si el objrto esta en la parte izquierda
-            if x + w // 2 < width // 2 - threshold_x:
-                cv2.putText(frame, "Izquierda", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                error = width // 2 - threshold_x - (x + w // 2)
-                # Si el objeto está a la izquierda, envía un comando al dron para girar a la izquierda implementando un control PID
-                if error > 0:
-                    drone.send_rc_control(0, 0, 0, -int(error*0.5))
-                else:
-                    drone.send_rc_control(0, 0, 0, 0)
-
-
-            # revisamos si el objeto esta en la parte derecha
-            elif x + w // 2 > width // 2 + threshold_x:
-                cv2.putText(frame, "Derecha", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                error = (x + w // 2) - (width // 2 + threshold_x)
-                # Si el objeto está a la derecha, envía un comando al dron para girar a la derecha implementando un control PID
-                if error > 0:
-                    drone.send_rc_control(0, 0, 0, int(error*0.5))
-                else:
-                    drone.send_rc_control(0, 0, 0, 0)
+        # revisamos si el objeto esta en la parte derecha
+        elif x + w // 2 > width // 2 + threshold_x:
+            hud.text('horizontal', "Derecha", (10,20), (255, 0, 0), 0.5)
+            error = (x + w // 2) - (width // 2 + threshold_x)
+            # Si el objeto está a la derecha, envía un comando al dron para girar a la derecha implementando un control PID
+            if error > 0:
+                arbiter.demand('vision', yaw=int(error*0.5))
             else:
-                cv2.putText(frame, "Centro", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                drone.send_rc_control(0, 0, 0, 0)
-            # revisamos si el objeto esta en la parte superior
-            
-            if y + h/2 < height // 2 - threshold_x:
-                cv2.putText(frame, "Arriba", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                error = height // 2 - threshold_x - (y + h // 2)
-                # Si el objeto está arriba, envía un comando al dron para subir implementando un control PID
-                if error > 0:
-                    drone.send_rc_control(0, 0, int(error*0.5), 0)
-                else:
-                    drone.send_rc_control(0, 0, 0, 0)
-            
-            # revisamos si el objeto esta en la parte inferior
-            elif y+ h/2  > height // 2 + threshold_x:
-                cv2.putText(frame, "Abajo", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                error = (y + h // 2) - (height // 2 + threshold_x)
-                # Si el objeto está abajo, envía un comando al dron para bajar implementando un control PID
-                if error > 0:
-                    drone.send_rc_control(0, 0, -int(error*0.5), 0)
+                arbiter.demand('vision', yaw=0)
+        else:
+            hud.text('horizontal', "Centro", (10,20), (255, 0, 0), 0.5)
+            arbiter.demand('vision', yaw=0)
+        # revisamos si el objeto esta en la parte superior
+        
+        if y + h/2 < height // 2 - threshold_x:
+            hud.text('vertical', "Arriba", (10,10), (255, 0, 0), 0.5)
+            error = height // 2 - threshold_x - (y + h // 2)
+            # Si el objeto está arriba, envía un comando al dron para subir implementando un control PID
+            if error > 0:
+                arbiter.demand('vision', ud=int(error*0.5))
             else:
-                cv2.putText(frame, "Centro", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                drone.send_rc_control(0, 0, 0, 0)
-
-            # Revisamos el tamaño del objeto para determinar si el dron debe avanzar o retroceder
-            if w * h > area_min:
-                cv2.putText(frame, "Grande", (10,40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                # Si el objeto es grande, envía un comando al dron para avanzar implementando un control PID
-                error = w * h - area_min
-                if error > 0:
-                    # limitar la velocidad de avance
-                    if error > 200:
-                        error = 200
-                    drone.send_rc_control(0, int(error*0.5), 0, 0)
-                else:
-                    drone.send_rc_control(0, 0, 0, 0)
+                arbiter.demand('vision', ud=0)
+        
+        # revisamos si el objeto esta en la parte inferior
+        elif y+ h/2  > height // 2 + threshold_x:
+            hud.text('vertical', "Abajo", (10,10), (255, 0, 0), 0.5)
+            error = (y + h // 2) - (height // 2 + threshold_x)
+            # Si el objeto está abajo, envía un comando al dron para bajar implementando un control PID
+            if error > 0:
+                arbiter.demand('vision', ud=-int(error*0.5))
+        else:
+            hud.text('vertical', "Centro", (10,10), (255, 0, 0), 0.5)
+            arbiter.demand('vision', ud=0)
+
+        # Revisamos el tamaño del objeto para determinar si el dron debe avanzar o retroceder
+        if w * h > area_min:
+            hud.text('size', "Grande", (10,40), (255, 0, 0), 0.5)
+            # Si el objeto es grande, envía un comando al dron para avanzar implementando un control PID
+            error = w * h - area_min
+            if error > 0:
+                # limitar la velocidad de avance
+                if error > 200:
+                    error = 200
+                arbiter.demand('vision', fb=int(error*0.5))
             else:
-                cv2.putText(frame, "Pequeño", (10,40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                # Si el objeto es pequeño, envía un comando al dron para retroceder implementando un control PID
-                error = area_min - (w * h)
-                if error > 0:
-                    #limitar la velocidad de retroceso
-                    if error > 200:
-                        error = 200
-                    drone.send_rc_control(0, -int(error*0.5), 0, 0)
-                else:
-                    drone.send_rc_control(0, 0, 0, 0)
-
-            if key == ord('l'):
-                if flying:
-                    drone.land()
-                    flying = False
-                else:
-                    pass
-
-            if key == ord('t'):
-                if flying:
-                    pass
-                else:
-                    if drone.get_battery() <= 15 and not flying:
-                        pass
-                    else:
-                        drone.takeoff()
-                        flying = True
-
-            
-            
-            
-    # Dibuja una linea vertical al centro de la imagen
-    cv2.line(frame, (width // 2 - threshold_x, 0), (width // 2 - threshold_x, height), (255, 0, 0), 2)
-    cv2.line(frame, (width // 2 + threshold_x, 0), (width // 2 + threshold_x, height), (255, 0, 0), 2)
-
-    # Dibuja una linea horizontal al centro de la imagen
-    cv2.line(frame, (0, height // 2 - threshold_y), (width, height // 2 - threshold_y), (255, 0, 0), 2)
-    cv2.line(frame, (0, height // 2 + threshold_y), (width, height // 2 + threshold_y), (255, 0, 0), 2)
-
-    # Dibuja un rectángulo en el centro de la imagen del area de detección
-    cv2.rectangle(frame, (width // 2 - threshold_x, height // 2 - threshold_y), (width // 2 + threshold_x, height // 2 + threshold_y), (0, 0, 255), 2)
-    
-    # Muestra la imagen original, la imagen filtrada y la imagen filtrada sobrepuesta en la original
-    cv2.imshow('Original', frame)
-    cv2.imshow('Mask', mask)
-    cv2.imshow('Filtrado', result)
-
-    # Salir cuando se presiona 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+                arbiter.demand('vision', fb=0)
+        else:
+            hud.text('size', "Pequeño", (10,40), (255, 0, 0), 0.5)
+            # Si el objeto es pequeño, envía un comando al dron para retroceder implementando un control PID
+            error = area_min - (w * h)
+            if error > 0:
+                #limitar la velocidad de retroceso
+                if error > 200:
+                    error = 200
+                arbiter.demand('vision', fb=-int(error*0.5))
+            else:
+                arbiter.demand('vision', fb=0)
+    else:
+        # Sin objetivo no hay direccion que mostrar ni velocidad que mantener
+        for name in ('horizontal', 'vertical', 'size'):
+            hud.text(name, None)
+        arbiter.release('vision')
+
+    if show:
+        # Guias, area de deteccion y textos en una sola copia con mascara
+        hud.apply(frame)
+
+        # Muestra la imagen original, la imagen filtrada y la imagen filtrada sobrepuesta en la original
+        display.show('Original', frame)
+        display.show('Mask', mask)
+        display.show('Filtrado', result)
 
 # Libera la captura y cierra las ventanas
+control_loop.stop()
+print("Lazo de control: {}".format(control_loop.stats()))
+if governor is not None:
+    print("Calidad de vision: {}".format(governor.stats()))
+print("Buffers de vision: {} reservados, {} despues del arranque".format(
+    pipeline.pool.allocations, pipeline.steady_allocations))
+grabber.stop()
+if args.replay:
+    print("Reproduccion: {}".format(drone.stats()))
+if recorder is not None:
+    recorder.stop()
+    print("Grabacion: {}".format(recorder.stats()))
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+display.close()
\ No newline at end of file
@@ -1,32 +1,38 @@
 import cv2
 # pip install opencv-python
-import numpy as np
-# pip install numpy
+
+from vision import make_pipeline, BufferPool, WEBCAM_TO_HSV
+from params import ParamStore, HSV_KEYS
+from camshift import target_histogram, save_histogram
+from cli import make_parser, make_display, start_param_sources
+
 width = 650
 height = 500    
 area_min = 0.05 * (width * height)  # Área mínima para detectar objetos
 threshold_x = int(0.15 *width)
 threshold_y = int(0.15 *height)
 
-
-def callback(x):
-    pass
+# Parametros en vivo; con 's' se guardan en el perfil para cargarlo en los scripts de vuelo
+params = ParamStore({'h_min': 52, 'h_max': 109, 's_min': 48, 's_max': 163, 'v_min': 28, 'v_max': 184})
+parser = make_parser('Calibracion del filtro HSV con la webcam.')
+parser.set_defaults(profile='profiles/ctest.json', hist='profiles/target_hist.npy')
+args = parser.parse_args()
+param_sources = start_param_sources(params, args)
 
 # Inicia la captura de la webcam
 cap = cv2.VideoCapture(0)
 
-# Crea una ventana para las trackbars
-cv2.namedWindow('Trackbars')
-# Define un tamaño personalizado para la ventana de trackbars
-cv2.resizeWindow('Trackbars', width, height)  # Ancho = 600 píxeles, Alto = 400 píxeles
+# Ventanas y teclado, o con --headless: teclas por stdin ('s', 'h', 'q') y sin ventanas
+display = make_display(args, streams=('Original', 'Mask', 'Filtrado'))
 
-# Crea trackbars para ajustar los valores H, S, V
-cv2.createTrackbar('H Min', 'Trackbars', 52, 179, callback)
-cv2.createTrackbar('H Max', 'Trackbars', 109, 179, callback)
-cv2.createTrackbar('S Min', 'Trackbars', 48, 255, callback)
-cv2.createTrackbar('S Max', 'Trackbars', 163, 255, callback)
-cv2.createTrackbar('V Min', 'Trackbars', 28, 255, callback)
-cv2.createTrackbar('V Max', 'Trackbars', 184, 255, callback)
+# Crea la ventana de trackbars (del tamaño de la imagen) para ajustar los valores H, S, V
+# (cada cambio va directo a los parametros)
+trackbars = display.trackbars(params, size=(width, height))
+
+# La webcam entrega BGR, asi que se convierte directo de BGR a HSV
+pipeline = make_pipeline(width, height, *params.hsv_range(),
+                         conversion=WEBCAM_TO_HSV, pool=BufferPool(), direct=args.direct_lut,
+                         blobs='all')
 
 while True:
     # Lee la imagen de la webcam
@@ -35,93 +41,85 @@ while True:
     if not ret:
         break
 
-    frame = cv2.resize(frame, (width, height))  # Redimensiona la imagen
-    # Convierte la imagen de BGR a HSV
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-    # Obtiene los valores de las trackbars
-    h_min = cv2.getTrackbarPos('H Min', 'Trackbars')
-    s_min = cv2.getTrackbarPos('S Min', 'Trackbars')
-    v_min = cv2.getTrackbarPos('V Min', 'Trackbars')
-    h_max = cv2.getTrackbarPos('H Max', 'Trackbars')
-    s_max = cv2.getTrackbarPos('S Max', 'Trackbars')
-    v_max = cv2.getTrackbarPos('V Max', 'Trackbars')
+    # Actualiza los límites del filtro HSV solo si cambio algun parametro
+    if pipeline.sync(params) and trackbars is not None:
+        trackbars.sync()
 
-    # Define los límites del filtro HSV
-    lower_hsv = np.array([h_min, s_min, v_min])
-    upper_hsv = np.array([h_max, s_max, v_max])
+    # Redimensiona, convierte a HSV, desenfoca, filtra, limpia y mide los objetos
+    processed = pipeline.run(frame)
+    frame, mask = processed.frame, processed.mask
 
-    # Aplica desenfoque gaussiano para reducir el ruido
-    blurred = cv2.GaussianBlur(hsv, (15, 15), 0)
-
-    # Aplica el filtro de color en la imagen desenfocada
-    mask = cv2.inRange(blurred, lower_hsv, upper_hsv)
-
-    # Erosión y dilatación para eliminar ruido en la máscara
-    mask = cv2.erode(mask, None, iterations=2)
-    mask = cv2.dilate(mask, None, iterations=2)
-
-    # Aplica la máscara a la imagen original
-    result = cv2.bitwise_and(frame, frame, mask=mask)
-
-    # Encuentra objetos segun el filtro de color
-    contours, hierarchy = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    # Aplica la máscara a la imagen original (fuera de la máscara el buffer se deja en negro), solo para mostrarla
+    show = display.attached
+    if show:
+        result = pipeline.pool.get('filtrado', frame.shape)
+        result.fill(0)
+        cv2.bitwise_and(frame, frame, dst=result, mask=mask)
     # Area min 5% del ancho y alto de la imagen
 
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if area > area_min:
-            cv2.drawContours(frame, contour, -1, (255, 0, 255), 7)
-            perimeter = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-            x, y, w, h = cv2.boundingRect(approx)
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 5)
-            center = (x + w // 2, y + h // 2)
-            cv2.circle(frame, center, 5, (0, 0, 255), cv2.FILLED)
-            
-            # revisamos si el objrto esta en la parte izquierda
-            if x + w // 2 < width // 2 - threshold_x:
-                cv2.putText(frame, "Izquierda", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-            # revisamos si el objeto esta en la parte derecha
-            elif x + w // 2 > width // 2 + threshold_x:
-                cv2.putText(frame, "Derecha", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            else:
-                cv2.putText(frame, "Centro", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            # revisamos si el objeto esta en la parte superior
-            
-            if y + h/2 < height // 2 - threshold_x:
-                cv2.putText(frame, "Arriba", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            
-            # revisamos si el objeto esta en la parte inferior
-            elif y+ h/2  > height // 2 + threshold_x:
-                cv2.putText(frame, "Abajo", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-            else:
-                cv2.putText(frame, "Centro", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-            
-            
-            
-    # Dibuja una linea vertical al centro de la imagen
-    cv2.line(frame, (width // 2 - threshold_x, 0), (width // 2 - threshold_x, height), (255, 0, 0), 2)
-    cv2.line(frame, (width // 2 + threshold_x, 0), (width // 2 + threshold_x, height), (255, 0, 0), 2)
-
-    # Dibuja una linea horizontal al centro de la imagen
-    cv2.line(frame, (0, height // 2 - threshold_y), (width, height // 2 - threshold_y), (255, 0, 0), 2)
-    cv2.line(frame, (0, height // 2 + threshold_y), (width, height // 2 + threshold_y), (255, 0, 0), 2)
-
-    # Dibuja un rectángulo en el centro de la imagen del area de detección
-    cv2.rectangle(frame, (width // 2 - threshold_x, height // 2 - threshold_y), (width // 2 + threshold_x, height // 2 + threshold_y), (0, 0, 255), 2)
-    
-    # Muestra la imagen original, la imagen filtrada y la imagen filtrada sobrepuesta en la original
-    cv2.imshow('Original', frame)
-    cv2.imshow('Mask', mask)
-    cv2.imshow('Filtrado', result)
-
+    # Area, caja y centro de todos los objetos vienen en arreglos; solo se recorren los que pasan area_min
+    blobs = processed.blobs.filter(area_min)
+    for i in range(len(blobs) if show else 0):
+        x, y, w, h = blobs.box(i)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 5)
+        center = (x + w // 2, y + h // 2)
+        cv2.circle(frame, center, 5, (0, 0, 255), cv2.FILLED)
+        
+        # revisamos si el objrto esta en la parte izquierda
+        if x + w // 2 < width // 2 - threshold_x:
+            cv2.putText(frame, "Izquierda", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+
+        # revisamos si el objeto esta en la parte derecha
+        elif x + w // 2 > width // 2 + threshold_x:
+            cv2.putText(frame, "Derecha", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        else:
+            cv2.putText(frame, "Centro", (10,20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        # revisamos si el objeto esta en la parte superior
+        
+        if y + h/2 < height // 2 - threshold_x:
+            cv2.putText(frame, "Arriba", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        
+        # revisamos si el objeto esta en la parte inferior
+        elif y+ h/2  > height // 2 + threshold_x:
+            cv2.putText(frame, "Abajo", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        else:
+            cv2.putText(frame, "Centro", (10,10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+
+        
+        
+        
+    if show:
+        # Dibuja una linea vertical al centro de la imagen
+        cv2.line(frame, (width // 2 - threshold_x, 0), (width // 2 - threshold_x, height), (255, 0, 0), 2)
+        cv2.line(frame, (width // 2 + threshold_x, 0), (width // 2 + threshold_x, height), (255, 0, 0), 2)
+
+        # Dibuja una linea horizontal al centro de la imagen
+        cv2.line(frame, (0, height // 2 - threshold_y), (width, height // 2 - threshold_y), (255, 0, 0), 2)
+        cv2.line(frame, (0, height // 2 + threshold_y), (width, height // 2 + threshold_y), (255, 0, 0), 2)
+
+        # Dibuja un rectángulo en el centro de la imagen del area de detección
+        cv2.rectangle(frame, (width // 2 - threshold_x, height // 2 - threshold_y), (width // 2 + threshold_x, height // 2 + threshold_y), (0, 0, 255), 2)
+
+        # Muestra la imagen original, la imagen filtrada y la imagen filtrada sobrepuesta en la original
+        display.show('Original', frame)
+        display.show('Mask', mask)
+        display.show('Filtrado', result)
+
+    key = display.key()
     # Salir cuando se presiona 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    if key == ord('q'):
         break
+    # Guarda el rango HSV actual en el perfil ('s')
+    if key == ord('s'):
+        params.save(args.profile, HSV_KEYS)
+        print("Perfil guardado en {}".format(args.profile))
+    # Guarda el histograma H-S del objeto mas grande para el motor camshift ('h')
+    if key == ord('h') and len(blobs):
+        save_histogram(args.hist, target_histogram(processed, blobs.box(blobs.largest())))
+        print("Histograma guardado en {}".format(args.hist))
 
 # Libera la captura y cierra las ventanas
+print("Buffers de vision: {} reservados, {} despues del primer cuadro".format(
+    pipeline.pool.allocations, pipeline.steady_allocations))
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+display.close()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import queue
+import sys
+import threading
+
+import cv2
+
+from params import TrackbarSource
+
+NO_KEY = 0xFF   # what `cv2.waitKey(1) & 0xFF` returns when nothing was pressed
+
+
+class StdinKeys:
+    """Keyboard without a GUI: every character typed on stdin is one key press.
+
+    The terminal is line-buffered, so keys arrive when Enter is pressed
+    ("t" + Enter takes off, "l" + Enter lands).
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdin
+        self._keys = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='StdinKeys', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        for line in self.stream:
+            for char in line.strip():
+                self._keys.put(ord(char) & 0xFF)
+
+    def read(self):
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            return NO_KEY
+
+
+class Display:
+    """Where the scripts' windows, sliders and keys come from.
+
+    Headless (`--headless`, a companion computer without a screen) there
+    are no windows, no trackbars and no GUI event loop: keys come from
+    stdin and `attached` is False, so the loops skip drawing, BGR copies
+    and mask composites that nobody would see. A `viewer`
+    (viewer.MjpegViewer) also gets every shown frame, and makes
+    `attached` True while someone is watching it; `streams` names the
+    windows the script shows, so the viewer can list them before any
+    frame was drawn.
+    """
+
+    def __init__(self, headless=False, viewer=None, streams=()):
+        self.headless = headless
+        self.viewer = viewer
+        if viewer is not None:
+            viewer.declare(streams)
+        self._keys = StdinKeys().start() if headless else None
+        # headless there is no waitKey pacing the loop, so block on the grabber instead
+        self.frame_timeout = 0.05 if headless else 0
+
+    @property
+    def attached(self):
+        """True when someone will see the frames, i.e. overlays are worth drawing."""
+        return not self.headless or (self.viewer is not None and self.viewer.has_clients)
+
+    def show(self, name, image):
+        if not self.headless:
+            cv2.imshow(name, image)
+        if self.viewer is not None:
+            self.viewer.submit(name, image)
+
+    def key(self):
+        """Next key press (`& 0xFF` code) or NO_KEY; also runs the GUI event loop."""
+        if self._keys is not None:
+            return self._keys.read()
+        return cv2.waitKey(1) & 0xFF
+
+    def trackbars(self, params, window='Trackbars', size=(600, 400)):
+        """HSV sliders pushing into `params`, or None when headless."""
+        if self.headless:
+            return None
+        cv2.namedWindow(window)
+        cv2.resizeWindow(window, *size)
+        return TrackbarSource(params, window)
+
+    def close(self):
+        if self.viewer is not None:
+            self.viewer.stop()
+            print(f"Viewer: {self.viewer.stats()}")
+        if not self.headless:
+            cv2.destroyAllWindows()
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+
+
+class TargetEstimator:
+    """Constant-velocity Kalman filter over the target centre and size.
+
+    Three independent position/velocity filters track cx, cy and the square
+    root of the area (a length, so it moves roughly linearly as the target
+    approaches). Measurements are stamped with the frame's capture time and
+    `predict(at)` extrapolates to any later time, so the control law acts
+    on where the target is now rather than where the frame saw it. Missing
+    detections only advance the prediction; after `max_coast` seconds
+    without one the track is dropped.
+
+    `process_noise` is the acceleration spectral density (px^2/s^3) and
+    `measurement_noise` the variance (px^2), both per axis: cx, cy, size.
+    """
+
+    def __init__(self, process_noise=(4000.0, 4000.0, 1000.0), measurement_noise=(25.0, 25.0, 16.0),
+                 max_coast=0.5, clock=time.monotonic):
+        self.q = np.array(process_noise, dtype=np.float64)
+        self.r = np.array(measurement_noise, dtype=np.float64)
+        self.max_coast = max_coast
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.position = None        # cx, cy, size
+        self.velocity = None        # per second
+        self.time = None            # timestamp the state refers to
+        self.last_measurement = None
+        # covariance [[p00, p01], [p01, p11]] per axis
+        self.p00 = self.p01 = self.p11 = None
+
+    @property
+    def tracking(self):
+        return self.position is not None
+
+    def update(self, measurement, timestamp):
+        """Fold in (cx, cy, area) measured at `timestamp`, or None for a miss."""
+        if measurement is None:
+            if self.tracking and timestamp - self.last_measurement > self.max_coast:
+                self.reset()
+            return
+        cx, cy, area = measurement
+        z = np.array((cx, cy, np.sqrt(max(area, 0.0))))
+        if not self.tracking:
+            self.position = z
+            self.velocity = np.zeros(3)
+            self.p00 = self.r.copy()
+            self.p01 = np.zeros(3)
+            # unknown velocity: start wide open
+            self.p11 = self.q.copy()
+        else:
+            self._advance(max(timestamp - self.time, 0.0))
+            s = self.p00 + self.r
+            k0 = self.p00 / s
+            k1 = self.p01 / s
+            innovation = z - self.position
+            self.position = self.position + k0 * innovation
+            self.velocity = self.velocity + k1 * innovation
+            self.p11 = self.p11 - k1 * self.p01
+            self.p00 = (1 - k0) * self.p00
+            self.p01 = (1 - k0) * self.p01
+        self.time = timestamp
+        self.last_measurement = timestamp
+
+    def _advance(self, dt):
+        self.position = self.position + self.velocity * dt
+        q = self.q
+        self.p00 = self.p00 + dt * 2 * self.p01 + dt * dt * self.p11 + q * dt ** 3 / 3
+        self.p01 = self.p01 + dt * self.p11 + q * dt * dt / 2
+        self.p11 = self.p11 + q * dt
+        self.time += dt
+
+    def predict(self, at=None):
+        """(cx, cy, area) extrapolated to time `at` (default: now), or None."""
+        if not self.tracking:
+            return None
+        if at is None:
+            at = self.clock()
+        # never extrapolate further than a coast would be allowed to run
+        dt = min(max(at - self.time, 0.0), self.max_coast)
+        cx, cy, size = self.position + self.velocity * dt
+        return cx, cy, max(size, 0.0) ** 2
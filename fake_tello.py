@@ -0,0 +1,348 @@
+import json
+import math
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from recorder import load_log
+from scenarios import tracking_metrics
+from telemetry import STATE_KEYS
+from tello_sim import DroneKinematics, SyntheticScene
+
+
+def _vision_metrics(samples):
+    if not samples:
+        return {}
+    ms = 1000 * np.asarray(samples)
+    return {'vision_ms_mean': round(float(ms.mean()), 3), 'vision_ms_p95': round(float(np.percentile(ms, 95)), 3)}
+
+
+class ReplayFrameRead:
+    """Stand-in for djitellopy's BackgroundFrameRead over a FakeTello source.
+
+    Realtime, a thread swaps in every frame at its recorded time, like the
+    drone's decoder would. Otherwise each read of `frame` moves on to the
+    next frame at once, so a synchronous FrameGrabber gets every frame
+    exactly once, as fast as the pipeline can take them. `stopped` turns
+    True at the end of the source.
+    """
+
+    def __init__(self, drone, realtime):
+        self.drone = drone
+        self.realtime = realtime
+        self.stopped = False
+        self._frame = None
+        self._thread = None
+
+    def start(self):
+        if self.realtime:
+            self._thread = threading.Thread(target=self._run, name='ReplayFrameRead', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopped = True
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        start = time.monotonic()
+        first = None
+        while not self.stopped:
+            item = self.drone._next_frame()
+            if item is None:
+                break
+            timestamp, image = item
+            if first is None:
+                first = timestamp
+            delay = start + (timestamp - first) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._frame = image
+        self.stopped = True
+
+    @property
+    def frame(self):
+        if not self.realtime and not self.stopped:
+            item = self.drone._next_frame()
+            if item is None:
+                self.stopped = True
+            else:
+                self._frame = item[1]
+        return self._frame
+
+
+class FakeTello:
+    """Tello stand-in that plays back a recorded session or a video file.
+
+    `path` is a FlightRecorder session directory (video, frame timestamps
+    and telemetry) or any video file (timestamps from its frame rate, a
+    flat fake state). rc packets are counted and kept in `commands`
+    instead of being sent, takeoff/land only flip `flying`. Scripts report
+    each frame's pipeline time and target box with `vision()` for the
+    summary in `stats()`.
+
+    With `realtime` frames arrive at their recorded pace and `clock` is
+    time.monotonic. Otherwise `clock` is virtual: it reads the timestamp
+    of the newest frame, so a run driven with it (synchronous grabber,
+    inline control loop) gives the same commands every time, however fast
+    the machine.
+    """
+
+    def __init__(self, path, realtime=True, battery=100, flight_height=80):
+        self.path = path
+        self.realtime = realtime
+        self.battery = battery
+        self.flight_height = flight_height
+        self.flying = False
+        self.commands = []      # (clock, lr, fb, ud, yaw)
+        self.frames = 0
+        self.detections = 0     # processed frames the script had a target box in
+        self._vision = []       # seconds of vision per processed frame
+
+        session = os.path.isdir(path)
+        video = os.path.join(path, 'video.mp4') if session else path
+        self._capture = cv2.VideoCapture(video)
+        if not self._capture.isOpened():
+            raise IOError(f"Cannot open replay source: {video}")
+        self._timestamps = load_log(path, 'frames').get('t') if session else None
+        self._telemetry = load_log(path, 'telemetry') if session else {}
+        self._fps = self._capture.get(cv2.CAP_PROP_FPS) or 30
+        self._lock = threading.Lock()
+        self.media_time = self._timestamp(0)
+        self._frame_read = None
+        self._state = None
+        self._state_key = None
+
+    def _timestamp(self, index):
+        if self._timestamps is not None and index < len(self._timestamps):
+            return float(self._timestamps[index])
+        return index / self._fps
+
+    def _next_frame(self):
+        ok, image = self._capture.read()
+        if not ok:
+            return None
+        with self._lock:
+            timestamp = self._timestamp(self.frames)
+            self.frames += 1
+            self.media_time = timestamp
+        # djitellopy frames are RGB
+        return timestamp, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def vision(self, elapsed, box=None, size=None):
+        """Record one processed frame: the seconds its vision pipeline took and
+        the target box the script followed, (x, y, w, h) in pixels of a
+        `size` = (width, height) view, or None."""
+        self._vision.append(elapsed)
+        if box is not None:
+            self.detections += 1
+
+    def clock(self):
+        if self.realtime:
+            return time.monotonic()
+        with self._lock:
+            return self.media_time
+
+    # --- the djitellopy.Tello calls the scripts make ---
+
+    def connect(self):
+        pass
+
+    def streamon(self):
+        pass
+
+    def streamoff(self):
+        if self._frame_read is not None:
+            self._frame_read.stop()
+
+    def end(self):
+        self.streamoff()
+        self._capture.release()
+
+    def get_frame_read(self):
+        if self._frame_read is None:
+            self._frame_read = ReplayFrameRead(self, self.realtime).start()
+        return self._frame_read
+
+    def takeoff(self):
+        self.flying = True
+
+    def land(self):
+        self.flying = False
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        self.commands.append((self.clock(), left_right_velocity, forward_backward_velocity,
+                              up_down_velocity, yaw_velocity))
+
+    def get_current_state(self):
+        """Recorded state at the current frame; a new dict only when it changes, like djitellopy."""
+        row = None
+        if 't' in self._telemetry:
+            row = int(np.searchsorted(self._telemetry['t'], self.media_time, 'right')) - 1
+        key = (row, self.flying)
+        if key != self._state_key:
+            self._state_key = key
+            if row is not None and row >= 0:
+                self._state = {STATE_KEYS[field]: int(self._telemetry[field][row]) for field in STATE_KEYS}
+            else:
+                self._state = dict.fromkeys(STATE_KEYS.values(), 0)
+                self._state['bat'] = self.battery
+                self._state['h'] = self.flight_height if self.flying else 0
+        return self._state
+
+    def get_battery(self):
+        return self.get_current_state()['bat']
+
+    def get_height(self):
+        return self.get_current_state()['h']
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'media_seconds': round(self.media_time - self._timestamp(0), 2),
+            'commands': len(self.commands),
+            'detections': self.detections,
+            **_vision_metrics(self._vision),
+        }
+
+
+class SyntheticTello(FakeTello):
+    """FakeTello flying a scenarios.Scenario in closed loop.
+
+    Frames are rendered from tello_sim's kinematics and synthetic scene,
+    and the rc commands the script sends move the drone, so the script's
+    detection and control laws close the loop. Every frame the true ball
+    position is sampled, and the box the script reports with `vision()` is
+    checked against it: detected when there is one, locked when its centre
+    lies on the ball. When the scenario ends the source stops and the
+    metrics (scenarios.tracking_metrics, where only locked frames count as
+    centred, detected fraction, rc packets per second, CPU and wall time the
+    script spent per frame outside the simulator, and the vision times it
+    reported) go to `stats()` and, when `results` is set, to that JSON file.
+    """
+
+    def __init__(self, name, scenario, realtime=True, fps=30, results=None):
+        # nothing to open: frames and state come from the simulation
+        self.path = f'synthetic:{name}'
+        self.name = name
+        self.scenario = scenario
+        self.realtime = realtime
+        self.fps = fps
+        self.results = results
+        self.flying = False
+        self.commands = []
+        self.frames = 0
+        self.detections = 0
+        self.media_time = 0.0
+        self.metrics = {}
+        self.kinematics = DroneKinematics(takeoff_height=scenario.height, distance=scenario.distance,
+                                          yaw=scenario.yaw)
+        self.scene = SyntheticScene(radius=scenario.radius, target=scenario.target)
+        self._lock = threading.Lock()
+        self._frame_read = None
+        self._state = None
+        self._state_key = None
+        self._samples = []      # (t, error x, error y) in half-frames, NaN out of view
+        self._balls = []        # true ball (u, v, r) in frame pixels, None out of view
+        self._boxes = {}        # frame index -> centre of the script's box, frame pixels
+        self._cpu = []
+        self._wall = []
+        self._vision = []
+        self._left = None       # process/wall time when the last frame was handed out
+
+    def _next_frame(self):
+        cpu, wall = time.process_time(), time.perf_counter()
+        if self._left is not None:
+            self._cpu.append(cpu - self._left[0])
+            self._wall.append(wall - self._left[1])
+        if self.frames >= self.scenario.duration * self.fps:
+            self._finish()
+            return None
+        with self._lock:
+            timestamp = self.frames / self.fps
+            if self.frames:
+                self.kinematics.step(1 / self.fps)
+            self.frames += 1
+            self.media_time = timestamp
+            ball = self.scene.project(self.kinematics, timestamp)
+            image = self.scene.render(self.kinematics, timestamp)
+        width, height = self.scene.size
+        if ball is None or not (0 <= ball[0] < width and 0 <= ball[1] < height):
+            self._samples.append((timestamp, np.nan, np.nan))
+            self._balls.append(None)
+        else:
+            self._balls.append(ball)
+            self._samples.append((timestamp, (ball[0] - width / 2) / (width / 2),
+                                  (ball[1] - height / 2) / (height / 2)))
+        self._left = (time.process_time(), time.perf_counter())
+        return timestamp, image
+
+    def vision(self, elapsed, box=None, size=None):
+        super().vision(elapsed, box, size)
+        if box is None:
+            return
+        x, y, w, h = box
+        width, height = self.scene.size
+        with self._lock:
+            # the frame the script just processed: the last one handed out
+            self._boxes[self.frames - 1] = ((x + w / 2) * width / size[0], (y + h / 2) * height / size[1])
+
+    def _locked(self, index):
+        ball, centre = self._balls[index], self._boxes.get(index)
+        return ball is not None and centre is not None and \
+            math.hypot(centre[0] - ball[0], centre[1] - ball[1]) <= ball[2]
+
+    def _finish(self):
+        t, error_x, error_y = zip(*self._samples) if self._samples else ((), (), ())
+        locked = [self._locked(i) for i in range(len(self._samples))]
+        self.metrics = tracking_metrics(t, error_x, error_y, locked=locked)
+        self.metrics['detected_fraction'] = round(len(self._boxes) / max(len(self._samples), 1), 4)
+        self.metrics['commands_per_s'] = round(len(self.commands) / self.scenario.duration, 2)
+        if self._cpu:
+            self.metrics['cpu_ms_per_frame'] = round(1000 * float(np.mean(self._cpu)), 3)
+            self.metrics['loop_ms_p50'] = round(1000 * float(np.percentile(self._wall, 50)), 3)
+            self.metrics['loop_ms_p95'] = round(1000 * float(np.percentile(self._wall, 95)), 3)
+        self.metrics.update(_vision_metrics(self._vision))
+        self.metrics['final_distance_cm'] = round(self.kinematics.distance, 1)
+        if self.results:
+            with open(self.results, 'w') as f:
+                json.dump({'scenario': self.name, 'frames': self.frames, 'fps': self.fps,
+                           'realtime': self.realtime, **self.metrics}, f, indent=2)
+
+    def end(self):
+        self.streamoff()
+
+    def takeoff(self):
+        with self._lock:
+            self.flying = True
+            self.kinematics.takeoff()
+
+    def land(self):
+        with self._lock:
+            self.flying = False
+            self.kinematics.land()
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        super().send_rc_control(left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+        with self._lock:
+            self.kinematics.rc = (left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity)
+
+    def get_current_state(self):
+        with self._lock:
+            key = (self.frames, self.flying)
+            if key != self._state_key:
+                self._state_key = key
+                drone = self.kinematics
+                vgx, vgy, vgz = (int(v / 10) for v in drone.velocity)
+                self._state = {'bat': int(drone.battery), 'h': int(drone.height), 'pitch': 0, 'roll': 0,
+                               'yaw': int(drone.yaw), 'vgx': vgx, 'vgy': vgy, 'vgz': vgz}
+        return self._state
+
+    def stats(self):
+        return {'scenario': self.name, 'frames': self.frames, 'commands': len(self.commands),
+                'detections': self.detections, **self.metrics}
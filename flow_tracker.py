@@ -0,0 +1,138 @@
+import math
+import time
+
+import cv2
+import numpy as np
+
+
+class FlowTracker:
+    """Carries the target box between colour detections with Lucas-Kanade flow.
+
+    Each detection seeds up to `max_points` corners inside the box; on the
+    frames in between, pyramidal LK moves them and the box follows their
+    median shift and spread. Points failing the forward-backward check are
+    dropped, and the track is lost when fewer than `min_points` (or less
+    than `min_confidence` of them) survive.
+
+    The detection interval adapts. The CPU side picks the smallest N whose
+    average per-frame cost (one detection plus N-1 flow steps) fits in
+    `budget` seconds. The motion side caps N so the target moves at most
+    `max_drift` pixels between detections; the cap wins over the CPU side,
+    since a drifted box costs a lost track. Ask `need_detection()` before
+    every frame, then report with `detected()` or call `track()`.
+    """
+
+    def __init__(self, budget=1 / 30, max_interval=10, max_drift=40, max_points=25, min_points=5,
+                 min_confidence=0.5, win_size=(15, 15), levels=2, max_fb_error=1.0,
+                 code=cv2.COLOR_RGB2GRAY):
+        self.budget = budget
+        self.max_interval = max_interval
+        self.max_drift = max_drift
+        self.max_points = max_points
+        self.min_points = min_points
+        self.min_confidence = min_confidence
+        self.lk_params = dict(winSize=win_size, maxLevel=levels,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.max_fb_error = max_fb_error
+        self.code = code
+
+        self.interval = 1
+        self.motion = 0.0           # px per frame, smoothed
+        self.detect_cost = 0.0      # seconds, smoothed
+        self.flow_cost = 0.0
+        self.detect_frames = 0
+        self.flow_frames = 0
+        self.losses = 0
+
+        self.box = None             # x, y, w, h as floats, None when not tracking
+        self.points = None
+        self._since_detect = 0
+        self._gray = [None, None]   # ping-pong: previous and current frame
+
+    @property
+    def tracking(self):
+        return self.box is not None
+
+    def need_detection(self):
+        return not self.tracking or self._since_detect >= self.interval
+
+    def _to_gray(self, frame):
+        self._gray.reverse()
+        self._gray[1] = cv2.cvtColor(frame, self.code, dst=self._gray[1])
+        return self._gray[1]
+
+    def detected(self, frame, box, cost):
+        """Restart from a detection frame's box (None if nothing was found)."""
+        self.detect_frames += 1
+        self.detect_cost = cost if not self.detect_cost else 0.8 * self.detect_cost + 0.2 * cost
+        self._since_detect = 1
+        gray = self._to_gray(frame)
+        self.box = None
+        self.points = None
+        if box is not None:
+            x, y, w, h = box
+            corners = cv2.goodFeaturesToTrack(gray[y:y + h, x:x + w], self.max_points, 0.01, 5)
+            if corners is not None and len(corners) >= self.min_points:
+                self.points = corners + np.float32((x, y))
+                self.box = tuple(float(v) for v in box)
+        self._retime()
+
+    def track(self, frame):
+        """Box (x, y, w, h) moved by flow onto `frame`, or None once the track is lost."""
+        start = time.perf_counter()
+        self.flow_frames += 1
+        self._since_detect += 1
+        prev = self._gray[1]
+        gray = self._to_gray(frame)
+        if self.box is None:
+            return None
+
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, self.points, None, **self.lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev, moved, None, **self.lk_params)
+        error = np.linalg.norm((back - self.points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.max_fb_error)
+        kept = int(good.sum())
+        if kept < self.min_points or kept < self.min_confidence * len(good):
+            self.box = None
+            self.points = None
+            self.losses += 1
+            return None
+
+        old = self.points[good].reshape(-1, 2)
+        new = moved[good].reshape(-1, 2)
+        shift = np.median(new - old, axis=0)
+        spread_old = np.median(np.linalg.norm(old - old.mean(axis=0), axis=1))
+        spread_new = np.median(np.linalg.norm(new - new.mean(axis=0), axis=1))
+        scale = spread_new / spread_old if spread_old > 1e-3 else 1.0
+
+        x, y, w, h = self.box
+        cx = x + w / 2 + shift[0]
+        cy = y + h / 2 + shift[1]
+        w, h = w * scale, h * scale
+        self.box = (cx - w / 2, cy - h / 2, w, h)
+        self.points = moved[good]
+        self.motion = 0.8 * self.motion + 0.2 * float(np.hypot(*shift))
+
+        cost = time.perf_counter() - start
+        self.flow_cost = cost if not self.flow_cost else 0.8 * self.flow_cost + 0.2 * cost
+        self._retime()
+        return tuple(int(round(v)) for v in self.box)
+
+    def _retime(self):
+        n_cpu = 1
+        if self.detect_cost > self.budget:
+            spare = self.budget - self.flow_cost
+            n_cpu = self.max_interval if spare <= 0 else \
+                math.ceil((self.detect_cost - self.flow_cost) / spare)
+        n_motion = int(self.max_drift / self.motion) if self.motion > 0 else self.max_interval
+        self.interval = max(1, min(n_cpu, n_motion, self.max_interval))
+
+    def stats(self):
+        return {
+            'detect_frames': self.detect_frames,
+            'flow_frames': self.flow_frames,
+            'losses': self.losses,
+            'interval': self.interval,
+            'detect_ms': round(1000 * self.detect_cost, 2),
+            'flow_ms': round(1000 * self.flow_cost, 2),
+        }
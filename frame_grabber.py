@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import namedtuple
+
+# seq: monotonic frame number (starts at 1), timestamp: monotonic clock at capture
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'image'])
+
+
+class FrameGrabber:
+    """Grabs decoded frames from the drone on its own thread.
+
+    The newest `size` frames are kept in a ring buffer, each tagged with a
+    sequence number and capture timestamp. Frames are handed out by reference:
+    djitellopy allocates a new array for every decoded frame, so consumers
+    must treat `Frame.image` as read-only and copy/convert before drawing.
+    Callbacks registered with `on_frame` get every new Frame on the grabber
+    thread and must return quickly.
+
+    `synchronous` grabbers have no thread: `wait_newer()` and `newer_than()`
+    poll the source themselves, so every frame of a replay (fake_tello.py)
+    is processed in order and none is skipped.
+    """
+
+    def __init__(self, frame_read, size=4, poll_interval=0.002, clock=time.monotonic, synchronous=False):
+        self.frame_read = frame_read
+        self.size = size
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.synchronous = synchronous
+
+        self._ring = [None] * size
+        self._seq = 0
+        self._last_image = None
+        self._callbacks = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self.synchronous:
+            self._running = True
+        elif self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='FrameGrabber', daemon=True)
+            self._thread.start()
+        return self
+
+    def on_frame(self, callback):
+        """Call `callback(frame)` for every new frame."""
+        self._callbacks.append(callback)
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run(self):
+        while self._running:
+            if not self._poll():
+                time.sleep(self.poll_interval)
+
+    def _poll(self):
+        # djitellopy swaps in a new array for every decoded frame,
+        # so an identity check is enough to spot a new one
+        image = self.frame_read.frame
+        if image is None or image is self._last_image:
+            return False
+        self._last_image = image
+        with self._cond:
+            self._seq += 1
+            frame = Frame(self._seq, self.clock(), image)
+            self._ring[self._seq % self.size] = frame
+            self._cond.notify_all()
+        for callback in self._callbacks:
+            callback(frame)
+        return True
+
+    @property
+    def finished(self):
+        """True once the source has stopped (end of a replay, stream closed)."""
+        return getattr(self.frame_read, 'stopped', False)
+
+    @property
+    def seq(self):
+        """Sequence number of the newest frame (0 before the first one)."""
+        return self._seq
+
+    def latest(self):
+        """Newest frame, or None if nothing has been decoded yet."""
+        with self._cond:
+            if self._seq == 0:
+                return None
+            return self._ring[self._seq % self.size]
+
+    def newer_than(self, seq):
+        """Newest frame with a sequence number greater than `seq`, or None."""
+        if self.synchronous:
+            self._poll()
+        with self._cond:
+            if self._seq <= seq:
+                return None
+            return self._ring[self._seq % self.size]
+
+    def wait_newer(self, seq, timeout=None):
+        """Block until a frame newer than `seq` arrives; None on timeout."""
+        if self.synchronous:
+            self._poll()
+        with self._cond:
+            if self._seq <= seq:
+                self._cond.wait_for(lambda: self._seq > seq or not self._running, timeout)
+            if self._seq <= seq:
+                return None
+            return self._ring[self._seq % self.size]
+
+    def get(self, seq):
+        """Frame `seq` if it is still in the ring buffer, otherwise None."""
+        with self._cond:
+            frame = self._ring[seq % self.size]
+            if frame is None or frame.seq != seq:
+                return None
+            return frame
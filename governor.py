@@ -0,0 +1,85 @@
+import time
+
+# vision quality ladder, best first; blur is in display pixels (stages scale it with detect_scale)
+QUALITY_LEVELS = (
+    {'detect_scale': 1.0, 'blur': 15, 'erode': 2, 'dilate': 2},
+    {'detect_scale': 0.75, 'blur': 11, 'erode': 2, 'dilate': 2},
+    {'detect_scale': 0.5, 'blur': 9, 'erode': 2, 'dilate': 2},
+    {'detect_scale': 0.5, 'blur': 5, 'erode': 1, 'dilate': 1},
+    {'detect_scale': 0.25, 'blur': 5, 'erode': 1, 'dilate': 1},
+    {'detect_scale': 0.25, 'blur': 1, 'erode': 0, 'dilate': 0},
+)
+# every detection scale the ladder visits, for Pipeline.preallocate
+QUALITY_SCALES = tuple(sorted({level['detect_scale'] for level in QUALITY_LEVELS}))
+
+
+class QualityGovernor:
+    """Trades detection resolution, blur and morphology for the frame deadline.
+
+    Feed it the vision time of every full pipeline pass. When the smoothed
+    time stays above `high` x `budget` for `down_after` frames it moves one
+    step down QUALITY_LEVELS; below `low` x `budget` for `up_after` frames
+    it moves one step up. Steps are written into the ParamStore, so the
+    pipeline picks them up on its next `sync()`, and every change is logged
+    with the time that caused it.
+    """
+
+    def __init__(self, params, budget=1 / 30, levels=QUALITY_LEVELS, high=0.9, low=0.5,
+                 down_after=5, up_after=60, smoothing=0.2, log=print, clock=time.monotonic):
+        self.params = params
+        self.budget = budget
+        self.levels = levels
+        self.high = high
+        self.low = low
+        self.down_after = down_after
+        self.up_after = up_after
+        self.smoothing = smoothing
+        self.log = log
+        self.clock = clock
+
+        self.level = 0
+        self.average = None
+        self.frames = 0
+        self.changes = []       # (time, from level, to level, smoothed seconds)
+        self._over = 0
+        self._under = 0
+        params.update(levels[0])
+
+    def observe(self, elapsed):
+        self.frames += 1
+        if self.average is None:
+            self.average = elapsed
+        else:
+            self.average += self.smoothing * (elapsed - self.average)
+
+        if self.average > self.high * self.budget:
+            self._over += 1
+            self._under = 0
+        elif self.average < self.low * self.budget:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_after and self.level < len(self.levels) - 1:
+            self._step(self.level + 1, 'over budget')
+        elif self._under >= self.up_after and self.level > 0:
+            self._step(self.level - 1, 'headroom')
+
+    def _step(self, level, reason):
+        self.changes.append((self.clock(), self.level, level, self.average))
+        self.log(f"Vision quality {self.level} -> {level} ({reason}: {1000 * self.average:.1f} ms "
+                 f"against {1000 * self.budget:.1f} ms): {self.levels[level]}")
+        self.level = level
+        self.params.update(self.levels[level])
+        # the new settings need their own measurements
+        self.average = None
+        self._over = self._under = 0
+
+    def stats(self):
+        return {
+            'level': self.level,
+            'changes': len(self.changes),
+            'frames': self.frames,
+            'vision_ms': round(1000 * self.average, 2) if self.average is not None else None,
+        }
@@ -0,0 +1,176 @@
+import cv2
+import numpy as np
+
+from params import hsv_range, has_hsv_range
+
+MAX_RANGES = 8      # one bit per range in a uint8 mask
+
+
+def _inside(lo, hi, wrap=False):
+    values = np.arange(256)
+    if wrap and lo > hi:
+        # e.g. red: H Min 170, H Max 10 -> 170..179 plus 0..10 (8-bit hue stops at 179)
+        return (values >= lo) | (values <= hi)
+    return (values >= lo) & (values <= hi)
+
+
+class HsvLut:
+    """HSV ranges compiled into one 256-entry lookup table per channel.
+
+    Bit i of a table entry says the channel value lies inside range i, so
+    `cv2.LUT` followed by an AND of the three channels tests every range in
+    one pass. Hue ranges with H Min > H Max wrap past 179. With a single
+    range the entries are 0/255 and the AND is already the final mask.
+    Tables are rebuilt only when the ranges change.
+    """
+
+    def __init__(self, ranges=()):
+        self.ranges = None
+        self.table = None
+        self.set_ranges(ranges)
+
+    def set_ranges(self, ranges):
+        ranges = tuple((tuple(lower), tuple(upper)) for lower, upper in ranges)
+        if ranges == self.ranges:
+            return False
+        if len(ranges) > MAX_RANGES:
+            raise ValueError(f"At most {MAX_RANGES} HSV ranges, got {len(ranges)}")
+        self.ranges = ranges
+        self.table = self.compile(ranges)
+        return True
+
+    @staticmethod
+    def compile(ranges):
+        table = np.zeros((1, 256, 3), np.uint8)
+        for i, (lower, upper) in enumerate(ranges):
+            bit = 255 if len(ranges) == 1 else 1 << i
+            for channel in range(3):
+                inside = _inside(lower[channel], upper[channel], wrap=channel == 0)
+                table[0, inside, channel] |= bit
+        return table
+
+    def apply(self, hsv, mapped=None, bits=None, plane=None):
+        """Per-pixel range bits for an HSV image (bit i set where range i matches)."""
+        mapped = cv2.LUT(hsv, self.table, dst=mapped)
+        # contiguous planes and cv2.bitwise_and: numpy ANDs over strided channel views are several times slower
+        bits = cv2.extractChannel(mapped, 0, dst=bits)
+        for channel in (1, 2):
+            plane = cv2.extractChannel(mapped, channel, dst=plane)
+            bits = cv2.bitwise_and(bits, plane, dst=bits)
+        return bits
+
+    def rgb_table(self, code=cv2.COLOR_RGB2HSV):
+        """16M-entry table mapping packed camera pixels straight to range bits.
+
+        Index is (c0 << 16) | (c1 << 8) | c2 in the camera's channel order;
+        `code` is the conversion that order would need to reach HSV. Takes
+        a few hundred ms and 16 MB, so rebuild it only when the ranges change.
+        """
+        values = np.arange(256, dtype=np.uint8)
+        cube = np.empty((256, 256, 256, 3), np.uint8)
+        cube[..., 0] = values[:, None, None]
+        cube[..., 1] = values[None, :, None]
+        cube[..., 2] = values[None, None, :]
+        cube = cube.reshape(4096, 4096, 3)
+        return self.apply(cv2.cvtColor(cube, code)).reshape(-1)
+
+
+def _in_range_bounds(lower, upper):
+    """cv2.inRange bound pairs for one range; a wrapped hue needs two passes."""
+    lower, upper = np.array(lower), np.array(upper)
+    if lower[0] <= upper[0]:
+        return [(lower, upper)]
+    return [(lower, np.array([255, upper[1], upper[2]])), (np.array([0, lower[1], lower[2]]), upper)]
+
+
+class LutThreshold:
+    """Pipeline threshold stage backed by HsvLut; drop-in for vision.HsvThreshold.
+
+    A single range goes through cv2.inRange (twice, OR-ed, when the hue
+    wraps), which beats the table lookup at every frame size; the tables
+    only run when several ranges share the pass.
+    """
+    name = 'threshold'
+
+    def __init__(self, lower, upper):
+        self.lut = HsvLut()
+        self.bounds = None
+        self.set_range(lower, upper)
+
+    def set_range(self, lower, upper):
+        return self.set_ranges([(lower, upper)])
+
+    def set_ranges(self, ranges):
+        if not self.lut.set_ranges(ranges) and self.bounds is not None:
+            return False
+        self.bounds = _in_range_bounds(*self.lut.ranges[0]) if len(self.lut.ranges) == 1 else None
+        return True
+
+    def configure(self, values):
+        # range 0 is the live (trackbar) range, 'colors' adds more profiles to the same pass
+        if has_hsv_range(values):
+            self.set_ranges([hsv_range(values)] + list(values.get('colors', ())))
+
+    def __call__(self, ctx):
+        src = ctx.blurred
+        shape = src.shape[:2]
+        ctx.colors = len(self.lut.ranges)
+        if self.bounds is not None:
+            mask = ctx.buffer('mask', shape)
+            for i, (lower, upper) in enumerate(self.bounds):
+                if i == 0:
+                    mask = cv2.inRange(src, lower, upper, dst=mask)
+                else:
+                    part = cv2.inRange(src, lower, upper, dst=ctx.buffer('mask_wrap', shape))
+                    mask = cv2.bitwise_or(mask, part, dst=mask)
+            # one range: bit 0 is the whole mask, as with a single-range table
+            ctx.bits = ctx.mask = mask
+            return
+        ctx.bits = self.lut.apply(src, ctx.buffer('lut', src.shape), ctx.buffer('bits', shape),
+                                  ctx.buffer('lut_plane', shape))
+        _, ctx.mask = cv2.threshold(ctx.bits, 0, 255, cv2.THRESH_BINARY, dst=ctx.buffer('mask', shape))
+
+
+class DirectLutThreshold:
+    """Threshold stage that maps resized camera pixels straight to mask values.
+
+    Replaces the convert, blur and threshold stages: no HSV image is built
+    (make_pipeline(direct=True), --direct-lut). The camera-to-bits table is
+    recompiled (slow) only when the ranges change.
+    """
+    name = 'threshold'
+
+    def __init__(self, lower, upper, code=cv2.COLOR_RGB2HSV):
+        self.lut = HsvLut()
+        self.code = code
+        self.table = None
+        self.set_range(lower, upper)
+
+    def set_range(self, lower, upper):
+        return self.set_ranges([(lower, upper)])
+
+    def set_ranges(self, ranges):
+        if self.lut.set_ranges(ranges) or self.table is None:
+            self.table = self.lut.rgb_table(self.code)
+            return True
+        return False
+
+    def configure(self, values):
+        if has_hsv_range(values):
+            self.set_ranges([hsv_range(values)] + list(values.get('colors', ())))
+
+    def __call__(self, ctx):
+        src = ctx.detect
+        shape = src.shape[:2]
+        index = np.left_shift(src[..., 0], 16, out=ctx.buffer('lut_index', shape, np.uint32), dtype=np.uint32)
+        shifted = np.left_shift(src[..., 1], 8, out=ctx.buffer('lut_shift', shape, np.uint32), dtype=np.uint32)
+        np.bitwise_or(index, shifted, out=index)
+        np.bitwise_or(index, src[..., 2], out=index)
+        ctx.colors = len(self.lut.ranges)
+        # mode='clip' keeps np.take from buffering the output; indices are always in range
+        ctx.bits = np.take(self.table, index, out=ctx.buffer('bits', shape), mode='clip')
+        if len(self.lut.ranges) == 1:
+            ctx.mask = ctx.bits
+        else:
+            _, ctx.mask = cv2.threshold(ctx.bits, 0, 255, cv2.THRESH_BINARY,
+                                        dst=ctx.buffer('mask', src.shape[:2]))
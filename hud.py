@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+
+
+class Hud:
+    """On-screen overlay rendered once and stamped onto every frame.
+
+    Static geometry (guides, dead-zone) is recorded with `line()` and
+    `rectangle()` and rendered a single time. Text layers are set every
+    frame with `text(name, ...)` but only re-rendered when their content
+    changes. `apply(frame)` then copies the cached overlay onto the frame
+    in one masked cv2.copyTo. Drawing is done without anti-aliasing so the mask
+    covers exactly the drawn pixels.
+    """
+
+    def __init__(self):
+        self._static = []       # (cv2 function, args, kwargs)
+        self._texts = {}        # name -> (text, org, color, scale, thickness)
+        self._shape = None
+        self._static_canvas = None
+        self._static_mask = None
+        self.canvas = None
+        self.mask = None
+        self.dirty = True
+        self.renders = 0
+
+    def line(self, pt1, pt2, color, thickness=1):
+        self._add_static(cv2.line, pt1, pt2, color, thickness)
+
+    def rectangle(self, pt1, pt2, color, thickness=1):
+        self._add_static(cv2.rectangle, pt1, pt2, color, thickness)
+
+    def _add_static(self, draw, *args):
+        self._static.append((draw, args))
+        self._shape = None
+
+    def text(self, name, text, org=(10, 30), color=(0, 255, 0), scale=0.6, thickness=2):
+        """Set text layer `name`; None hides it. Costs nothing if unchanged."""
+        layer = None if text is None else (str(text), tuple(org), tuple(color), scale, thickness)
+        if self._texts.get(name) != layer:
+            self._texts[name] = layer
+            self.dirty = True
+
+    def _render_static(self, shape):
+        self._shape = shape
+        self._static_canvas = np.zeros(shape, np.uint8)
+        self._static_mask = np.zeros(shape[:2], np.uint8)
+        for draw, (pt1, pt2, color, thickness) in self._static:
+            draw(self._static_canvas, pt1, pt2, color, thickness)
+            draw(self._static_mask, pt1, pt2, 1, thickness)
+        self.canvas = np.empty(shape, np.uint8)
+        self.mask = np.empty(shape[:2], np.uint8)
+        self.dirty = True
+
+    def _render(self):
+        np.copyto(self.canvas, self._static_canvas)
+        np.copyto(self.mask, self._static_mask)
+        for layer in self._texts.values():
+            if layer is None:
+                continue
+            text, org, color, scale, thickness = layer
+            cv2.putText(self.canvas, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+            cv2.putText(self.mask, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 1, thickness)
+        self.dirty = False
+        self.renders += 1
+
+    def apply(self, frame):
+        """Stamp the overlay onto `frame` (BGR, modified in place) and return it."""
+        if self._shape != frame.shape:
+            self._render_static(frame.shape)
+        if self.dirty:
+            self._render()
+        # OpenCV's masked copy; np.copyto with a broadcast `where` is ~300x slower
+        cv2.copyTo(self.canvas, self.mask, frame)
+        return frame
@@ -1,14 +1,36 @@
-from djitellopy import Tello
 import cv2
 import time
 
-# Conectar al dron
-drone = Tello()
+from frame_grabber import FrameGrabber
+from telemetry import Telemetry
+from rc_arbiter import RcArbiter, PRIORITY_KEYBOARD
+from scheduler import FixedRateScheduler
+from hud import Hud
+from cli import make_parser, make_display, make_drone, frame_read, start_recorder
+
+CONTROL_HZ = 30  # Paquetes rc por segundo, independiente del video
+KEY_HOLD = 0.1   # Segundos que dura el comando de una tecla sin repeticion
+
+args = make_parser('Control del Tello con el teclado.', vision=False).parse_args()
+# Ventana de video y teclado, o con --headless solo teclas por stdin
+display = make_display(args, streams=('Video Stream',))
+
+# Conectar al dron (--tello-host para otro dron, p. ej. uno de tello_sim.py)
+drone = make_drone(args)
 drone.connect()
 
 #iniciar stream de video
 drone.streamon()
 time.sleep(3)
+grabber = FrameGrabber(frame_read(drone)).start()
+telemetry = Telemetry(drone)
+arbiter = RcArbiter(drone)
+# --record: cuadros, telemetria y paquetes rc a una sesion, escritos fuera del lazo de control
+recorder = start_recorder(args, grabber, telemetry, arbiter)
+control_loop = FixedRateScheduler(arbiter.tick, CONTROL_HZ).start()
+telemetry.on_change('battery', lambda old, new: print("Bateria: {}%".format(new)))
+# Textos del video: solo se vuelven a dibujar cuando cambia su valor
+hud = Hud()
 
 global flying
 
@@ -16,10 +38,16 @@ def clean_exit():
     
     print("\nCerrando el programa...")
     if flying:
-        drone.send_rc_control(0, 0, 0, 0)
+        arbiter.stop()
         time.sleep(1)
         drone.land()
-    cv2.destroyAllWindows()
+    control_loop.stop()
+    print("Lazo de control: {}".format(control_loop.stats()))
+    grabber.stop()
+    if recorder is not None:
+        recorder.stop()
+        print("Grabacion: {}".format(recorder.stats()))
+    display.close()
     drone.streamoff()
     drone.end()
     print("Programa cerrado correctamente.")
@@ -33,47 +61,55 @@ def control():
     lr_vel = 0
     ud_vel = 0
     yaw_vel = 0
+    last_key_time = 0
+    last_seq = 0
 
 
     while True:
         
-        frame = drone.get_frame_read().frame
-        if frame is None:
+        # El video marca el ritmo de esta vuelta; el control corre aparte a CONTROL_HZ
+        latest = grabber.wait_newer(last_seq, timeout=0.1)
+        if latest is None:
             print('No se recibio el cuadro')
             continue
+        last_seq = latest.seq
 
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        cv2.putText(frame, "Battery: {}%".format(drone.get_battery()), 
-                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.putText(frame, "Height: {}cm".format(drone.get_height()), 
-                    (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        # Una sola lectura del estado por vuelta
+        state = telemetry.refresh()
+
+        # Sin paquete de estado todavia la bateria es None: no se despega hasta conocerla
+        known = state.battery is not None
+        hud.text('battery', "Battery: {}%".format(state.battery if known else '--'), (10, 30), (0, 255, 0), 1)
+        hud.text('height', "Height: {}cm".format(state.height), (10, 60), (0, 255, 0), 1)
+        if state.height <= 300:
+            hud.text('height_warning', None)
         if flying:
-            cv2.putText(frame, "Flying", (10, 90), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            hud.text('state', "Flying", (10, 90), (0, 255, 0), 1)
         else:
-            cv2.putText(frame, "Landed", (10, 90), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            
-        if drone.get_battery() <= 15 and not flying:
-            cv2.putText(frame, "Bateria baja. No se puede despegar.", (10, 150), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            hud.text('state', "Landed", (10, 90), (0, 0, 255), 1)
             
+        hud.text('low', "Bateria baja. No se puede despegar." if known and state.battery <= 15 and not flying else None,
+                 (10, 150), (0, 0, 255), 1)
             
-        if drone.get_battery() <= 10 and flying:
-            cv2.putText(frame, "Bateria crítica. Aterrizando automaticamente.", (10, 180), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        critical = known and state.battery <= 10 and flying
+        hud.text('critical', "Bateria crítica. Aterrizando automaticamente." if critical else None,
+                 (10, 180), (0, 0, 255), 1)
+        if critical:
             drone.land()
             flying = False
             
         
-        cv2.imshow('Video Stream', frame)
-        key = cv2.waitKey(50) & 0xFF
+        # Copia, textos y ventana solo si hay quien los vea
+        if display.attached:
+            frame = cv2.cvtColor(latest.image, cv2.COLOR_BGR2RGB)
+            display.show('Video Stream', hud.apply(frame))
+        key = display.key()
         
 
-        '''if drone.get_height() > 300 and ud_vel > 0:
+        '''if state.height > 300 and ud_vel > 0:
             print("Altura máxima alcanzada. No se puede subir más.")
             ud_vel = 0
-            drone.send_rc_control(0, 0, 0, 0)
+            arbiter.stop()
             drone.land()'''
 
         if key == ord('p'):
@@ -88,7 +124,7 @@ def control():
             if flying:
                 pass
             else:
-                if drone.get_battery() <= 15 and not flying:
+                if state.battery is None or state.battery <= 15:
                     pass
                 else:
                     drone.takeoff()
@@ -102,6 +138,8 @@ def control():
                 pass
         
         if flying:
+            if key != 0xFF:
+                last_key_time = time.monotonic()
             if key == ord('w'):
                 fb_vel = 100
             elif key == ord('s'):
@@ -111,9 +149,9 @@ def control():
             elif key == ord('d'):
                 lr_vel = 100
             elif key == ord('r'):
-                if drone.get_height() > 300:
-                    cv2.putText(frame, "Height Exceeded", (10, 120), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                if state.height > 300:
+                    # el cuadro ya se mostro: el aviso sale en el siguiente
+                    hud.text('height_warning', "Height Exceeded", (10, 120), (0, 0, 255), 1)
                     ud_vel = 0
                 else:
                     ud_vel = 60
@@ -123,14 +161,14 @@ def control():
                 yaw_vel = 100
             elif key == ord('e'):
                 yaw_vel = -100
-            else:
+            elif time.monotonic() - last_key_time > KEY_HOLD:
                 fb_vel = 0
                 lr_vel = 0
                 ud_vel = 0
                 yaw_vel = 0
             
 
-        drone.send_rc_control(lr_vel, fb_vel, ud_vel, yaw_vel)
+        arbiter.demand('keyboard', PRIORITY_KEYBOARD, lr=lr_vel, fb=fb_vel, ud=ud_vel, yaw=yaw_vel)
 
 
 
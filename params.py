@@ -0,0 +1,251 @@
+import json
+import math
+import os
+import socket
+import threading
+
+import cv2
+
+HSV_KEYS = ('h_min', 'h_max', 's_min', 's_max', 'v_min', 'v_max')
+
+# store key, trackbar label, trackbar max
+HSV_TRACKBARS = (
+    ('h_min', 'H Min', 179), ('h_max', 'H Max', 179),
+    ('s_min', 'S Min', 255), ('s_max', 'S Max', 255),
+    ('v_min', 'V Min', 255), ('v_max', 'V Max', 255),
+)
+
+
+# key -> (type, min, max) for parameters any script may receive; keys that are
+# neither here nor in a store's defaults are ignored when loaded from outside
+PARAM_LIMITS = {
+    **{key: (int, 0, maximum) for key, _, maximum in HSV_TRACKBARS},
+    'kp_yaw': (float, 0, None), 'kp_v': (float, 0, None), 'kp_fb': (float, 0, None),
+    'max_yaw': (int, 0, 100), 'max_v': (int, 0, 100), 'max_fb': (int, 0, 100),
+    'latency': (float, 0, 1),
+    'detect_scale': (float, 0.05, 1),
+    'blur': (int, 1, 99),
+    'erode': (int, 0, 20), 'dilate': (int, 0, 20),
+    'morph_kernel': (int, 1, 31),
+}
+
+
+def check_number(value, kind, minimum=None, maximum=None):
+    """`value` as `kind` (int or float) within [minimum, maximum]; ValueError otherwise."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"not a number: {value!r}")
+    if kind is int and value != int(value):
+        raise ValueError(f"not an integer: {value!r}")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"{value!r} outside [{minimum}, {maximum}]")
+    return kind(value)
+
+
+def check_colors(value):
+    """Extra HSV ranges (`colors`): a list of [lower, upper] triplets."""
+    if not isinstance(value, list):
+        raise ValueError(f"not a list of ranges: {value!r}")
+    ranges = []
+    for pair in value:
+        if not isinstance(pair, list) or len(pair) != 2 or any(
+                not isinstance(bound, list) or len(bound) != 3 for bound in pair):
+            raise ValueError(f"not a [lower, upper] HSV range: {pair!r}")
+        ranges.append([[check_number(v, int, 0, maximum) for v, maximum in zip(bound, (179, 255, 255))]
+                       for bound in pair])
+    return ranges
+
+
+def hsv_range(values):
+    """(lower, upper) HSV bounds from a parameter dict."""
+    return ((values['h_min'], values['s_min'], values['v_min']),
+            (values['h_max'], values['s_max'], values['v_max']))
+
+
+def has_hsv_range(values):
+    return all(key in values for key in HSV_KEYS)
+
+
+def load_hsv_range(path):
+    """HSV range of a saved profile (e.g. ctest.py's), as JSON-friendly lists."""
+    with open(path) as f:
+        lower, upper = hsv_range(json.load(f))
+    return [list(lower), list(upper)]
+
+
+class ParamStore:
+    """Live tunables (HSV range, gains, ...) with a version counter.
+
+    Every change publishes a new `values` dict and bumps `version`, so a
+    consumer compares one integer per frame and only rebuilds what depends
+    on the parameters (thresholds, kernels, gains) when it moved. Reading
+    `values` needs no lock; it is never modified once published.
+    """
+
+    def __init__(self, defaults):
+        self.values = dict(defaults)
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def update(self, changes):
+        """Apply `changes`; returns True (and bumps the version) if anything differs."""
+        with self._lock:
+            changed = {k: v for k, v in changes.items() if self.values.get(k) != v}
+            if not changed:
+                return False
+            self.values = {**self.values, **changed}
+            self.version += 1
+            return True
+
+    def set(self, key, value):
+        return self.update({key: value})
+
+    def check(self, changes, origin):
+        """The valid part of `changes` from a file or socket; rejections are logged.
+
+        Unknown keys are dropped, numbers are coerced to the key's type
+        (PARAM_LIMITS, or the default's) and range-checked.
+        """
+        if not isinstance(changes, dict):
+            print(f"Ignoring parameters from {origin}: expected a JSON object, got {changes!r}")
+            return {}
+        accepted = {}
+        for key, value in changes.items():
+            try:
+                if key == 'colors':
+                    accepted[key] = check_colors(value)
+                elif key in PARAM_LIMITS:
+                    accepted[key] = check_number(value, *PARAM_LIMITS[key])
+                elif key in self.values and isinstance(self.values[key], (int, float)):
+                    accepted[key] = check_number(value, type(self.values[key]))
+                else:
+                    print(f"Ignoring unknown parameter {key!r} from {origin}")
+            except ValueError as e:
+                print(f"Ignoring parameter {key!r} from {origin}: {e}")
+        return accepted
+
+    def accept(self, changes, origin):
+        """`update()` with only the valid part of externally supplied `changes`."""
+        return self.update(self.check(changes, origin))
+
+    def hsv_range(self):
+        return hsv_range(self.values)
+
+    def save(self, path, keys=None):
+        values = self.values
+        if keys is not None:
+            values = {k: values[k] for k in keys if k in values}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(values, f, indent=2, sort_keys=True)
+
+    def load(self, path):
+        with open(path) as f:
+            return self.accept(json.load(f), path)
+
+
+class TrackbarSource:
+    """OpenCV trackbars that push into the store from their change callbacks.
+
+    Nothing is polled per frame. Call `sync()` from the GUI thread to move
+    the sliders after the store was changed from somewhere else.
+    """
+
+    def __init__(self, store, window, trackbars=HSV_TRACKBARS):
+        self.store = store
+        self.window = window
+        self.trackbars = trackbars
+        self._synced_version = None
+        for key, label, maximum in trackbars:
+            cv2.createTrackbar(label, window, int(store[key]), maximum,
+                               lambda value, key=key: store.set(key, value))
+
+    def sync(self):
+        if self.store.version == self._synced_version:
+            return
+        self._synced_version = self.store.version
+        for key, label, _ in self.trackbars:
+            if cv2.getTrackbarPos(label, self.window) != self.store[key]:
+                cv2.setTrackbarPos(label, self.window, int(self.store[key]))
+
+
+class ProfileFile:
+    """JSON profile reloaded into the store whenever the file changes on disk."""
+
+    def __init__(self, store, path, interval=0.5):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            return self.store.load(self.path)
+        except ValueError as e:
+            # half-written file; try again on the next change
+            print(f"Profile {self.path} not loaded: {e}")
+            self._mtime = None
+            return False
+
+    def start(self):
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name='ProfileFile', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+class SocketSource:
+    """Local UDP endpoint taking JSON objects, e.g. `{"kp_yaw": 0.5}`."""
+
+    def __init__(self, store, port, host='127.0.0.1'):
+        self.store = store
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.5)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='SocketSource', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            try:
+                changes = json.loads(data)
+            except ValueError:
+                print(f"Ignoring malformed parameter message: {data!r}")
+                continue
+            self.store.accept(changes, 'parameter socket')
+        self.sock.close()
@@ -1,8 +1,21 @@
-from djitellopy import Tello
 import time
 import cv2
 import numpy as np
 
+from frame_grabber import FrameGrabber
+from telemetry import Telemetry
+from rc_arbiter import RcArbiter
+from scheduler import FixedRateScheduler
+from vision import make_pipeline, BufferPool, TELLO_FRAME_SHAPE
+from roi import RoiTracker
+from estimator import TargetEstimator
+from flow_tracker import FlowTracker
+from camshift import CamShiftEngine, load_histogram
+from governor import QualityGovernor, QUALITY_SCALES
+from hud import Hud
+from params import ParamStore
+from cli import make_parser, make_display, make_drone, frame_read, start_param_sources, start_recorder
+
 # --- CONFIG ---
 WIDTH, HEIGHT    = 650, 500
 # once past this, we consider the object “at the right distance”
@@ -29,65 +42,131 @@ H_MIN, H_MAX = 40, 82
 S_MIN, S_MAX = 55, 192
 V_MIN, V_MAX = 30, 214
 
-def nothing(x):
-    pass
+# rc packets per second, fixed regardless of vision and display cost
+CONTROL_HZ = 30
+
+# seconds from capture to the frame reaching the grabber (link + decoder);
+# added to the measured frame age when predicting the target forward
+VIDEO_LATENCY = 0.0
+
+# live parameters: these constants are the defaults, a --profile / --param-port overrides them
+params = ParamStore({
+    'h_min': H_MIN, 'h_max': H_MAX,
+    's_min': S_MIN, 's_max': S_MAX,
+    'v_min': V_MIN, 'v_max': V_MAX,
+    'kp_yaw': Kp_yaw, 'kp_v': Kp_v, 'kp_fb': Kp_fb,
+    'max_yaw': MAX_YAW, 'max_v': MAX_V, 'max_fb': MAX_FB,
+    'latency': VIDEO_LATENCY,
+})
+
+args = make_parser('Follow a coloured target with the Tello (tracks any blob above MIN_DETECT_AREA).').parse_args()
+param_sources = start_param_sources(params, args)
 
 # --- SETUP ---
-drone = Tello()
+# --replay: a FakeTello plays back a recording; --replay-fast also runs every stage on its clock
+drone = make_drone(args)
+clock = drone.clock if args.replay else time.monotonic
 drone.connect()
 print(f"Battery: {drone.get_battery()}%")
 drone.streamon()
 time.sleep(2)
+grabber = FrameGrabber(frame_read(drone), clock=clock, synchronous=args.replay_fast).start()
+telemetry = Telemetry(drone, clock=clock)
+arbiter = RcArbiter(drone, clock=clock)
+# --record: frames, telemetry and rc packets to a session directory, written off the control path
+recorder = start_recorder(args, grabber, telemetry, arbiter)
+# --engine camshift/meanshift: back-projection tracking once locked, threshold only to (re)acquire
+engine = None
+if args.engine != 'threshold':
+    engine = CamShiftEngine(hist=load_histogram(args.hist) if args.hist else None,
+                            method=args.engine, min_area=MIN_DETECT_AREA)
+# all vision intermediates allocated once here and reused every frame,
+# with --vision-budget also at every detection scale the governor can step to
+pipeline = make_pipeline(WIDTH, HEIGHT, (H_MIN, S_MIN, V_MIN), (H_MAX, S_MAX, V_MAX),
+                         pool=BufferPool(), engine=engine, direct=args.direct_lut)
+pipeline.preallocate(TELLO_FRAME_SHAPE, params, scales=QUALITY_SCALES if args.vision_budget else ())
 
-# HSV tuning window
-cv2.namedWindow('Trackbars')
-cv2.resizeWindow('Trackbars', 600, 400)
-for name, val, mx in [
-    ('H Min', H_MIN, 179), ('H Max', H_MAX, 179),
-    ('S Min', S_MIN, 255), ('S Max', S_MAX, 255),
-    ('V Min', V_MIN, 255), ('V Max', V_MAX, 255),
-]:
-    cv2.createTrackbar(name, 'Trackbars', val, mx, nothing)
+# windows and keys, or --headless: stdin keys and nothing drawn
+display = make_display(args, streams=('Tello', 'Mask'))
+# HSV tuning window, pushes slider moves straight into the parameter store
+trackbars = display.trackbars(params)
+gains = params.values
+
+# dead-zone & guides never change: rendered once, then stamped on every frame with the text layers
+hud = Hud()
+hud.rectangle((WIDTH//2-THRESHOLD_X, HEIGHT//2-THRESHOLD_Y),
+              (WIDTH//2+THRESHOLD_X, HEIGHT//2+THRESHOLD_Y), (0,0,255), 2)
+hud.line((WIDTH//2-THRESHOLD_X, 0), (WIDTH//2-THRESHOLD_X, HEIGHT), (255,0,0), 2)
+hud.line((WIDTH//2+THRESHOLD_X, 0), (WIDTH//2+THRESHOLD_X, HEIGHT), (255,0,0), 2)
+hud.line((0, HEIGHT//2-THRESHOLD_Y), (WIDTH, HEIGHT//2-THRESHOLD_Y), (255,0,0), 2)
+hud.line((0, HEIGHT//2+THRESHOLD_Y), (WIDTH, HEIGHT//2+THRESHOLD_Y), (255,0,0), 2)
+
+# --roi: segment only around the locked target, full frame until locked or after losing it
+roi = RoiTracker(WIDTH, HEIGHT) if args.roi else None
+# smoothed centre/area, coasting through short dropouts
+estimator = TargetEstimator(clock=grabber.clock)
+# --flow: full detection every N frames, Lucas-Kanade on the target box in between
+flow = FlowTracker(budget=1 / 30) if args.flow else None
+# --vision-budget: step detection quality down/up to hold the frame deadline
+governor = QualityGovernor(params, args.vision_budget / 1000) if args.vision_budget else None
 
 drone.takeoff()
 flying = True
+last_seq = 0
+
+# control stage: one merged rc packet per tick, on its own thread
+control_loop = FixedRateScheduler(arbiter.tick, CONTROL_HZ, clock=clock, inline=args.replay_fast).start()
 
 try:
     while True:
-        frame = drone.get_frame_read().frame
-        if frame is None:
+        # one state read per tick
+        bat = telemetry.refresh().battery
+
+        # keys first, so they are handled on passes without a new frame too
+        key = display.key()
+        if key == ord('q'):
+            break
+        elif key == ord('l') and flying:
+            drone.land(); flying = False
+        elif key == ord('t') and not flying and bat is not None and bat > 15:
+            drone.takeoff(); flying = True
+
+        # same frame as the last pass: its detection and rc command still stand
+        latest = grabber.wait_newer(last_seq, display.frame_timeout)
+        if latest is None:
+            if grabber.finished:
+                break
             continue
+        last_seq = latest.seq
+        # --replay-fast: the rc ticks due on the replay clock run here instead of on a thread
+        control_loop.poll()
 
-        # resize & do original two-step conversion
-        frame = cv2.resize(frame, (WIDTH, HEIGHT))
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        hsv   = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        blurred = cv2.GaussianBlur(hsv, (15,15), 0)
-
-        # read HSV limits
-        h_min = cv2.getTrackbarPos('H Min','Trackbars')
-        h_max = cv2.getTrackbarPos('H Max','Trackbars')
-        s_min = cv2.getTrackbarPos('S Min','Trackbars')
-        s_max = cv2.getTrackbarPos('S Max','Trackbars')
-        v_min = cv2.getTrackbarPos('V Min','Trackbars')
-        v_max = cv2.getTrackbarPos('V Max','Trackbars')
-        lower = np.array([h_min, s_min, v_min])
-        upper = np.array([h_max, s_max, v_max])
-
-        # mask & clean
-        mask = cv2.inRange(blurred, lower, upper)
-        mask = cv2.erode(mask, None, iterations=2)
-        mask = cv2.dilate(mask, None, iterations=2)
-
-        # find largest contour
-        contours, _ = cv2.findContours(mask,
-                                       cv2.RETR_EXTERNAL,
-                                       cv2.CHAIN_APPROX_SIMPLE)
-        if contours:
-            c    = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(c)
-        else:
-            area = 0
+        # rebuild thresholds/kernels and pick up new gains only when a parameter moved
+        if pipeline.sync(params):
+            if trackbars is not None:
+                trackbars.sync()
+            gains = params.values
+
+        # resize, one RGB→HSV conversion, blur, mask, clean-up and contours
+        # with --flow, frames between detections only need the display-size resize
+        detect = flow is None or flow.need_detection()
+        if roi is not None and detect:
+            pipeline['roi'].set_window(roi.window())
+        processed = pipeline.run(latest.image, upto=None if detect else 'resize')
+        if governor is not None and detect:
+            governor.observe(processed.elapsed)
+        blobs = processed.blobs
+
+        # BGR copy, mask composite and every drawing call only when someone is watching
+        show = display.attached
+        if show:
+            mask = processed.full_mask()
+            frame = cv2.cvtColor(processed.frame, cv2.COLOR_RGB2BGR,
+                                 dst=pipeline.pool.get('display', processed.frame.shape))
+
+        # largest blob, straight from the area array
+        largest = blobs.largest()
+        area = blobs.area[largest] if largest is not None else 0
 
         # default velocities
         lr_vel  = 0
@@ -95,95 +174,94 @@ try:
         ud_vel  = 0
         yaw_vel = 0
 
-        # if we see something above the tiny threshold, do all axes
-        if area > MIN_DETECT_AREA:
-            x, y, w, h = cv2.boundingRect(c)
-            cx, cy = x + w//2, y + h//2
+        # anything above the tiny threshold is a measurement; draw its box
+        box = blobs.box(largest) if area > MIN_DETECT_AREA else None
+        if flow is not None:
+            if detect:
+                flow.detected(processed.frame, box, processed.elapsed)
+            else:
+                box = flow.track(processed.frame)
+        if args.replay:
+            # the replay scores what the script locked on, not just what it was shown
+            drone.vision(processed.elapsed, box, (WIDTH, HEIGHT))
+        if box is not None:
+            x, y, w, h = box
+            if show:
+                cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,0) if detect else (0,255,255), 2)
+            estimator.update((x + w/2, y + h/2, w*h), latest.timestamp)
+        else:
+            estimator.update(None, latest.timestamp)
+
+        # act on where the target is now: frame age plus video latency ahead of the measurement
+        estimate = estimator.predict(grabber.clock() + gains['latency'])
+        if estimate is not None:
+            est_x, est_y, est_area = estimate
+            cx, cy = int(est_x), int(est_y)
 
-            # draw box + center dot
-            cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,0), 2)
-            cv2.circle(frame, (cx,cy), 5, (0,0,255), -1)
+            # estimated center dot; all axes act on it
+            if show:
+                cv2.circle(frame, (cx,cy), 5, (0,0,255), -1)
 
             # compute errors
             err_x    = cx - WIDTH//2
             err_y    = HEIGHT//2 - cy
-            err_area = DESIRED_AREA - (w*h)
+            err_area = DESIRED_AREA - est_area
 
             # ---- YAW & VERTICAL (always) ---- #
             if abs(err_x) > THRESHOLD_X:
-                yaw_vel = int(np.clip(Kp_yaw * err_x, -MAX_YAW, MAX_YAW))
+                yaw_vel = int(np.clip(gains['kp_yaw'] * err_x, -gains['max_yaw'], gains['max_yaw']))
             if abs(err_y) > THRESHOLD_Y:
-                ud_vel = int(np.clip(Kp_v * err_y, -MAX_V, MAX_V))
+                ud_vel = int(np.clip(gains['kp_v'] * err_y, -gains['max_v'], gains['max_v']))
 
             # ---- FORWARD/BACK (now unconditional for any detected blob) ---- #
-            fb_vel = int(np.clip(Kp_fb * err_area, -MAX_FB, MAX_FB))
-
-            # annotate
-            if yaw_vel < 0:
-                cv2.putText(frame, 'Rotate →', (10,30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0), 2)
-            elif yaw_vel > 0:
-                cv2.putText(frame, 'Rotate ←', (10,30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0), 2)
-
-            if ud_vel > 0:
-                cv2.putText(frame, 'Up', (10,60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0), 2)
-            elif ud_vel < 0:
-                cv2.putText(frame, 'Down', (10,60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0), 2)
-
-            if fb_vel > 0:
-                cv2.putText(frame, 'Forward', (10,90),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0), 2)
-            elif fb_vel < 0:
-                cv2.putText(frame, 'Backward', (10,90),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0), 2)
-
-        # draw dead-zone & guides
-        cv2.rectangle(frame,
-                      (WIDTH//2-THRESHOLD_X, HEIGHT//2-THRESHOLD_Y),
-                      (WIDTH//2+THRESHOLD_X, HEIGHT//2+THRESHOLD_Y),
-                      (0,0,255), 2)
-        cv2.line(frame,
-                 (WIDTH//2-THRESHOLD_X, 0),
-                 (WIDTH//2-THRESHOLD_X, HEIGHT),
-                 (255,0,0), 2)
-        cv2.line(frame,
-                 (WIDTH//2+THRESHOLD_X, 0),
-                 (WIDTH//2+THRESHOLD_X, HEIGHT),
-                 (255,0,0), 2)
-        cv2.line(frame,
-                 (0, HEIGHT//2-THRESHOLD_Y),
-                 (WIDTH, HEIGHT//2-THRESHOLD_Y),
-                 (255,0,0), 2)
-        cv2.line(frame,
-                 (0, HEIGHT//2+THRESHOLD_Y),
-                 (WIDTH, HEIGHT//2+THRESHOLD_Y),
-                 (255,0,0), 2)
+            fb_vel = int(np.clip(gains['kp_fb'] * err_area, -gains['max_fb'], gains['max_fb']))
 
-        # battery status
-        bat = drone.get_battery()
-        cv2.putText(frame, f"Battery: {bat}%", (10, HEIGHT-10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
+        # direction labels, re-rendered only when they change
+        hud.text('yaw', 'Rotate →' if yaw_vel < 0 else 'Rotate ←' if yaw_vel > 0 else None, (10,30), (255,0,0))
+        hud.text('ud', 'Up' if ud_vel > 0 else 'Down' if ud_vel < 0 else None, (10,60), (255,0,0))
+        hud.text('fb', 'Forward' if fb_vel > 0 else 'Backward' if fb_vel < 0 else None, (10,90), (255,0,0))
 
-        # send commands
-        drone.send_rc_control(lr_vel, fb_vel, ud_vel, yaw_vel)
+        # show the window this frame searched and feed the lock back
+        if roi is not None and detect:
+            if show and roi.current is not None:
+                x, y, w, h = roi.current
+                cv2.rectangle(frame, (x, y), (x+w, y+h), (255,255,0), 1)
+            roi.update(box)
 
-        # display
-        cv2.imshow('Tello', frame)
-        cv2.imshow('Mask', mask)
+        # battery status
+        hud.text('battery', f"Battery: {'--' if bat is None else bat}%", (10, HEIGHT-10), (0,255,0), 0.8)
 
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        elif key == ord('l') and flying:
-            drone.land(); flying = False
-        elif key == ord('t') and not flying and bat > 15:
-            drone.takeoff(); flying = True
+        # hand the command to the control stage
+        arbiter.demand('vision', lr=lr_vel, fb=fb_vel, ud=ud_vel, yaw=yaw_vel)
+
+        if show:
+            # guides, dead-zone and labels in one masked copy
+            hud.apply(frame)
+            # display
+            display.show('Tello', frame)
+            if mask is not None:
+                display.show('Mask', mask)
 
 finally:
+    control_loop.stop()
+    print(f"Control loop: {control_loop.stats()}")
+    if roi is not None:
+        print(f"ROI tracking: {roi.stats()}")
+    if flow is not None:
+        print(f"Flow tracking: {flow.stats()}")
+    if engine is not None:
+        print(f"{args.engine} engine: {engine.stats()}")
+    if governor is not None:
+        print(f"Vision quality: {governor.stats()}")
+    print(f"Vision buffers: {pipeline.pool.allocations} allocated, "
+          f"{pipeline.steady_allocations} after start-up")
     if flying:
         drone.land()
+    grabber.stop()
+    if args.replay:
+        print(f"Replay: {drone.stats()}")
+    if recorder is not None:
+        recorder.stop()
+        print(f"Recording: {recorder.stats()}")
     drone.streamoff()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    display.close()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import threading
+import time
+
+AXES = ('lr', 'fb', 'ud', 'yaw')
+
+# higher priority wins an axis
+PRIORITY_VISION = 0
+PRIORITY_KEYBOARD = 10
+
+
+class RcArbiter:
+    """Merges per-axis rc demands and sends a single rc packet per control tick.
+
+    Every source (vision, keyboard, ...) calls `demand()` with the axes it
+    wants to drive; repeated calls from one source update only the axes they
+    name. Axes a source never set fall through to lower-priority sources and
+    finally to 0. `tick()` is meant to be driven at a fixed rate (see
+    scheduler.py); with `rate_hz` set it also ignores calls that come faster
+    than that. It skips the packet when it matches the last one sent,
+    repeating it only every `keepalive` seconds in case a packet was lost.
+    Demands not renewed within `timeout` seconds are dropped, so a stalled
+    source can't keep the drone moving. Callbacks registered with `on_send`
+    get every command actually sent.
+    """
+
+    def __init__(self, drone, rate_hz=None, keepalive=1.0, timeout=1.0, clock=time.monotonic):
+        self.drone = drone
+        self.period = 0.0 if rate_hz is None else 1.0 / rate_hz
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.clock = clock
+
+        self.last_command = None
+        self.sent = 0
+        self.suppressed = 0
+
+        self._demands = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._last_tick = None
+        self._last_send = None
+
+    def demand(self, source, priority=PRIORITY_VISION, **axes):
+        for axis in axes:
+            if axis not in AXES:
+                raise ValueError(f"Unknown rc axis: {axis}")
+        with self._lock:
+            previous = self._demands.get(source)
+            if previous is not None and previous[0] == priority:
+                axes = {**previous[2], **axes}
+            self._demands[source] = (priority, self.clock(), axes)
+
+    def on_send(self, callback):
+        """Call `callback(command, timestamp)` for every rc packet sent."""
+        self._callbacks.append(callback)
+
+    def release(self, source):
+        with self._lock:
+            self._demands.pop(source, None)
+
+    def merge(self):
+        now = self.clock()
+        command = dict.fromkeys(AXES, 0)
+        with self._lock:
+            for source, (_, stamp, _) in list(self._demands.items()):
+                if now - stamp > self.timeout:
+                    del self._demands[source]
+            # lowest priority first so higher ones overwrite the axes they set
+            for priority, _, axes in sorted(self._demands.values(), key=lambda d: d[0]):
+                command.update(axes)
+        return tuple(int(command[axis]) for axis in AXES)
+
+    def tick(self):
+        """Send the merged command if this tick is due; returns it, or None."""
+        now = self.clock()
+        if self._last_tick is not None and now - self._last_tick < self.period:
+            return None
+        self._last_tick = now
+
+        command = self.merge()
+        if command == self.last_command and now - self._last_send < self.keepalive:
+            self.suppressed += 1
+            return None
+        self._send(command, now)
+        return command
+
+    def stop(self):
+        """Drop every demand and send an all-zero command right away."""
+        with self._lock:
+            self._demands.clear()
+        self._send((0, 0, 0, 0), self.clock())
+
+    def _send(self, command, now):
+        self.drone.send_rc_control(*command)
+        self.last_command = command
+        self._last_send = now
+        self.sent += 1
+        for callback in self._callbacks:
+            callback(command, now)
@@ -0,0 +1,198 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from rc_arbiter import AXES
+from telemetry import Snapshot
+
+# log name -> columns, every log also has a leading 't' column (monotonic seconds)
+LOGS = {
+    'frames': ('seq',),
+    'telemetry': Snapshot._fields,
+    'commands': AXES,
+}
+
+
+class Columns:
+    """Append-only columnar log kept in fixed-size numpy chunks.
+
+    `append()` fills preallocated arrays and returns (index, chunk), chunk
+    being a dict of column -> array, when they are full, else None; memory
+    never grows past one chunk.
+    """
+
+    def __init__(self, names, chunk=1024):
+        self.names = ('t',) + tuple(names)
+        self.chunk = chunk
+        self.chunks = 0
+        self._lock = threading.Lock()
+        self._new()
+
+    def _new(self):
+        self._data = np.zeros((len(self.names), self.chunk), np.float64)
+        self._rows = 0
+
+    def append(self, row):
+        with self._lock:
+            self._data[:, self._rows] = row
+            self._rows += 1
+            if self._rows < self.chunk:
+                return None
+            return self._take()
+
+    def flush(self):
+        """(index, partial chunk), or None if empty."""
+        with self._lock:
+            return self._take() if self._rows else None
+
+    def _take(self):
+        chunk = dict(zip(self.names, self._data[:, :self._rows]))
+        index, self.chunks = self.chunks, self.chunks + 1
+        self._new()
+        return index, chunk
+
+
+class FlightRecorder:
+    """Writes one session directory per flight, on a background thread.
+
+    A session holds `video.mp4` (the frames as decoded, BGR), `session.json`
+    and numbered npz chunks of three columnar logs: `frames` (seq of every
+    written video frame, so frame i of the video is row i), `telemetry`
+    (one Snapshot per state packet) and `commands` (every rc tuple sent). All rows carry
+    the same monotonic clock as the grabber, telemetry and arbiter.
+
+    Callers never block: frames go through a bounded queue and are dropped
+    (and counted) when the writer falls behind; log rows are appended in
+    place and only finished chunks are queued, so memory stays bounded no
+    matter how long the flight.
+    """
+
+    def __init__(self, root='recordings', fps=30, queue_size=16, chunk=1024, clock=time.monotonic):
+        self.fps = fps
+        self.clock = clock
+        self.directory = os.path.join(root, time.strftime('%Y%m%d-%H%M%S'))
+        self.logs = {name: Columns(fields, chunk) for name, fields in LOGS.items()}
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.chunks_dropped = 0
+
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._chunks = queue.Queue(maxsize=queue_size)
+        self._video = None
+        self._started = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._started = (time.time(), self.clock())
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FlightRecorder', daemon=True)
+        self._thread.start()
+        return self
+
+    def attach(self, grabber=None, telemetry=None, arbiter=None):
+        """Record every grabbed frame, new state packet and rc packet sent."""
+        if grabber is not None:
+            grabber.on_frame(self.frame)
+        if telemetry is not None:
+            telemetry.on_refresh(self.telemetry)
+        if arbiter is not None:
+            arbiter.on_send(self.command)
+        return self
+
+    def frame(self, frame):
+        """Queue a frame_grabber.Frame; never waits (the image is not copied,
+        djitellopy hands out a new array per frame)."""
+        try:
+            self._frames.put_nowait(frame)
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def telemetry(self, snapshot, timestamp):
+        # refreshes run at the loop's spin rate; age is 0 only on the refresh that saw a new packet
+        if snapshot.age > 0:
+            return
+        self._append('telemetry', (timestamp,) + tuple(snapshot))
+
+    def command(self, command, timestamp):
+        self._append('commands', (timestamp,) + tuple(command))
+
+    def _append(self, name, row):
+        chunk = self.logs[name].append(row)
+        if chunk is None:
+            return
+        try:
+            self._chunks.put_nowait((name,) + chunk)
+        except queue.Full:
+            self.chunks_dropped += 1
+
+    def _run(self):
+        while self._running or not self._frames.empty() or not self._chunks.empty():
+            # log chunks are small and can't be re-read from anywhere: write them first
+            try:
+                self._write_chunk(*self._chunks.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            try:
+                self._write_frame(self._frames.get(timeout=0.1))
+            except queue.Empty:
+                pass
+
+    def _write_frame(self, frame):
+        image = frame.image
+        if self._video is None:
+            height, width = image.shape[:2]
+            self._video = cv2.VideoWriter(os.path.join(self.directory, 'video.mp4'),
+                                          cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+        # djitellopy frames are RGB
+        self._video.write(cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        self.frames_written += 1
+        self._append('frames', (frame.timestamp, frame.seq))
+
+    def _write_chunk(self, name, index, chunk):
+        np.savez_compressed(os.path.join(self.directory, f'{name}_{index:04d}.npz'), **chunk)
+
+    def stop(self):
+        """Drain the queues, write the partial chunks and close the session."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for name, columns in self.logs.items():
+            chunk = columns.flush()
+            if chunk is not None:
+                self._write_chunk(name, *chunk)
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        wall, monotonic = self._started
+        with open(os.path.join(self.directory, 'session.json'), 'w') as f:
+            json.dump({'started': wall, 'started_monotonic': monotonic, 'fps': self.fps,
+                       'logs': {name: columns.names for name, columns in self.logs.items()},
+                       **self.stats()}, f, indent=2)
+
+    def stats(self):
+        return {
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped,
+            'chunks_dropped': self.chunks_dropped,
+        }
+
+
+def load_log(directory, name):
+    """Concatenate the npz chunks of log `name` of a session into column -> array."""
+    columns = {}
+    for path in sorted(glob.glob(os.path.join(directory, f'{name}_*.npz'))):
+        with np.load(path) as chunk:
+            for column in chunk.files:
+                columns.setdefault(column, []).append(chunk[column])
+    return {column: np.concatenate(parts) for column, parts in columns.items()}
@@ -0,0 +1,98 @@
+class RoiTracker:
+    """Picks the window the next frame is searched in once a target is locked.
+
+    After a hit the window is the target box times `margin`, centred where
+    the target should be next frame (last centre plus its per-frame motion).
+    Every miss widens it by `growth`, and so does a hit touching the window
+    edge (the target may be cut off). After `max_misses` misses in a row,
+    or while nothing is locked, the whole frame is searched.
+
+    Call `window()` once per processed frame and `update()` with the box
+    that frame produced; `roi_frames` / `full_frames` count the two modes.
+    """
+
+    def __init__(self, width, height, margin=2.0, growth=1.5, max_misses=5, min_size=48):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.growth = growth
+        self.max_misses = max_misses
+        self.min_size = min_size
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.reset()
+
+    def reset(self):
+        """Drop the lock; the next frame is a full scan."""
+        self.center = None
+        self.size = None
+        self.velocity = (0.0, 0.0)
+        self.spread = 1.0
+        self.misses = 0
+        self.current = None
+
+    @property
+    def locked(self):
+        return self.center is not None
+
+    def window(self):
+        """(x, y, w, h) in display pixels to search next, or None for the full frame."""
+        self.current = None
+        if self.locked:
+            w = min(self.width, max(self.min_size, int(self.size[0] * self.margin * self.spread)))
+            h = min(self.height, max(self.min_size, int(self.size[1] * self.margin * self.spread)))
+            if w < self.width or h < self.height:
+                steps = self.misses + 1
+                cx = self.center[0] + self.velocity[0] * steps
+                cy = self.center[1] + self.velocity[1] * steps
+                # slide the window back inside the frame instead of shrinking it
+                x = int(min(max(cx - w / 2, 0), self.width - w))
+                y = int(min(max(cy - h / 2, 0), self.height - h))
+                self.current = (x, y, w, h)
+        if self.current is None:
+            self.full_frames += 1
+        else:
+            self.roi_frames += 1
+        return self.current
+
+    def update(self, box):
+        """Feed the target box (x, y, w, h) found in the last window, or None."""
+        if box is None:
+            self._miss()
+            return
+        x, y, w, h = box
+        center = (x + w / 2, y + h / 2)
+        if self.locked:
+            steps = self.misses + 1
+            self.velocity = ((center[0] - self.center[0]) / steps,
+                             (center[1] - self.center[1]) / steps)
+        self.center = center
+        self.size = (w, h)
+        self.misses = 0
+        self.spread = self.growth if self._touches_edge(box) else 1.0
+
+    def _miss(self):
+        if not self.locked:
+            return
+        self.misses += 1
+        if self.misses >= self.max_misses:
+            self.reset()
+        else:
+            self.spread *= self.growth
+
+    def _touches_edge(self, box):
+        if self.current is None:
+            return False
+        x, y, w, h = box
+        wx, wy, ww, wh = self.current
+        return ((x <= wx and wx > 0) or (y <= wy and wy > 0) or
+                (x + w >= wx + ww and wx + ww < self.width) or
+                (y + h >= wy + wh and wy + wh < self.height))
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        return {
+            'roi_frames': self.roi_frames,
+            'full_frames': self.full_frames,
+            'roi_share': round(self.roi_frames / total, 3) if total else 0.0,
+        }
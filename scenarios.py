@@ -0,0 +1,89 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# duration: seconds; distance/height: drone start, cm from the target plane / above the floor;
+# yaw: drone start heading, deg clockwise; radius: ball, cm; target(t): (cm right, cm up)
+Scenario = namedtuple('Scenario', ['duration', 'distance', 'height', 'yaw', 'radius', 'target'])
+
+# fixed closed-loop cases for bench_tracking.py (and --replay synthetic:NAME). A 30 cm ball
+# at 120 cm covers about 26000 px of the scripts' 650x500 view, clear of practica2's and
+# color_tracking's AREA_MIN (16250 px); at 350 cm it covers about 3200 px, above only
+# practica1's MIN_DETECT_AREA (1625 px).
+SCENARIOS = {
+    # target dead ahead: steady-state error and hunting around the dead-zone
+    'hover': Scenario(10, 120, 100, 0, 30, lambda t: (0, 100)),
+    # target 30 deg to the right: yaw lock-on and overshoot
+    'yaw_offset': Scenario(10, 120, 100, -30, 30, lambda t: (0, 100)),
+    # target 50 cm above: vertical lock-on
+    'height_offset': Scenario(10, 120, 100, 0, 30, lambda t: (0, 150)),
+    # small far target 25 deg to the right: area gating, then yaw and the forward/back law;
+    # below AREA_MIN, so practica2 never locks (detected_fraction 0)
+    'far': Scenario(15, 350, 100, -25, 30, lambda t: (0, 100)),
+    # target sweeping left and right, starting at its right end
+    'crossing': Scenario(20, 150, 100, 0, 30, lambda t: (60 * math.cos(0.5 * t), 100)),
+    # slow two-axis wander, starting right of centre
+    'wander': Scenario(20, 120, 100, 0, 30, lambda t: (40 * math.cos(0.4 * t), 100 + 20 * math.sin(0.3 * t))),
+}
+
+
+def tracking_metrics(t, error_x, error_y, tolerance=0.3, hold=1.0, settle_fraction=0.3, locked=None):
+    """Lock-on quality from the true target position over a run.
+
+    `error_x`/`error_y` are the ball centre's offset from the image centre
+    in half-frames (-1..1, NaN while out of view), sampled at times `t`.
+    Centred means inside `tolerance` on both axes (0.3: the scripts'
+    dead-zone) and, given `locked` (per sample: the script's target box was
+    on the ball), tracked by the script; time to center is when it first stays centred for `hold`
+    seconds. Steady-state error is the mean absolute error over the last
+    `settle_fraction` of the run; overshoot is how far past the centre the
+    target swung after first crossing it, as a fraction of its start offset.
+    """
+    t = np.asarray(t, np.float64)
+    error_x = np.asarray(error_x, np.float64)
+    error_y = np.asarray(error_y, np.float64)
+    if not len(t):
+        return {}
+    visible = ~np.isnan(error_x)
+    tracked = visible if locked is None else visible & np.asarray(locked, bool)
+    centred = tracked & (np.abs(error_x) <= tolerance) & (np.abs(np.nan_to_num(error_y)) <= tolerance)
+
+    time_to_center = None
+    start = None
+    for i in range(len(t)):
+        if not centred[i]:
+            start = None
+            continue
+        if start is None:
+            start = i
+        if t[i] - t[start] >= hold:
+            time_to_center = round(float(t[start] - t[0]), 3)
+            break
+
+    settled = t >= t[0] + (1 - settle_fraction) * (t[-1] - t[0])
+    tail = settled & visible
+    metrics = {
+        'time_to_center_s': time_to_center,
+        'steady_error_x': round(float(np.mean(np.abs(error_x[tail]))), 4) if tail.any() else None,
+        'steady_error_y': round(float(np.mean(np.abs(error_y[tail]))), 4) if tail.any() else None,
+        'overshoot_x': _overshoot(error_x, tolerance),
+        'overshoot_y': _overshoot(error_y, tolerance),
+        'visible_fraction': round(float(visible.mean()), 4),
+        'centred_fraction': round(float(centred.mean()), 4),
+    }
+    if locked is not None:
+        metrics['locked_fraction'] = round(float(tracked.mean()), 4)
+    return metrics
+
+
+def _overshoot(error, tolerance):
+    seen = error[~np.isnan(error)]
+    if not len(seen) or abs(seen[0]) <= tolerance:
+        return None
+    side = np.sign(seen[0])
+    crossed = np.nonzero(side * seen <= 0)[0]
+    if not len(crossed):
+        return 0.0
+    swing = np.max(-side * seen[crossed[0]:])
+    return round(float(max(swing, 0.0) / abs(seen[0])), 4)
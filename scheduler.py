@@ -0,0 +1,88 @@
+import threading
+import time
+
+
+class FixedRateScheduler:
+    """Runs `callback` at a fixed rate on its own thread.
+
+    Deadlines are kept on an absolute grid (start + n * period), so a slow
+    tick doesn't shift every tick after it. Ticks that can't start before
+    the next deadline are skipped and counted in `missed`; `stats()` also
+    reports tick-to-tick jitter against the nominal period.
+
+    `inline` schedulers have no thread: the caller runs the ticks that are
+    due with `poll()`, which keeps a replay on a virtual clock deterministic.
+    """
+
+    def __init__(self, callback, rate_hz=30, clock=time.monotonic, inline=False):
+        self.callback = callback
+        self.period = 1.0 / rate_hz
+        self.clock = clock
+        self.inline = inline
+
+        self.ticks = 0
+        self.missed = 0
+        self.max_jitter = 0.0
+        self._jitter_sum = 0.0
+        self._last_start = None
+        self._next_deadline = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.inline:
+            self._next_deadline = self.clock()
+        elif self._thread is None:
+            self._stop.clear()
+            self._next_deadline = self.clock()
+            self._thread = threading.Thread(target=self._run, name='FixedRateScheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def poll(self):
+        """Run the ticks due by now (inline schedulers only; no-op otherwise)."""
+        if not self.inline:
+            return
+        while self._next_deadline <= self.clock():
+            self._tick()
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self._next_deadline - self.clock()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            self._tick()
+
+    def _tick(self):
+        now = self.clock()
+        if self._last_start is not None:
+            jitter = abs((now - self._last_start) - self.period)
+            self._jitter_sum += jitter
+            self.max_jitter = max(self.max_jitter, jitter)
+        self._last_start = now
+        self.ticks += 1
+
+        self.callback()
+
+        self._next_deadline += self.period
+        late = self.clock() - self._next_deadline
+        if late > 0:
+            skipped = int(late // self.period) + 1
+            self.missed += skipped
+            self._next_deadline += skipped * self.period
+
+    def stats(self):
+        intervals = max(self.ticks - 1, 1)
+        return {
+            'ticks': self.ticks,
+            'missed': self.missed,
+            'mean_jitter_ms': 1000 * self._jitter_sum / intervals,
+            'max_jitter_ms': 1000 * self.max_jitter,
+        }
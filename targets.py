@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class Track:
+    """One target followed across frames under a persistent `id`."""
+
+    def __init__(self, track_id, box, centroid, area, color, frame):
+        self.id = track_id
+        self.first_frame = frame
+        self.missed = 0
+        self.hits = 0
+        self.velocity = np.zeros(2)
+        self.centroid = np.asarray(centroid, np.float64)
+        self._update(box, centroid, area, color)
+
+    def _update(self, box, centroid, area, color):
+        self.box = tuple(int(v) for v in box)
+        centroid = np.asarray(centroid, np.float64)
+        if self.hits:
+            self.velocity = centroid - self.centroid
+        self.centroid = centroid
+        self.area = float(area)
+        self.color = int(color)
+        self.missed = 0
+        self.hits += 1
+
+    def predicted(self):
+        return self.centroid + self.velocity * (self.missed + 1)
+
+    def center(self):
+        return int(round(self.centroid[0])), int(round(self.centroid[1]))
+
+
+def _largest(tracks, frame_size):
+    return max(tracks, key=lambda t: t.area)
+
+
+def _closest(tracks, frame_size):
+    middle = np.array(frame_size, np.float64) / 2
+    return min(tracks, key=lambda t: np.hypot(*(t.centroid - middle)))
+
+
+def _oldest(tracks, frame_size):
+    return min(tracks, key=lambda t: t.first_frame)
+
+
+# how a new target is picked when there is none or the current one is gone
+POLICIES = {'largest': _largest, 'closest': _closest, 'oldest': _oldest}
+
+
+class TargetTracker:
+    """Persistent IDs for the blobs of every frame, and one selected target.
+
+    Blobs are associated to existing tracks greedily by cost: the distance
+    from a track's predicted centroid plus `area_weight` pixels per e-fold
+    of area change. Pairs further apart than `max_distance` are never
+    matched. Unmatched blobs start new tracks; tracks unmatched for more
+    than `max_missed` frames are dropped.
+
+    Selection is sticky: the controller keeps acting on `selected` while
+    that track lives, and `policy` (largest, closest to the centre, oldest)
+    only picks a new one when it is gone, so two similar objects in view
+    don't take turns commanding the drone. `color` restricts selection to
+    blobs of one HSV range (blobs.Blobs.color).
+    """
+
+    def __init__(self, frame_size, policy='largest', color=None, max_distance=80,
+                 max_missed=5, area_weight=40):
+        self.frame_size = frame_size
+        self.policy = policy
+        self.color = color
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.area_weight = area_weight
+        self.tracks = []
+        self.selected = None
+        self.frame = 0
+        self._next_id = 1
+
+    def update(self, blobs):
+        """Associate this frame's blobs; returns the live tracks."""
+        self.frame += 1
+        matched_tracks, matched_blobs = self._associate(blobs)
+        for t, b in zip(matched_tracks, matched_blobs):
+            self.tracks[t]._update(blobs.bbox[b], blobs.centroid[b], blobs.area[b], blobs.color[b])
+
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        for b in range(len(blobs)):
+            if b not in matched_blobs:
+                self.tracks.append(Track(self._next_id, blobs.bbox[b], blobs.centroid[b],
+                                         blobs.area[b], blobs.color[b], self.frame))
+                self._next_id += 1
+
+        self._select()
+        return self.tracks
+
+    def _associate(self, blobs):
+        if not self.tracks or not len(blobs):
+            return [], []
+        predicted = np.array([t.predicted() for t in self.tracks])
+        areas = np.array([t.area for t in self.tracks])
+        # tracks x blobs
+        distance = np.linalg.norm(predicted[:, None, :] - blobs.centroid[None, :, :], axis=2)
+        ratio = np.abs(np.log(np.maximum(blobs.area[None, :], 1) / np.maximum(areas[:, None], 1)))
+        cost = distance + self.area_weight * ratio
+        cost[distance > self.max_distance] = np.inf
+
+        matched_tracks, matched_blobs = [], []
+        for flat in np.argsort(cost, axis=None):
+            t, b = np.unravel_index(flat, cost.shape)
+            if not np.isfinite(cost[t, b]):
+                break
+            if t in matched_tracks or b in matched_blobs:
+                continue
+            matched_tracks.append(int(t))
+            matched_blobs.append(int(b))
+        return matched_tracks, matched_blobs
+
+    def _select(self):
+        if self.target() is not None:
+            return
+        candidates = [t for t in self.tracks if t.missed == 0 and
+                      (self.color is None or t.color == self.color)]
+        self.selected = POLICIES[self.policy](candidates, self.frame_size).id if candidates else None
+
+    def target(self):
+        """The selected track (possibly coasting for a few frames), or None."""
+        for track in self.tracks:
+            if track.id == self.selected:
+                return track
+        return None
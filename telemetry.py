@@ -0,0 +1,72 @@
+import time
+from collections import namedtuple
+
+# snapshot field -> key in the Tello state string
+STATE_KEYS = {
+    'battery': 'bat',   # %
+    'height': 'h',      # cm
+    'pitch': 'pitch',   # deg
+    'roll': 'roll',     # deg
+    'yaw': 'yaw',       # deg
+    'vgx': 'vgx',       # dm/s
+    'vgy': 'vgy',       # dm/s
+    'vgz': 'vgz',       # dm/s
+}
+
+# age: seconds since the last state packet arrived (inf before the first one)
+# battery: None before the first packet, so a missing reading is never taken for a charge level
+Snapshot = namedtuple('Snapshot', list(STATE_KEYS) + ['age'])
+
+
+class Telemetry:
+    """One consistent view of the drone state per control tick.
+
+    `refresh()` reads djitellopy's state dict once and returns a Snapshot, so
+    every battery/height check inside a tick sees the same values. Callbacks
+    registered with `on_change` run only when their field actually changes;
+    those registered with `on_refresh` get every snapshot.
+    """
+
+    def __init__(self, drone, clock=time.monotonic):
+        self.drone = drone
+        self.clock = clock
+        self.snapshot = None
+
+        self._callbacks = {}
+        self._refresh_callbacks = []
+        self._last_state = None
+        self._last_packet = None
+
+    def on_change(self, field, callback):
+        """Call `callback(old, new)` whenever `field` changes (old is None the first time)."""
+        if field not in Snapshot._fields:
+            raise ValueError(f"Unknown telemetry field: {field}")
+        self._callbacks.setdefault(field, []).append(callback)
+
+    def on_refresh(self, callback):
+        """Call `callback(snapshot, timestamp)` on every refresh."""
+        self._refresh_callbacks.append(callback)
+
+    def refresh(self):
+        state = self.drone.get_current_state()
+        now = self.clock()
+        # djitellopy stores a fresh dict for every state packet
+        if state and state is not self._last_state:
+            self._last_state = state
+            self._last_packet = now
+        age = float('inf') if self._last_packet is None else now - self._last_packet
+
+        snapshot = Snapshot(age=age, **{field: state.get(key, 0) for field, key in STATE_KEYS.items()})
+        if self._last_packet is None:
+            snapshot = snapshot._replace(battery=None)
+        old, self.snapshot = self.snapshot, snapshot
+        for callback in self._refresh_callbacks:
+            callback(snapshot, now)
+
+        for field, callbacks in self._callbacks.items():
+            new_value = getattr(snapshot, field)
+            old_value = None if old is None else getattr(old, field)
+            if new_value != old_value:
+                for callback in callbacks:
+                    callback(old_value, new_value)
+        return snapshot
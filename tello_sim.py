@@ -0,0 +1,428 @@
+"""Local stand-in for the Tello SDK, for load and latency tests without a drone.
+
+    python tello_sim.py                          # one drone on 127.0.0.1
+    python tello_sim.py --drones 4 --loss 0.05   # 127.0.0.1 .. 127.0.0.4
+    python practica1.py --tello-host 127.0.0.1:9889
+
+djitellopy binds its own end of the link to port 8889 on every address, so
+a simulated drone on the same host listens on SIM_COMMAND_PORT instead;
+`--tello-host HOST:PORT` points any entry point at it. State packets go to
+port 8890 of the client and H.264 video (encoded by an ffmpeg subprocess)
+to `--video-port`, as the real drone does. Video needs the `ffmpeg` binary
+(with libx264) on PATH; without it the drones still serve commands and
+state but answer 'error' to `streamon`, so a script fails at once instead
+of waiting for frames that never come. Each drone beyond the first
+takes the next loopback address and video port. djitellopy also keeps
+ports 8889/8890 for the whole process, so several drones are flown from
+one process (e.g. djitellopy.TelloSwarm), not from one script each.
+"""
+import argparse
+import collections
+import copy
+import math
+import queue
+import random
+import shutil
+import socket
+import subprocess
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SIM_COMMAND_PORT = 9889
+STATE_PORT = 8890
+VIDEO_PORT = 11111
+FRAME_SIZE = (960, 720)
+# Tello camera: 82.6 deg horizontal field of view
+FOCAL = FRAME_SIZE[0] / 2 / math.tan(math.radians(82.6 / 2))
+
+
+class DroneKinematics:
+    """Crude point-mass drone: rc values are taken as cm/s and deg/s, reached
+    with a first-order lag of `response` seconds."""
+
+    def __init__(self, battery=100, takeoff_height=80, distance=150, yaw=0.0, response=0.25):
+        self.battery = float(battery)
+        self.takeoff_height = takeoff_height
+        self.response = response
+        self.flying = False
+        self.height = 0.0       # cm
+        self.yaw = float(yaw)   # deg, clockwise
+        self.lateral = 0.0      # cm, right of the start point
+        self.distance = float(distance)     # cm, to the target plane
+        self.rc = (0, 0, 0, 0)  # lr, fb, ud, yaw
+        self.velocity = (0.0, 0.0, 0.0)     # cm/s, x forward, y right, z up
+        self.yaw_rate = 0.0     # deg/s
+
+    def takeoff(self):
+        self.flying = True
+        self.height = float(self.takeoff_height)
+
+    def land(self):
+        self.flying = False
+        self.height = 0.0
+        self.rc = (0, 0, 0, 0)
+        self.velocity = (0.0, 0.0, 0.0)
+        self.yaw_rate = 0.0
+
+    def step(self, dt):
+        lr, fb, ud, yaw = self.rc if self.flying else (0, 0, 0, 0)
+        blend = 1 - math.exp(-dt / self.response) if self.response > 0 else 1.0
+        self.velocity = tuple(v + blend * (target - v) for v, target in zip(self.velocity, (fb, lr, ud)))
+        self.yaw_rate += blend * (yaw - self.yaw_rate)
+        forward, right, up = self.velocity
+        self.yaw = (self.yaw + self.yaw_rate * dt + 180) % 360 - 180
+        self.lateral += right * dt
+        self.distance = max(self.distance - forward * dt, 20.0)
+        self.height = max(self.height + up * dt, 0.0) if self.flying else 0.0
+        # about 12 minutes of hover
+        if self.flying:
+            self.battery = max(self.battery - dt / 7.2, 0.0)
+
+    def state_string(self):
+        vgx, vgy, vgz = (int(v / 10) for v in self.velocity)     # dm/s
+        return (f"mid:-1;x:0;y:0;z:0;mpry:0,0,0;pitch:0;roll:0;yaw:{int(self.yaw)};"
+                f"vgx:{vgx};vgy:{vgy};vgz:{vgz};templ:60;temph:62;tof:{int(self.height) + 10};"
+                f"h:{int(self.height)};bat:{int(self.battery)};baro:0.00;time:0;"
+                f"agx:0.00;agy:0.00;agz:-1000.00;\r\n")
+
+
+def wander(t):
+    """Default ball path: (cm right of the start point, cm above the floor) at time t."""
+    return 40 * math.sin(0.4 * t), 100 + 20 * math.sin(0.3 * t)
+
+
+class SyntheticScene:
+    """Grey room with one green ball (inside the scripts' default HSV range;
+    the same in RGB and BGR) following `target(t)` in a plane in front of the
+    drone, projected through the drone's pose."""
+
+    def __init__(self, size=FRAME_SIZE, radius=10, color=(70, 180, 70), target=wander):
+        self.size = size
+        self.radius = radius
+        self.color = color
+        self.target = target
+        width, height = size
+        shade = np.linspace(90, 140, height, dtype=np.uint8)[:, None, None]
+        self.background = np.broadcast_to(shade, (height, width, 3)).copy()
+
+    def project(self, drone, t):
+        """Ball centre and radius in pixels, (u, v, r), or None when behind the camera."""
+        x, z = self.target(t)
+        bearing = math.atan2(x - drone.lateral, drone.distance) - math.radians(drone.yaw)
+        if abs(bearing) >= math.radians(80):
+            return None
+        width, height = self.size
+        u = width / 2 + FOCAL * math.tan(bearing)
+        v = height / 2 - FOCAL * (z - drone.height) / drone.distance
+        return u, v, FOCAL * self.radius / drone.distance
+
+    def render(self, drone, t):
+        image = self.background.copy()
+        ball = self.project(drone, t)
+        if ball is not None:
+            u, v, r = ball
+            cv2.circle(image, (int(u), int(v)), max(int(r), 1), self.color, -1)
+        return image
+
+
+class FileScene:
+    """Frames of a video file, looped and resized to the Tello frame size."""
+
+    def __init__(self, path, size=FRAME_SIZE):
+        self.size = size
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Cannot open video: {path}")
+
+    def render(self, drone, t):
+        ok, image = self.capture.read()
+        if not ok:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, image = self.capture.read()
+        return cv2.resize(image, self.size)
+
+
+class SimulatedTello:
+    """One simulated drone: command endpoint, state broadcast and video.
+
+    Commands are queued and served one at a time, each taking `delay`
+    (+/- `jitter`) seconds, so bursts back up like on the real drone; the
+    queue holds `queue_size` commands and drops the rest. `loss` is the
+    probability that an incoming command, and separately its reply, is
+    lost. `video_delay` holds frames back before encoding to emulate a
+    laggy link. `stats()` reports served/dropped counts, the deepest queue
+    and the worst time a command waited.
+    """
+
+    def __init__(self, host='127.0.0.1', port=SIM_COMMAND_PORT, video_port=VIDEO_PORT, delay=0.0,
+                 jitter=0.0, loss=0.0, state_hz=10, fps=30, video=None, video_delay=0.0,
+                 queue_size=64, seed=None):
+        self.host = host
+        self.port = port
+        self.video_port = video_port
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.state_hz = state_hz
+        self.fps = fps
+        self.video_delay = video_delay
+        self.scene = FileScene(video) if video else SyntheticScene()
+        self.ffmpeg = shutil.which('ffmpeg')      # None: no video, streamon is refused
+        self.drone = DroneKinematics()
+        self.random = random.Random(seed)
+
+        self.received = 0
+        self.served = 0
+        self.lost = 0
+        self.overflow = 0
+        self.rc = 0
+        self.frames = 0
+        self.max_queue = 0
+        self.max_wait = 0.0
+
+        self.client = None      # ip of whoever sent the last command
+        self.streaming = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads = []
+        self._encoder = None
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.settimeout(0.5)
+        # state leaves from the drone's own address, djitellopy tells drones apart by it
+        self.state_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.state_socket.bind((host, 0))
+
+    def start(self):
+        self._running = True
+        for target, name in ((self._receive, 'receive'), (self._serve, 'serve'),
+                             (self._broadcast, 'state'), (self._physics, 'physics'),
+                             (self._stream, 'video')):
+            thread = threading.Thread(target=target, name=f'TelloSim-{self.host}-{name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        self._stop_encoder()
+        self.socket.close()
+        self.state_socket.close()
+
+    def _dropped(self):
+        return self.loss > 0 and self.random.random() < self.loss
+
+    def _receive(self):
+        while self._running:
+            try:
+                data, address = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.received += 1
+            if self._dropped():
+                self.lost += 1
+                continue
+            try:
+                self._queue.put_nowait((time.monotonic(), data.decode(errors='ignore').strip(), address))
+            except queue.Full:
+                self.overflow += 1
+            self.max_queue = max(self.max_queue, self._queue.qsize())
+
+    def _serve(self):
+        while self._running:
+            try:
+                arrived, command, address = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.max_wait = max(self.max_wait, time.monotonic() - arrived)
+            service = self.delay + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            if service > 0:
+                time.sleep(service)
+            reply = self._handle(command, address)
+            self.served += 1
+            if reply is None:
+                continue
+            if self._dropped():
+                self.lost += 1
+                continue
+            self.socket.sendto(reply.encode(), address)
+
+    def _handle(self, command, address):
+        """Apply one SDK command; returns the reply, or None (rc gets none)."""
+        words = command.split()
+        if not words:
+            return 'error'
+        name = words[0]
+        with self._lock:
+            self.client = address[0]
+            if name == 'rc' and len(words) == 5:
+                self.rc += 1
+                self.drone.rc = tuple(int(w) for w in words[1:])
+                return None
+            if name == 'takeoff':
+                self.drone.takeoff()
+            elif name == 'land' or name == 'emergency':
+                self.drone.land()
+            elif name == 'streamon':
+                if self.ffmpeg is None:
+                    return 'error'
+                self.streaming = True
+            elif name == 'streamoff':
+                self.streaming = False
+            elif name == 'port' and len(words) == 3:
+                self.video_port = int(words[2])
+            elif name == 'battery?':
+                return str(int(self.drone.battery))
+            elif name == 'height?':
+                return f"{int(self.drone.height / 10)}dm"
+            elif name.endswith('?'):
+                return '0'
+        return 'ok'
+
+    def _physics(self):
+        last = time.monotonic()
+        while self._running:
+            time.sleep(0.01)
+            now = time.monotonic()
+            with self._lock:
+                self.drone.step(now - last)
+            last = now
+
+    def _broadcast(self):
+        period = 1.0 / self.state_hz
+        while self._running:
+            time.sleep(period)
+            with self._lock:
+                client, packet = self.client, self.drone.state_string()
+            if client is None or self._dropped():
+                continue
+            try:
+                self.state_socket.sendto(packet.encode(), (client, STATE_PORT))
+            except OSError:
+                pass
+
+    def _start_encoder(self, client):
+        width, height = self.scene.size
+        command = [self.ffmpeg, '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+                   '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+                   '-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'zerolatency',
+                   '-g', str(self.fps), '-bf', '0', '-pix_fmt', 'yuv420p',
+                   '-f', 'h264', f'udp://{client}:{self.video_port}?pkt_size=1460']
+        try:
+            self._encoder = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                             stdout=subprocess.DEVNULL, stderr=None)
+        except OSError as e:
+            print(f"[{self.host}] ffmpeg failed to start, no video: {e}")
+            self._encoder = False
+
+    def _stop_encoder(self):
+        if self._encoder:
+            try:
+                self._encoder.stdin.close()
+            except OSError:
+                pass
+            self._encoder.wait(timeout=2)
+        self._encoder = None
+
+    def _stream(self):
+        period = 1.0 / self.fps
+        held = collections.deque()
+        lag = int(round(self.video_delay * self.fps))
+        start = next_frame = time.monotonic()
+        while self._running:
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_frame += period
+            with self._lock:
+                streaming, client = self.streaming, self.client
+                pose = copy.copy(self.drone)
+            if not streaming:
+                if self._encoder:
+                    self._stop_encoder()
+                held.clear()
+                continue
+            if self._encoder is None:
+                self._start_encoder(client)
+            if not self._encoder:
+                continue
+            held.append(self.scene.render(pose, next_frame - start))
+            if len(held) <= lag:
+                continue
+            try:
+                self._encoder.stdin.write(held.popleft().tobytes())
+                self.frames += 1
+            except (BrokenPipeError, OSError):
+                self._stop_encoder()
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'served': self.served,
+            'rc': self.rc,
+            'lost': self.lost,
+            'overflow': self.overflow,
+            'max_queue': self.max_queue,
+            'max_wait_ms': round(1000 * self.max_wait, 1),
+            'frames': self.frames,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated Tello drones on localhost '
+                                                 '(video needs ffmpeg with libx264 on PATH).')
+    parser.add_argument('--host', default='127.0.0.1', help='address of the first drone (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=SIM_COMMAND_PORT,
+                        help=f'command port (default {SIM_COMMAND_PORT}; 8889 is taken by the client)')
+    parser.add_argument('--drones', type=int, default=1,
+                        help='number of drones, on consecutive loopback addresses and video ports')
+    parser.add_argument('--delay', type=float, default=0, metavar='MS', help='time to serve each command')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS', help='+/- random part of --delay')
+    parser.add_argument('--loss', type=float, default=0,
+                        help='probability of losing each command, reply and state packet (0..1)')
+    parser.add_argument('--state-hz', type=float, default=10, help='state packets per second (default 10)')
+    parser.add_argument('--video', help='video file to stream (default: synthetic scene)')
+    parser.add_argument('--video-port', type=int, default=VIDEO_PORT,
+                        help=f'video port of the first drone (default {VIDEO_PORT})')
+    parser.add_argument('--video-delay', type=float, default=0, metavar='MS', help='extra video lag')
+    parser.add_argument('--fps', type=int, default=30, help='video frame rate (default 30)')
+    parser.add_argument('--seed', type=int, help='random seed for loss and jitter')
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None:
+        print("ffmpeg not found on PATH: no video, the drones answer 'error' to streamon")
+
+    first = socket.inet_aton(args.host)
+    drones = []
+    for i in range(args.drones):
+        host = socket.inet_ntoa((int.from_bytes(first, 'big') + i).to_bytes(4, 'big'))
+        sim = SimulatedTello(host, args.port, args.video_port + i, args.delay / 1000, args.jitter / 1000,
+                             args.loss, args.state_hz, args.fps, args.video, args.video_delay / 1000,
+                             seed=None if args.seed is None else args.seed + i)
+        drones.append(sim.start())
+        print(f"Drone {i + 1}: --tello-host {host}:{args.port} --video-port {args.video_port + i}")
+
+    try:
+        while True:
+            time.sleep(5)
+            for sim in drones:
+                print(f"{sim.host}: {sim.stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sim in drones:
+            sim.stop()
+
+
+if __name__ == '__main__':
+    main()
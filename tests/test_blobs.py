@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from blobs import Blobs, BlobStats, LargestContour   # noqa: E402
+from vision import VisionContext   # noqa: E402
+
+
+def mask_context(*circles, shape=(200, 300)):
+    mask = np.zeros(shape, np.uint8)
+    for center, radius in circles:
+        cv2.circle(mask, center, radius, 255, -1)
+    ctx = VisionContext(None)
+    ctx.mask = mask
+    return ctx
+
+
+def sample_blobs():
+    return Blobs(np.array([50.0, 400.0, 10.0, 200.0]),
+                 np.array([[0, 0, 10, 10], [20, 20, 20, 20], [50, 50, 5, 5], [80, 80, 20, 10]], np.int32),
+                 np.array([[5.0, 5.0], [30.0, 30.0], [52.0, 52.0], [90.0, 85.0]]))
+
+
+def test_blob_stats_measures_every_blob():
+    ctx = mask_context(((50, 50), 20), ((200, 120), 40))
+    BlobStats()(ctx)
+    blobs = ctx.blobs
+    assert len(blobs) == 2
+    big = blobs.largest()
+    assert blobs.area[big] == pytest.approx(np.pi * 40 ** 2, rel=0.05)
+    assert blobs.center(big) == (200, 120)
+    assert blobs.box(big) == (160, 80, 81, 81)
+
+
+def test_blob_stats_on_an_empty_mask():
+    ctx = mask_context()
+    BlobStats()(ctx)
+    assert len(ctx.blobs) == 0
+    assert ctx.blobs.largest() is None
+
+
+def test_filter_and_top_k_need_no_loop():
+    blobs = sample_blobs()
+    assert blobs.filter(min_area=40).area.tolist() == [50.0, 400.0, 200.0]
+    assert blobs.filter(min_area=40, max_area=250).area.tolist() == [50.0, 200.0]
+    assert blobs.top_k(2).area.tolist() == [400.0, 200.0]
+    assert blobs.extent.tolist() == [0.5, 1.0, 0.4, 1.0]
+
+
+def test_largest_contour_keeps_only_the_largest_blob():
+    ctx = mask_context(((50, 50), 20), ((200, 120), 40))
+    LargestContour()(ctx)
+    assert len(ctx.blobs) == 1
+    assert ctx.blobs.area[0] == pytest.approx(np.pi * 40 ** 2, rel=0.05)
+    assert ctx.blobs.center(0) == (200, 120)
+    x, y, w, h = ctx.blobs.box(0)
+    assert abs(x - 160) <= 1 and abs(w - 81) <= 1
+
+
+def test_largest_contour_on_an_empty_mask():
+    ctx = mask_context()
+    LargestContour()(ctx)
+    assert len(ctx.blobs) == 0
@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from camshift import CamShiftEngine   # noqa: E402
+from vision import BufferPool, make_pipeline   # noqa: E402
+
+GREEN = ((40, 55, 30), (110, 192, 214))
+
+
+def ball_frame(center, radius, size=(480, 360)):
+    hsv = np.zeros((size[1], size[0], 3), np.uint8)
+    hsv[..., 2] = 60                            # dark grey background
+    if radius:
+        cv2.circle(hsv, center, radius, (70, 150, 150), -1)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+
+
+def locked_pipeline(method):
+    engine = CamShiftEngine(method=method)
+    pipeline = make_pipeline(480, 360, *GREEN, pool=BufferPool(), engine=engine)
+    pipeline.run(ball_frame((200, 150), 30))    # threshold path, then the learner locks
+    return engine, pipeline
+
+
+@pytest.mark.parametrize('method', ['camshift', 'meanshift'])
+def test_engine_locks_then_tracks_without_thresholding(method):
+    engine, pipeline = locked_pipeline(method)
+    assert engine.window is not None
+    ctx = pipeline.run(ball_frame((210, 155), 30))
+    assert ctx.done
+    assert ctx.mask is None                     # threshold stages skipped
+    assert engine.tracked_frames == 1
+    cx, cy = ctx.blobs.center(0)
+    assert abs(cx - 210) <= 3 and abs(cy - 155) <= 3
+    assert ctx.blobs.confidence[0] > 0.5
+
+
+@pytest.mark.parametrize('method', ['camshift', 'meanshift'])
+def test_reported_size_grows_with_the_target(method):
+    engine, pipeline = locked_pipeline(method)
+    ctx = pipeline.run(ball_frame((200, 150), 50))
+    x, y, w, h = ctx.blobs.box(0)
+    assert w * h > 1.5 * 60 * 60
+    assert ctx.blobs.area[0] == pytest.approx(np.pi * 50 ** 2, rel=0.25)
+
+
+def test_lost_target_falls_back_to_thresholding():
+    engine, pipeline = locked_pipeline('camshift')
+    blank = ball_frame((200, 150), 0)
+    ctx = pipeline.run(blank)
+    assert not ctx.done
+    assert engine.losses == 1
+    assert len(ctx.blobs) == 0
+
+
+def test_tracking_does_not_allocate():
+    engine, pipeline = locked_pipeline('camshift')
+    for radius in (30, 40, 60, 80):
+        pipeline.run(ball_frame((240, 180), radius))
+    assert engine.tracked_frames == 4
+    assert pipeline.steady_allocations == 0
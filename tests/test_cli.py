@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip('cv2')
+
+from cli import make_parser     # noqa: E402
+
+
+def options(parser):
+    return {option for action in parser._actions for option in action.option_strings}
+
+
+def test_target_options_only_for_the_multi_target_script():
+    assert not {'--color', '--target-policy', '--target-color'} & options(make_parser('flight'))
+    assert not {'--color', '--profile'} & options(make_parser('keyboard', vision=False))
+    args = make_parser('tracking', targets=True).parse_args(['--color', 'red.json', '--target-color', '1'])
+    assert args.color == ['red.json'] and args.target_color == 1 and args.target_policy == 'largest'
@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from estimator import TargetEstimator   # noqa: E402
+
+
+def test_no_estimate_before_a_measurement():
+    assert TargetEstimator().predict(0.0) is None
+
+
+def test_first_measurement_is_taken_as_is():
+    estimator = TargetEstimator()
+    estimator.update((100, 50, 400), 0.0)
+    assert estimator.predict(0.0) == pytest.approx((100, 50, 400))
+
+
+def test_learns_velocity_and_extrapolates():
+    estimator = TargetEstimator()
+    for i in range(30):
+        estimator.update((100 + 300 * i / 30, 50, 400), i / 30)
+    cx, cy, area = estimator.predict(1.0 + 0.1)
+    # 300 px/s: about 30 px past the last measurement at 1.0 - 1/30 s
+    assert cx == pytest.approx(100 + 300 * 1.1, abs=10)
+    assert cy == pytest.approx(50, abs=1)
+    assert area == pytest.approx(400, rel=0.05)
+
+
+def test_smooths_measurement_noise():
+    estimator = TargetEstimator()
+    for i in range(60):
+        estimator.update((100 + (5 if i % 2 else -5), 50, 400), i / 30)
+    assert estimator.predict(2.0)[0] == pytest.approx(100, abs=3)
+
+
+def test_coasting_is_capped_then_the_track_drops():
+    estimator = TargetEstimator(max_coast=0.5)
+    estimator.update((100, 50, 400), 0.0)
+    estimator.update((110, 50, 400), 0.1)
+    far = estimator.predict(10.0)
+    assert far == estimator.predict(0.1 + 0.5)
+    estimator.update(None, 0.4)
+    assert estimator.tracking
+    estimator.update(None, 0.7)
+    assert not estimator.tracking
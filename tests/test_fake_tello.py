@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from fake_tello import FakeTello   # noqa: E402
+from frame_grabber import Frame, FrameGrabber   # noqa: E402
+from recorder import FlightRecorder   # noqa: E402
+from telemetry import Snapshot   # noqa: E402
+
+
+def record_session(root, frames=6):
+    recorder = FlightRecorder(str(root)).start()
+    for seq in range(1, frames + 1):
+        recorder.frame(Frame(seq, 10 + seq / 10, np.full((48, 64, 3), 30 * seq, np.uint8)))
+        recorder.telemetry(Snapshot(battery=100 - seq, height=80, pitch=0, roll=0, yaw=0,
+                                    vgx=0, vgy=0, vgz=0, age=0.0), 10 + seq / 10)
+    recorder.stop()
+    return recorder.directory
+
+
+def test_replay_runs_on_the_recorded_clock(tmp_path):
+    drone = FakeTello(record_session(tmp_path), realtime=False)
+    grabber = FrameGrabber(drone.get_frame_read(), clock=drone.clock, synchronous=True).start()
+    seen = []
+    seq = 0
+    while not grabber.finished:
+        frame = grabber.wait_newer(seq, timeout=0)
+        if frame is None:
+            continue
+        seq = frame.seq
+        seen.append((round(frame.timestamp, 3), drone.get_battery()))
+    drone.end()
+    assert seen == [(round(10 + i / 10, 3), 100 - i) for i in range(1, 7)]
+
+
+def test_rc_packets_are_kept_not_sent(tmp_path):
+    drone = FakeTello(record_session(tmp_path), realtime=False)
+    drone.takeoff()
+    assert drone.get_height() == 80
+    drone.send_rc_control(0, 10, 0, -20)
+    assert drone.commands[-1][1:] == (0, 10, 0, -20)
+    assert drone.stats()['commands'] == 1
+    drone.end()
+
+
+def test_plain_video_gets_timestamps_from_its_frame_rate(tmp_path):
+    path = str(tmp_path / 'clip.mp4')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (64, 48))
+    for i in range(5):
+        writer.write(np.full((48, 64, 3), 40 * i, np.uint8))
+    writer.release()
+    drone = FakeTello(path, realtime=False, battery=55)
+    read = drone.get_frame_read()
+    for _ in range(5):
+        assert read.frame is not None
+    assert drone.clock() == pytest.approx(4 / 25)
+    assert drone.get_battery() == 55
+    read.frame
+    assert read.stopped
+    drone.end()
@@ -0,0 +1,60 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from flow_tracker import FlowTracker   # noqa: E402
+
+
+def textured_frame(offset, size=(320, 240)):
+    """RGB frame with a random-textured square whose top-left is at `offset`."""
+    frame = np.full((size[1], size[0], 3), 40, np.uint8)
+    texture = np.random.default_rng(1).integers(0, 256, (60, 60, 3), dtype=np.uint8)
+    texture = cv2.GaussianBlur(texture, (5, 5), 0)
+    x, y = offset
+    frame[y:y + 60, x:x + 60] = texture
+    return frame
+
+
+def test_flow_follows_a_moving_target():
+    tracker = FlowTracker(budget=1.0)
+    tracker.detected(textured_frame((100, 80)), (100, 80, 60, 60), 0.001)
+    assert tracker.tracking
+    for step in range(1, 4):
+        box = tracker.track(textured_frame((100 + 3 * step, 80 + 2 * step)))
+        assert box is not None
+    x, y, w, h = box
+    assert abs(x - 109) <= 2 and abs(y - 86) <= 2
+    assert abs(w - 60) <= 3
+
+
+def test_lost_when_the_target_disappears():
+    tracker = FlowTracker(budget=1.0)
+    tracker.detected(textured_frame((100, 80)), (100, 80, 60, 60), 0.001)
+    blank = np.full((240, 320, 3), 40, np.uint8)
+    assert tracker.track(blank) is None
+    assert not tracker.tracking
+    assert tracker.need_detection()
+    assert tracker.losses == 1
+
+
+def test_no_track_without_a_detection():
+    tracker = FlowTracker()
+    tracker.detected(textured_frame((100, 80)), None, 0.001)
+    assert not tracker.tracking
+    assert tracker.need_detection()
+
+
+def test_slow_detection_stretches_the_interval():
+    tracker = FlowTracker(budget=0.010)
+    # 40 ms detections against a 10 ms budget: detect about every 4-5 frames
+    tracker.detected(textured_frame((100, 80)), (100, 80, 60, 60), 0.040)
+    assert tracker.interval > 1
+    assert not tracker.need_detection()
+
+
+def test_fast_motion_caps_a_slow_detection_interval():
+    tracker = FlowTracker(budget=0.010, max_drift=40)
+    tracker.motion = 20.0           # px per frame: 40 px of drift in 2 frames
+    tracker.detected(textured_frame((100, 80)), (100, 80, 60, 60), 0.040)
+    assert tracker.interval == 2
@@ -0,0 +1,44 @@
+from frame_grabber import FrameGrabber
+
+
+class FrameRead:
+    """BackgroundFrameRead stand-in: a new object in `frame` is a new decoded frame."""
+
+    def __init__(self):
+        self.frame = None
+
+
+def push(grabber, read, seq):
+    read.frame = object()
+    frame = grabber.wait_newer(seq, timeout=1)
+    assert frame is not None and frame.image is read.frame
+    return frame
+
+
+def test_grabber_numbers_each_new_frame_once():
+    read = FrameRead()
+    grabber = FrameGrabber(read, poll_interval=0.001).start()
+    try:
+        assert grabber.latest() is None
+        first = push(grabber, read, 0)
+        assert first.seq == 1
+        # the same array again is not a new frame
+        assert grabber.wait_newer(1, timeout=0.05) is None
+        assert push(grabber, read, 1).seq == 2
+        assert grabber.newer_than(2) is None
+        assert grabber.latest().seq == 2
+    finally:
+        grabber.stop()
+
+
+def test_ring_buffer_keeps_only_the_newest_frames():
+    read = FrameRead()
+    grabber = FrameGrabber(read, size=2, poll_interval=0.001).start()
+    try:
+        for seq in range(3):
+            push(grabber, read, seq)
+        assert grabber.get(1) is None
+        assert grabber.get(2).seq == 2
+        assert grabber.get(3).seq == 3
+    finally:
+        grabber.stop()
@@ -0,0 +1,43 @@
+from governor import QUALITY_LEVELS, QualityGovernor
+from params import ParamStore
+
+
+def governor(**kwargs):
+    params = ParamStore({})
+    logs = []
+    return params, logs, QualityGovernor(params, budget=0.010, log=logs.append, clock=lambda: 0.0, **kwargs)
+
+
+def test_starts_at_full_quality():
+    params, _, _ = governor()
+    assert params.values == QUALITY_LEVELS[0]
+
+
+def test_steps_down_when_over_budget_and_logs_it():
+    params, logs, quality = governor(down_after=3)
+    for _ in range(3):
+        quality.observe(0.020)
+    assert quality.level == 1
+    assert params['detect_scale'] == QUALITY_LEVELS[1]['detect_scale']
+    assert len(logs) == 1 and 'over budget' in logs[0]
+
+
+def test_steps_back_up_with_headroom():
+    params, _, quality = governor(down_after=1, up_after=3)
+    quality.observe(0.020)
+    assert quality.level == 1
+    for _ in range(3):
+        quality.observe(0.001)
+    assert quality.level == 0
+    assert params['detect_scale'] == 1.0
+
+
+def test_holds_inside_the_band_and_at_the_ends():
+    _, _, quality = governor(down_after=1, up_after=1)
+    for _ in range(10):
+        quality.observe(0.007)                  # between 50% and 90% of the budget
+    assert quality.level == 0
+    for _ in range(20):
+        quality.observe(1.0)
+    assert quality.level == len(QUALITY_LEVELS) - 1
+    assert quality.stats()['changes'] == len(QUALITY_LEVELS) - 1
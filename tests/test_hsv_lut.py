@@ -0,0 +1,69 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from hsv_lut import HsvLut, LutThreshold   # noqa: E402
+from vision import BufferPool, VisionContext   # noqa: E402
+
+RED = ((170, 50, 50), (10, 255, 255))       # H Min > H Max: wraps past 179
+GREEN = ((40, 55, 30), (110, 192, 214))
+
+
+def hsv_row(*hues, s=100, v=100):
+    return np.array([[(h, s, v) for h in hues]], np.uint8)
+
+
+def threshold(stage, hsv, pool=None):
+    ctx = VisionContext(None, pool)
+    ctx.blurred = hsv
+    stage(ctx)
+    return ctx
+
+
+def random_hsv(shape=(48, 64)):
+    hsv = np.random.default_rng(0).integers(0, 256, shape + (3,), dtype=np.uint8)
+    hsv[..., 0] %= 180
+    return hsv
+
+
+def test_lut_hue_wraps_past_179():
+    hsv = hsv_row(175, 179, 0, 5, 10, 11, 90, 169)
+    assert HsvLut([RED]).apply(hsv).tolist() == [[255, 255, 255, 255, 255, 0, 0, 0]]
+
+
+def test_lut_matches_in_range_for_a_plain_range():
+    import cv2
+    hsv = random_hsv()
+    expected = cv2.inRange(hsv, np.array(GREEN[0]), np.array(GREEN[1]))
+    assert np.array_equal(HsvLut([GREEN]).apply(hsv), expected)
+
+
+def test_lut_sets_one_bit_per_range():
+    bits = HsvLut([GREEN, RED]).apply(hsv_row(175, 60, 90, 20))
+    assert bits.tolist() == [[2, 1, 1, 0]]
+
+
+def test_tables_rebuild_only_when_ranges_change():
+    lut = HsvLut([GREEN])
+    table = lut.table
+    assert not lut.set_ranges([GREEN])
+    assert lut.table is table
+    assert lut.set_ranges([RED])
+    assert lut.table is not table
+
+
+@pytest.mark.parametrize('pool', [None, BufferPool()])
+def test_lut_threshold_matches_table_for_wrapped_range(pool):
+    hsv = random_hsv()
+    ctx = threshold(LutThreshold(*RED), hsv, pool)
+    assert np.array_equal(ctx.mask, HsvLut([RED]).apply(hsv))
+
+
+def test_lut_threshold_sets_one_bit_per_range():
+    stage = LutThreshold(*GREEN)
+    stage.set_ranges([GREEN, RED])
+    ctx = threshold(stage, hsv_row(175, 60, 90), BufferPool())
+    assert ctx.colors == 2
+    assert ctx.bits.tolist() == [[2, 1, 1]]
+    assert ctx.mask.tolist() == [[255, 255, 255]]
@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from hud import Hud   # noqa: E402
+
+
+def drawn(hud, shape=(120, 160, 3), fill=7):
+    frame = np.full(shape, fill, np.uint8)
+    return hud.apply(frame)
+
+
+def test_stamp_matches_drawing_directly():
+    hud = Hud()
+    hud.rectangle((20, 20), (100, 80), (0, 0, 255), 2)
+    hud.line((0, 60), (160, 60), (255, 0, 0), 1)
+    expected = np.full((120, 160, 3), 7, np.uint8)
+    cv2.rectangle(expected, (20, 20), (100, 80), (0, 0, 255), 2)
+    cv2.line(expected, (0, 60), (160, 60), (255, 0, 0), 1)
+    assert np.array_equal(drawn(hud), expected)
+
+
+def test_text_only_touches_its_own_box():
+    hud = Hud()
+    hud.text('label', 'Up', (10, 30), (0, 255, 0))
+    changed = np.argwhere((drawn(hud) != 7).any(axis=2))
+    assert len(changed)
+    (w, h), baseline = cv2.getTextSize('Up', cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+    assert changed[:, 1].min() >= 10 - 2 and changed[:, 1].max() <= 10 + w + 2
+    assert changed[:, 0].min() >= 30 - h - 2 and changed[:, 0].max() <= 30 + baseline + 2
+
+
+def test_text_is_rerendered_only_when_it_changes():
+    hud = Hud()
+    hud.text('fb', 'Forward')
+    drawn(hud)
+    hud.text('fb', 'Forward')
+    drawn(hud)
+    assert hud.renders == 1
+    hud.text('fb', None)
+    frame = drawn(hud)
+    assert hud.renders == 2
+    assert (frame == 7).all()
@@ -0,0 +1,73 @@
+import json
+
+from params import ParamStore, ProfileFile, has_hsv_range, hsv_range
+
+HSV = {'h_min': 40, 'h_max': 110, 's_min': 55, 's_max': 192, 'v_min': 30, 'v_max': 214}
+
+
+def test_version_moves_only_on_real_changes():
+    store = ParamStore({'kp_yaw': 0.3, **HSV})
+    values = store.values
+    assert not store.update({'kp_yaw': 0.3})
+    assert store.version == 0
+    assert store.set('kp_yaw', 0.5)
+    assert store.version == 1
+    assert store['kp_yaw'] == 0.5
+    # published dicts are never modified
+    assert values['kp_yaw'] == 0.3
+
+
+def test_hsv_range_from_values():
+    assert has_hsv_range(HSV)
+    assert not has_hsv_range({'h_min': 0})
+    assert hsv_range(HSV) == ((40, 55, 30), (110, 192, 214))
+
+
+def test_profile_round_trip(tmp_path):
+    path = tmp_path / 'profiles' / 'green.json'
+    store = ParamStore({'kp_yaw': 0.3, **HSV})
+    store.save(str(path), keys=list(HSV))
+    assert json.loads(path.read_text()) == HSV
+    other = ParamStore({'kp_yaw': 0.3, 'h_min': 0})
+    assert other.load(str(path))
+    assert other.hsv_range() == store.hsv_range()
+
+
+def test_profile_file_reloads_on_change(tmp_path):
+    path = tmp_path / 'gains.json'
+    store = ParamStore({'kp_yaw': 0.3})
+    source = ProfileFile(store, str(path))
+    assert not source.poll()                    # no file yet
+    path.write_text('{"kp_yaw": 0.4}')
+    assert source.poll()
+    assert store['kp_yaw'] == 0.4
+    assert not source.poll()                    # unchanged
+    path.write_text('{"kp_yaw": ')              # half-written: skipped, not fatal
+    import os
+    os.utime(path, (1, 1))
+    assert not source.poll()
+    assert store['kp_yaw'] == 0.4
+
+
+def test_loaded_values_are_checked(tmp_path, capsys):
+    path = tmp_path / 'gains.json'
+    path.write_text(json.dumps({'kp_yaw': 1, 'h_min': 400, 'blur': 'big', 'typo': 3, 'erode': 2.0,
+                                'colors': [[[0, 50, 50], [10, 255, 255]]]}))
+    store = ParamStore({'kp_yaw': 0.3, **HSV})
+    assert store.load(str(path))
+    assert store['kp_yaw'] == 1.0 and isinstance(store['kp_yaw'], float)
+    assert store['erode'] == 2 and isinstance(store['erode'], int)
+    assert store['h_min'] == 40
+    assert 'blur' not in store.values and 'typo' not in store.values
+    assert store['colors'] == [[[0, 50, 50], [10, 255, 255]]]
+    log = capsys.readouterr().out
+    assert "'h_min'" in log and "'blur'" in log and "unknown parameter 'typo'" in log
+
+
+def test_non_object_json_is_ignored(tmp_path, capsys):
+    path = tmp_path / 'gains.json'
+    path.write_text('[0.5]')
+    store = ParamStore({'kp_yaw': 0.3})
+    assert not ProfileFile(store, str(path)).poll()
+    assert store.version == 0
+    assert 'expected a JSON object' in capsys.readouterr().out
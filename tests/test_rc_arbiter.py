@@ -0,0 +1,81 @@
+import pytest
+
+from rc_arbiter import PRIORITY_KEYBOARD, RcArbiter
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Drone:
+    def __init__(self):
+        self.sent = []
+
+    def send_rc_control(self, *command):
+        self.sent.append(command)
+
+
+def test_arbiter_merges_axes_by_priority():
+    arbiter = RcArbiter(Drone(), clock=Clock())
+    arbiter.demand('vision', yaw=20, fb=10)
+    arbiter.demand('vision', ud=-5)             # same source: only the named axis changes
+    arbiter.demand('keyboard', PRIORITY_KEYBOARD, yaw=-30)
+    assert arbiter.merge() == (0, 10, -5, -30)
+    arbiter.release('keyboard')
+    assert arbiter.merge() == (0, 10, -5, 20)
+
+
+def test_arbiter_drops_stale_demands():
+    clock = Clock()
+    arbiter = RcArbiter(Drone(), timeout=1.0, clock=clock)
+    arbiter.demand('vision', fb=10)
+    clock.now = 1.5
+    assert arbiter.merge() == (0, 0, 0, 0)
+
+
+def test_arbiter_suppresses_repeats_until_keepalive():
+    clock = Clock()
+    drone = Drone()
+    arbiter = RcArbiter(drone, keepalive=1.0, timeout=10.0, clock=clock)
+    arbiter.demand('vision', yaw=20)
+    assert arbiter.tick() == (0, 0, 0, 20)
+    clock.now = 0.5
+    assert arbiter.tick() is None
+    assert arbiter.suppressed == 1
+    clock.now = 1.0
+    assert arbiter.tick() == (0, 0, 0, 20)
+    arbiter.demand('vision', yaw=0)
+    clock.now = 1.1
+    assert arbiter.tick() == (0, 0, 0, 0)
+    assert drone.sent == [(0, 0, 0, 20), (0, 0, 0, 20), (0, 0, 0, 0)]
+
+
+def test_stop_sends_zero_at_once():
+    drone = Drone()
+    arbiter = RcArbiter(drone, clock=Clock())
+    arbiter.demand('vision', fb=10)
+    arbiter.stop()
+    assert drone.sent == [(0, 0, 0, 0)]
+    assert arbiter.merge() == (0, 0, 0, 0)
+
+
+def test_arbiter_rejects_unknown_axis():
+    with pytest.raises(ValueError):
+        RcArbiter(Drone()).demand('vision', roll=10)
+
+
+def test_on_send_sees_every_packet():
+    clock = Clock()
+    arbiter = RcArbiter(Drone(), clock=clock)
+    sent = []
+    arbiter.on_send(lambda command, now: sent.append((now, command)))
+    arbiter.demand('vision', lr=5)
+    arbiter.tick()
+    clock.now = 0.1
+    arbiter.tick()                              # suppressed repeat
+    arbiter.stop()
+    assert sent == [(0.0, (5, 0, 0, 0)), (0.1, (0, 0, 0, 0))]
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from frame_grabber import Frame   # noqa: E402
+from recorder import Columns, FlightRecorder, load_log   # noqa: E402
+from telemetry import Snapshot   # noqa: E402
+
+
+def snapshot(battery, age=0.0):
+    return Snapshot(battery=battery, height=80, pitch=0, roll=0, yaw=0, vgx=0, vgy=0, vgz=0, age=age)
+
+
+def test_columns_hand_out_full_chunks():
+    columns = Columns(('a', 'b'), chunk=3)
+    assert columns.append((0.0, 1, 2)) is None
+    assert columns.append((0.1, 3, 4)) is None
+    index, chunk = columns.append((0.2, 5, 6))
+    assert index == 0
+    assert chunk['t'].tolist() == [0.0, 0.1, 0.2]
+    assert chunk['b'].tolist() == [2, 4, 6]
+    assert columns.flush() is None
+    columns.append((0.3, 7, 8))
+    index, chunk = columns.flush()
+    assert index == 1
+    assert chunk['a'].tolist() == [7]
+
+
+def test_session_round_trip(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), chunk=4).start()
+    for seq in range(1, 11):
+        image = np.full((48, 64, 3), 20 * seq, np.uint8)
+        recorder.frame(Frame(seq, seq / 30, image))
+        recorder.telemetry(snapshot(100 - seq), seq / 30)
+        recorder.command((0, 0, 0, seq), seq / 30)
+    recorder.stop()
+
+    frames = load_log(recorder.directory, 'frames')
+    assert frames['seq'].tolist() == list(range(1, 11))
+    assert load_log(recorder.directory, 'telemetry')['battery'].tolist() == list(range(99, 89, -1))
+    assert load_log(recorder.directory, 'commands')['yaw'].tolist() == list(range(1, 11))
+    with open(os.path.join(recorder.directory, 'session.json')) as f:
+        assert json.load(f)['frames_written'] == 10
+    capture = cv2.VideoCapture(os.path.join(recorder.directory, 'video.mp4'))
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 10
+    capture.release()
+
+
+def test_telemetry_logged_once_per_state_packet(tmp_path):
+    recorder = FlightRecorder(str(tmp_path)).start()
+    recorder.telemetry(snapshot(90), 0.0)
+    recorder.telemetry(snapshot(90, age=0.01), 0.01)
+    recorder.telemetry(snapshot(89), 0.1)
+    recorder.stop()
+    assert load_log(recorder.directory, 'telemetry')['t'].tolist() == [0.0, 0.1]
@@ -0,0 +1,37 @@
+from roi import RoiTracker
+
+
+def test_full_frame_until_locked():
+    roi = RoiTracker(640, 480)
+    assert roi.window() is None
+    roi.update(None)
+    assert roi.window() is None
+    assert roi.stats()['full_frames'] == 2
+
+
+def test_window_follows_the_target_motion():
+    roi = RoiTracker(640, 480, margin=2.0)
+    roi.window()
+    roi.update((300, 200, 40, 40))
+    assert roi.window() == (280, 180, 80, 80)
+    roi.update((310, 200, 40, 40))              # 10 px right per frame
+    assert roi.window() == (300, 180, 80, 80)
+
+
+def test_window_slides_back_inside_the_frame():
+    roi = RoiTracker(640, 480)
+    roi.window()
+    roi.update((0, 0, 40, 40))
+    assert roi.window()[:2] == (0, 0)
+
+
+def test_misses_widen_then_drop_the_lock():
+    roi = RoiTracker(640, 480, margin=2.0, growth=1.5, max_misses=2)
+    roi.window()
+    roi.update((300, 200, 40, 40))
+    roi.window()
+    roi.update(None)
+    assert roi.window()[2] == 120
+    roi.update(None)
+    assert not roi.locked
+    assert roi.window() is None
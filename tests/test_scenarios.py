@@ -0,0 +1,42 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from scenarios import tracking_metrics   # noqa: E402
+
+
+def test_time_to_center_needs_a_steady_hold():
+    t = np.arange(0, 5, 0.1)
+    error = np.where(t < 1.0, 0.8, 0.0)
+    metrics = tracking_metrics(t, error, np.zeros_like(t), hold=1.0)
+    assert metrics['time_to_center_s'] == pytest.approx(1.0)
+    assert metrics['steady_error_x'] == 0.0
+
+
+def test_overshoot_is_measured_against_the_start_offset():
+    t = np.arange(0, 5, 0.1)
+    error = 0.8 * np.exp(-t) * np.cos(2 * t)
+    metrics = tracking_metrics(t, error, np.zeros_like(t))
+    swing = -np.min(error)
+    assert metrics['overshoot_x'] == pytest.approx(swing / 0.8, abs=1e-3)
+    assert metrics['overshoot_y'] is None       # started centred
+
+
+def test_frames_out_of_view_are_not_centred():
+    t = np.arange(0, 2, 0.1)
+    error = np.full_like(t, math.nan)
+    metrics = tracking_metrics(t, error, error)
+    assert metrics['visible_fraction'] == 0.0
+    assert metrics['centred_fraction'] == 0.0
+    assert metrics['time_to_center_s'] is None
+
+
+def test_frames_without_a_lock_are_not_centred():
+    t = np.arange(0, 3, 0.1)
+    zero = np.zeros_like(t)
+    metrics = tracking_metrics(t, zero, zero, locked=t >= 1.0)
+    assert metrics['locked_fraction'] == pytest.approx(2 / 3, abs=0.02)
+    assert metrics['centred_fraction'] == metrics['locked_fraction']
+    assert metrics['time_to_center_s'] == pytest.approx(1.0)
@@ -0,0 +1,54 @@
+import time
+
+from scheduler import FixedRateScheduler
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_threaded_scheduler_keeps_its_rate():
+    ticks = []
+    scheduler = FixedRateScheduler(lambda: ticks.append(time.monotonic()), rate_hz=100).start()
+    time.sleep(0.3)
+    scheduler.stop()
+    # generous bounds: CI machines are noisy
+    assert 10 <= len(ticks) <= 40
+    assert scheduler.stats()['ticks'] == len(ticks)
+
+
+def test_slow_ticks_are_skipped_and_counted():
+    scheduler = FixedRateScheduler(lambda: time.sleep(0.025), rate_hz=100).start()
+    time.sleep(0.2)
+    scheduler.stop()
+    assert scheduler.missed > 0
+
+
+def test_inline_scheduler_runs_due_ticks_on_poll():
+    clock = Clock()
+    ticks = []
+    scheduler = FixedRateScheduler(lambda: ticks.append(clock.now), rate_hz=10, clock=clock, inline=True).start()
+    scheduler.poll()
+    clock.now = 0.05
+    scheduler.poll()
+    assert ticks == [0.0]
+    clock.now = 0.1
+    scheduler.poll()
+    assert ticks == [0.0, 0.1]
+    # a late poll runs one tick and counts the deadline it skipped
+    clock.now = 0.35
+    scheduler.poll()
+    assert ticks == [0.0, 0.1, 0.35]
+    assert scheduler.missed == 1
+    assert scheduler.stats()['ticks'] == 3
+
+
+def test_threaded_scheduler_ignores_poll():
+    ticks = []
+    scheduler = FixedRateScheduler(lambda: ticks.append(1), rate_hz=10, clock=Clock())
+    scheduler.poll()
+    assert ticks == []
@@ -0,0 +1,63 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_script(*args):
+    done = subprocess.run([sys.executable, *args], cwd=ROOT, stdin=subprocess.DEVNULL,
+                          capture_output=True, text=True, timeout=300)
+    assert done.returncode == 0, done.stderr
+    return done.stdout
+
+
+def printed(stdout, label):
+    """The dict a script printed after `label: ` at exit."""
+    line = next(line for line in stdout.splitlines() if line.startswith(label + ': '))
+    return ast.literal_eval(line[len(label) + 2:])
+
+
+def ball_video(path, frames=60):
+    """Green ball left of centre, as a camera would see it (BGR file)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (960, 720))
+    for _ in range(frames):
+        hsv = np.zeros((720, 960, 3), np.uint8)
+        cv2.circle(hsv, (250, 360), 150, (70, 150, 150), -1)
+        writer.write(cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR))
+    writer.release()
+
+
+@pytest.mark.parametrize('script', ['practica1.py', 'practica2.py'])
+def test_script_follows_a_replayed_video(tmp_path, script):
+    path = str(tmp_path / 'ball.mp4')
+    ball_video(path)
+    stdout = run_script(script, '--headless', '--replay', path, '--replay-fast')
+    replay = printed(stdout, 'Replay')
+    assert replay['frames'] == 60
+    assert replay['detections'] == 60
+    # the ball sits left of centre: the script must have turned towards it
+    assert replay['commands'] > 1
+    assert 'Vision buffers: ' in stdout and ', 0 after start-up' in stdout
+
+
+@pytest.mark.parametrize('script', ['practica1.py', 'practica2.py'])
+def test_script_locks_on_synthetic_yaw_offset(tmp_path, script):
+    results = tmp_path / 'yaw_offset.json'
+    stdout = run_script(script, '--headless', '--replay', 'synthetic:yaw_offset', '--replay-fast',
+                        '--bench-out', str(results))
+    metrics = json.loads(results.read_text())
+    assert metrics['frames'] == 300
+    assert metrics['locked_fraction'] > 0.9
+    # starts 30 deg off: centring takes a turn, and more rc traffic than the 1/s keepalive
+    assert 0 < metrics['time_to_center_s'] < 5
+    assert metrics['commands_per_s'] > 1.0
+    assert 'vision_ms_mean' in metrics
+    assert ', 0 after start-up' in stdout
@@ -0,0 +1,59 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from blobs import Blobs   # noqa: E402
+from targets import TargetTracker   # noqa: E402
+
+
+def blobs(*items):
+    """Blobs from (cx, cy, area[, color]) tuples."""
+    if not items:
+        return Blobs.empty()
+    centroid = np.array([item[:2] for item in items], np.float64)
+    area = np.array([item[2] for item in items], np.float64)
+    color = np.array([item[3] if len(item) > 3 else 0 for item in items], np.intp)
+    side = np.sqrt(area)
+    bbox = np.column_stack([centroid - side[:, None] / 2, side, side]).astype(np.int32)
+    return Blobs(area, bbox, centroid, color=color)
+
+
+def test_ids_persist_across_frames():
+    tracker = TargetTracker((640, 480))
+    tracker.update(blobs((100, 100, 400), (400, 300, 900)))
+    ids = {tuple(t.centroid): t.id for t in tracker.tracks}
+    tracker.update(blobs((410, 305, 900), (105, 102, 400)))
+    moved = {t.id: tuple(t.centroid) for t in tracker.tracks}
+    assert moved[ids[(100, 100)]] == (105, 102)
+    assert moved[ids[(400, 300)]] == (410, 305)
+
+
+def test_selection_is_sticky():
+    tracker = TargetTracker((640, 480), policy='largest')
+    tracker.update(blobs((100, 100, 400)))
+    first = tracker.target().id
+    # a bigger blob appears: keep following the current one
+    tracker.update(blobs((102, 100, 400), (400, 300, 2500)))
+    assert tracker.target().id == first
+
+
+def test_policy_picks_a_new_target_once_the_old_one_is_gone():
+    tracker = TargetTracker((640, 480), policy='closest', max_missed=1)
+    tracker.update(blobs((100, 100, 2500), (330, 250, 400)))
+    assert tuple(tracker.target().centroid) == (330, 250)
+    tracker.update(blobs((100, 100, 2500)))
+    tracker.update(blobs((100, 100, 2500)))
+    assert tuple(tracker.target().centroid) == (100, 100)
+
+
+def test_colour_filter_restricts_selection():
+    tracker = TargetTracker((640, 480), color=1)
+    tracker.update(blobs((100, 100, 2500, 0), (400, 300, 400, 1)))
+    assert tracker.target().color == 1
+
+
+def test_far_jumps_start_new_tracks():
+    tracker = TargetTracker((640, 480), max_distance=50)
+    tracker.update(blobs((100, 100, 400)))
+    tracker.update(blobs((300, 300, 400)))
+    assert sorted(t.id for t in tracker.tracks) == [1, 2]
@@ -0,0 +1,64 @@
+import pytest
+
+from telemetry import Telemetry
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Drone:
+    def __init__(self, state=None):
+        self.state = state or {}
+
+    def get_current_state(self):
+        return self.state
+
+
+def test_snapshot_maps_state_keys():
+    telemetry = Telemetry(Drone({'bat': 80, 'h': 50, 'yaw': -20}), clock=Clock())
+    snapshot = telemetry.refresh()
+    assert (snapshot.battery, snapshot.height, snapshot.yaw, snapshot.vgx) == (80, 50, -20, 0)
+    assert telemetry.snapshot is snapshot
+
+
+def test_on_change_fires_only_when_the_field_changes():
+    drone = Drone({'bat': 80})
+    telemetry = Telemetry(drone, clock=Clock())
+    changes = []
+    telemetry.on_change('battery', lambda old, new: changes.append((old, new)))
+    telemetry.refresh()
+    telemetry.refresh()
+    drone.state = {'bat': 79}
+    telemetry.refresh()
+    assert changes == [(None, 80), (80, 79)]
+
+
+def test_on_change_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        Telemetry(Drone()).on_change('altitude', print)
+
+
+def test_age_counts_from_the_last_new_packet():
+    clock = Clock()
+    drone = Drone()
+    telemetry = Telemetry(drone, clock=clock)
+    assert telemetry.refresh().age == float('inf')
+    drone.state = {'bat': 80}
+    assert telemetry.refresh().age == 0
+    clock.now = 0.3
+    assert telemetry.refresh().age == pytest.approx(0.3)
+    drone.state = {'bat': 80}       # djitellopy stores a new dict per packet
+    assert telemetry.refresh().age == 0
+
+
+def test_battery_is_unknown_before_the_first_packet():
+    drone = Drone()
+    telemetry = Telemetry(drone, clock=Clock())
+    assert telemetry.refresh().battery is None
+    drone.state = {'bat': 0}
+    assert telemetry.refresh().battery == 0
@@ -0,0 +1,35 @@
+import socket
+
+import pytest
+
+pytest.importorskip('cv2')
+
+from tello_sim import SimulatedTello    # noqa: E402
+
+
+@pytest.fixture
+def sim():
+    sim = SimulatedTello(port=0, state_hz=100).start()
+    yield sim
+    sim.stop()
+
+
+def send(sim, command):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+        client.settimeout(2)
+        client.sendto(command.encode(), sim.socket.getsockname())
+        return client.recvfrom(1024)[0].decode()
+
+
+def test_streamon_is_refused_without_ffmpeg(sim):
+    sim.ffmpeg = None
+    assert send(sim, 'command') == 'ok'
+    assert send(sim, 'streamon') == 'error'
+    assert not sim.streaming
+    assert send(sim, 'streamoff') == 'ok'
+
+
+def test_commands_are_answered(sim):
+    assert send(sim, 'battery?') == '100'
+    assert send(sim, 'takeoff') == 'ok'
+    assert sim.stats()['served'] == 2
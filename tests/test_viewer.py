@@ -0,0 +1,50 @@
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from display import Display     # noqa: E402
+from viewer import MjpegViewer  # noqa: E402
+
+
+@pytest.fixture
+def viewer():
+    viewer = MjpegViewer(port=0, host='127.0.0.1', fps=0).start()
+    yield viewer
+    viewer.stop()
+
+
+def url(viewer, path):
+    return f'http://127.0.0.1:{viewer.server.server_address[1]}{path}'
+
+
+def test_declared_streams_are_listed_before_any_frame(viewer):
+    Display(viewer=viewer, streams=('Video Stream',))
+    page = urllib.request.urlopen(url(viewer, '/'), timeout=5).read().decode()
+    assert '/stream/Video%20Stream' in page
+    assert '/stream/Tello' not in page
+
+
+def test_unknown_stream_is_not_found(viewer):
+    viewer.declare(['Original'])
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(url(viewer, '/stream/Tello'), timeout=5)
+    assert error.value.code == 404
+    assert viewer.clients == 0
+
+
+def test_declared_stream_serves_submitted_frames(viewer):
+    viewer.declare(['Mask'])
+    response = urllib.request.urlopen(url(viewer, '/stream/Mask'), timeout=5)
+    for _ in range(100):
+        if viewer.has_clients:
+            break
+        time.sleep(0.01)
+    assert viewer.submit('Mask', np.zeros((24, 32), np.uint8))
+    assert response.readline().strip() == b'--frame'
+    assert response.readline().strip() == b'Content-Type: image/jpeg'
+    response.close()
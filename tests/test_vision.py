@@ -0,0 +1,79 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+
+from governor import QUALITY_SCALES    # noqa: E402
+from vision import BufferPool, make_pipeline    # noqa: E402
+
+GREEN = ((40, 55, 30), (110, 192, 214))
+
+
+def ball_frame(center, radius, size=(960, 720)):
+    """RGB frame, black but for a green disc."""
+    hsv = np.zeros((size[1], size[0], 3), np.uint8)
+    cv2.circle(hsv, center, radius, (70, 150, 150), -1)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+
+
+def test_pipeline_finds_the_ball_in_display_pixels():
+    # 960x720 camera frame, 480x360 display: the ball lands at half its coordinates
+    ctx = make_pipeline(480, 360, *GREEN, pool=BufferPool()).run(ball_frame((400, 300), 60))
+    largest = ctx.blobs.largest()
+    x, y, w, h = ctx.blobs.box(largest)
+    assert abs(x + w / 2 - 200) <= 2 and abs(y + h / 2 - 150) <= 2
+    assert abs(w - 60) <= 3
+    assert ctx.blobs.area[largest] == pytest.approx(np.pi * 30 ** 2, rel=0.1)
+
+
+def test_pooled_pipeline_stops_allocating_after_the_first_frame():
+    pool = BufferPool()
+    pipeline = make_pipeline(480, 360, *GREEN, pool=pool)
+    for x in (200, 400, 600):
+        pipeline.run(ball_frame((x, 300), 60))
+    assert pool.allocations > 0
+    assert pipeline.steady_allocations == 0
+
+
+def test_buffer_pool_reuses_a_larger_buffer():
+    pool = BufferPool()
+    big = pool.get('mask', (100, 100))
+    small = pool.get('mask', (50, 40))
+    assert small.shape == (50, 40)
+    assert np.shares_memory(big, small)
+    assert pool.allocations == 1
+
+
+@pytest.mark.parametrize('scale', [0.5, 0.25])
+def test_reduced_scale_reports_display_pixels(scale):
+    ctx = make_pipeline(480, 360, *GREEN, pool=BufferPool(), scale=scale).run(ball_frame((400, 300), 60))
+    x, y, w, h = ctx.blobs.box(ctx.blobs.largest())
+    assert ctx.scale == scale
+    assert abs(x + w / 2 - 200) <= 3 and abs(y + h / 2 - 150) <= 3
+    assert ctx.blobs.area[ctx.blobs.largest()] == pytest.approx(np.pi * 30 ** 2, rel=0.15)
+
+
+def test_roi_search_maps_back_to_display_pixels():
+    pipeline = make_pipeline(480, 360, *GREEN, pool=BufferPool())
+    pipeline['roi'].set_window((150, 100, 100, 100))
+    ctx = pipeline.run(ball_frame((400, 300), 60))
+    x, y, w, h = ctx.blobs.box(ctx.blobs.largest())
+    assert ctx.roi is not None
+    assert abs(x + w / 2 - 200) <= 2 and abs(y + h / 2 - 150) <= 2
+
+
+@pytest.mark.parametrize('direct', [False, True])
+def test_pipeline_runs_without_a_pool(direct):
+    ctx = make_pipeline(480, 360, *GREEN, direct=direct).run(ball_frame((300, 200), 80))
+    x, y, w, h = ctx.blobs.box(ctx.blobs.largest())
+    assert abs(x + w / 2 - 150) <= 2 and abs(y + h / 2 - 100) <= 2
+
+
+def test_preallocating_every_governor_scale_covers_stepping():
+    pool = BufferPool()
+    pipeline = make_pipeline(480, 360, *GREEN, pool=pool).preallocate((720, 960, 3), scales=QUALITY_SCALES)
+    assert pipeline.steady_allocations == 0
+    for scale in QUALITY_SCALES:
+        pipeline['resize'].set_scale(scale)
+        pipeline.run(ball_frame((400, 300), 60))
+    assert pipeline.steady_allocations == 0
@@ -0,0 +1,167 @@
+import queue
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+import cv2
+
+BOUNDARY = b'frame'
+
+
+class MjpegViewer:
+    """Annotated frames served as MJPEG over HTTP, e.g. http://drone-host:8080/.
+
+    `submit()` never blocks the caller: without clients, or sooner than
+    `fps` allows, it returns at once; otherwise the frame is copied into a
+    small queue and, when the encoder thread is behind, the oldest queued
+    frame is dropped. Each client is sent only the newest JPEG of its
+    stream, so a slow connection skips frames instead of holding anything up.
+
+    Streams are `declare()`d up front: headless, nothing is shown until a
+    client attaches, so the index could not learn them from `submit()`.
+    Unknown stream names get a 404 rather than a connection that never
+    receives a frame.
+    """
+
+    def __init__(self, port=8080, host='0.0.0.0', quality=80, fps=15, queue_size=2):
+        self.quality = quality
+        self.period = 1.0 / fps if fps else 0.0
+        self.submitted = 0
+        self.dropped = 0
+        self.encoded = 0
+        self.clients = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jpegs = {}            # stream name -> (seq, bytes)
+        self._names = set()         # declared or submitted streams, for the index page
+        self._cond = threading.Condition()
+        self._last_submit = {}
+        self._running = False
+        self._encoder = None
+
+        viewer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                viewer._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._server_thread = None
+
+    def start(self):
+        self._running = True
+        self._encoder = threading.Thread(target=self._encode, name='MjpegEncoder', daemon=True)
+        self._encoder.start()
+        self._server_thread = threading.Thread(target=self.server.serve_forever, name='MjpegServer', daemon=True)
+        self._server_thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self.server.shutdown()
+        self.server.server_close()
+        with self._cond:
+            self._cond.notify_all()
+
+    def declare(self, names):
+        """Stream names the script will show, so they are listed before the first frame."""
+        self._names.update(names)
+        return self
+
+    @property
+    def has_clients(self):
+        return self.clients > 0
+
+    def submit(self, name, image):
+        """Queue `image` for the clients of stream `name`; drops rather than waits."""
+        self._names.add(name)
+        if not self.clients:
+            return False
+        now = time.monotonic()
+        if now - self._last_submit.get(name, 0.0) < self.period:
+            return False
+        self._last_submit[name] = now
+        item = (name, image.copy())     # pooled display buffers are overwritten by the next frame
+        self.submitted += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self._queue.put_nowait(item)
+        return True
+
+    def _encode(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while self._running:
+            try:
+                name, image = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            ok, jpeg = cv2.imencode('.jpg', image, params)
+            if not ok:
+                continue
+            with self._cond:
+                seq = self._jpegs.get(name, (0, None))[0] + 1
+                self._jpegs[name] = (seq, jpeg.tobytes())
+                self.encoded += 1
+                self._cond.notify_all()
+
+    def _handle(self, request):
+        # window names carry spaces ('Video Stream'), which arrive percent-encoded
+        path = unquote(request.path.split('?', 1)[0]).strip('/')
+        if path == '':
+            page = ''.join(f'<h3>{escape(n)}</h3><img src="/stream/{quote(n)}">' for n in sorted(self._names))
+            body = f'<html><body style="background:#222;color:#ddd">{page}</body></html>'.encode()
+            request.send_response(200)
+            request.send_header('Content-Type', 'text/html')
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+            return
+        name = path[len('stream/'):]
+        if not path.startswith('stream/') or name not in self._names:
+            request.send_error(404)
+            return
+        self._stream(request, name)
+
+    def _stream(self, request, name):
+        request.send_response(200)
+        request.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=' + BOUNDARY.decode())
+        request.send_header('Cache-Control', 'no-cache')
+        request.end_headers()
+        with self._cond:
+            self.clients += 1
+        sent = 0
+        try:
+            while self._running:
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._running or
+                                        self._jpegs.get(name, (0, None))[0] > sent, timeout=1.0)
+                    sent, jpeg = self._jpegs.get(name, (0, None))
+                if jpeg is None or not self._running:
+                    continue
+                request.wfile.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n'
+                                    b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'encoded': self.encoded,
+            'dropped': self.dropped,
+            'clients': self.clients,
+        }
@@ -0,0 +1,384 @@
+import time
+
+import cv2
+import numpy as np
+
+from blobs import Blobs, BlobStats, LargestContour
+from hsv_lut import DirectLutThreshold, LutThreshold
+from params import hsv_range, has_hsv_range
+
+# djitellopy decodes frames as RGB; webcams read through cv2.VideoCapture are BGR
+DRONE_TO_HSV = cv2.COLOR_RGB2HSV
+WEBCAM_TO_HSV = cv2.COLOR_BGR2HSV
+
+# decoded Tello video frames (720p)
+TELLO_FRAME_SHAPE = (720, 960, 3)
+
+
+def scaled_ksize(ksize, scale):
+    """Odd kernel size covering the same display area at detection scale."""
+    return max(1, int(round(ksize * scale))) | 1
+
+
+def scaled_iterations(iterations, scale):
+    return max(1, int(round(iterations * scale))) if iterations else 0
+
+
+class BufferPool:
+    """Named intermediate buffers reused from frame to frame.
+
+    Stages ask for a buffer by name and shape and write into it through
+    OpenCV's `dst=` argument. Each name is backed by one flat array handed
+    out as a contiguous view of the requested shape, so a smaller request
+    (an ROI crop) reuses it; it is only reallocated when it has to grow.
+    Every allocation is counted so the steady state can be checked to stay
+    at zero.
+    """
+
+    def __init__(self):
+        self.allocations = 0
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        size = int(np.prod(shape))
+        buf = self._buffers.get(name)
+        if buf is None or buf.size < size or buf.dtype != dtype:
+            buf = np.empty(size, dtype)
+            self._buffers[name] = buf
+            self.allocations += 1
+        return buf[:size].reshape(shape)
+
+
+class VisionContext:
+    """Everything one pass of the pipeline produced for a single frame.
+
+    With a BufferPool the arrays below are overwritten by the next pass.
+    """
+
+    def __init__(self, image, pool=None):
+        self.pool = pool
+        self.image = image      # input frame, never modified
+        self.frame = None       # resized frame, same channel order as the input
+        self.detect = None      # frame at detection resolution (same array as `frame` at scale 1)
+        self.scale = 1.0        # detection size / display size
+        self.roi = None         # (x, y) of the searched window in `detect` pixels, None for the full frame
+        self.frame_detect_shape = None  # (h, w) of the uncropped detection frame when `roi` is set
+        self.hsv = None
+        self.blurred = None
+        self.mask = None
+        self.bits = None        # per-pixel HSV range bits (hsv_lut), `colors` ranges
+        self.colors = 1
+        self.contours = ()
+        self.blobs = Blobs.empty()
+        self.elapsed = 0.0      # seconds the pipeline spent on this frame
+        self.done = False       # set by a stage that already produced `blobs`; ends the pass
+
+    def buffer(self, name, shape, dtype=np.uint8):
+        """Pooled output buffer for a stage, or None to let OpenCV allocate."""
+        if self.pool is None:
+            return None
+        return self.pool.get(name, shape, dtype)
+
+    def to_display(self, points):
+        """Detection pixel coordinates (..., 2) to display pixels, as float."""
+        if self.roi is not None:
+            points = points + self.roi
+        if self.scale != 1.0:
+            points = points * (1.0 / self.scale)
+        return points
+
+    def full_mask(self):
+        """Mask over the whole detection frame, for display (ROI pasted into black)."""
+        if self.roi is None:
+            return self.mask
+        full = self.buffer('full_mask', self.frame_detect_shape)
+        if full is None:
+            full = np.empty(self.frame_detect_shape, np.uint8)
+        full.fill(0)
+        x, y = self.roi
+        h, w = self.mask.shape
+        full[y:y + h, x:x + w] = self.mask
+        return full
+
+
+class Resize:
+    """Display-size frame plus, below scale 1, a smaller frame for detection.
+
+    Later stages segment `ctx.detect`, scale their kernels by `ctx.scale`
+    and map their results back to display coordinates, so areas and
+    thresholds in the scripts stay in display pixels whatever the scale.
+    """
+    name = 'resize'
+
+    def __init__(self, width, height, scale=1.0):
+        self.size = (width, height)
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        self.scale = float(scale)
+        self.detect_size = (max(1, int(round(self.size[0] * self.scale))),
+                            max(1, int(round(self.size[1] * self.scale))))
+
+    def configure(self, values):
+        if values.get('detect_scale', self.scale) != self.scale:
+            self.set_scale(values['detect_scale'])
+
+    def __call__(self, ctx):
+        channels = ctx.image.shape[2:]
+        shape = (self.size[1], self.size[0]) + channels
+        ctx.frame = cv2.resize(ctx.image, self.size, dst=ctx.buffer('frame', shape, ctx.image.dtype))
+        ctx.scale = self.detect_size[0] / self.size[0]
+        if self.detect_size == self.size:
+            ctx.detect = ctx.frame
+        else:
+            shape = (self.detect_size[1], self.detect_size[0]) + channels
+            # INTER_AREA averages the dropped pixels instead of skipping them
+            ctx.detect = cv2.resize(ctx.image, self.detect_size, interpolation=cv2.INTER_AREA,
+                                    dst=ctx.buffer('detect', shape, ctx.image.dtype))
+
+
+class Crop:
+    """Restrict detection to a window of the frame (roi.RoiTracker picks it).
+
+    `window` is (x, y, w, h) in display pixels, or None for the whole
+    frame. The crop is a view of `ctx.detect`, so nothing is copied; later
+    stages only process the window and blob coordinates get the offset back.
+    """
+    name = 'roi'
+
+    def __init__(self):
+        self.window = None
+
+    def set_window(self, window):
+        self.window = window
+
+    def __call__(self, ctx):
+        if self.window is None:
+            return
+        height, width = ctx.detect.shape[:2]
+        x, y, w, h = self.window
+        x0 = min(max(int(x * ctx.scale), 0), width - 1)
+        y0 = min(max(int(y * ctx.scale), 0), height - 1)
+        x1 = min(max(int(np.ceil((x + w) * ctx.scale)), x0 + 1), width)
+        y1 = min(max(int(np.ceil((y + h) * ctx.scale)), y0 + 1), height)
+        if (x0, y0, x1, y1) == (0, 0, width, height):
+            return
+        ctx.frame_detect_shape = (height, width)
+        ctx.roi = np.array((x0, y0))
+        ctx.detect = ctx.detect[y0:y1, x0:x1]
+
+
+class ConvertColor:
+    """Single direct conversion from the camera's channel order to HSV."""
+    name = 'convert'
+
+    def __init__(self, code=DRONE_TO_HSV):
+        self.code = code
+
+    def __call__(self, ctx):
+        ctx.hsv = cv2.cvtColor(ctx.detect, self.code, dst=ctx.buffer('hsv', ctx.detect.shape))
+
+
+class GaussianBlur:
+    name = 'blur'
+
+    def __init__(self, ksize=15):
+        self.ksize = ksize
+
+    def configure(self, values):
+        # GaussianBlur needs an odd kernel
+        self.ksize = int(values.get('blur', self.ksize)) | 1
+
+    def __call__(self, ctx):
+        ksize = scaled_ksize(self.ksize, ctx.scale)
+        ctx.blurred = cv2.GaussianBlur(ctx.hsv, (ksize, ksize), 0,
+                                       dst=ctx.buffer('blurred', ctx.hsv.shape))
+
+
+class HsvThreshold:
+    name = 'threshold'
+
+    def __init__(self, lower, upper):
+        self.range = None
+        self.set_range(lower, upper)
+
+    def set_range(self, lower, upper):
+        hsv_range = (tuple(lower), tuple(upper))
+        if hsv_range == self.range:
+            return
+        self.range = hsv_range
+        self.lower = np.array(lower)
+        self.upper = np.array(upper)
+
+    def configure(self, values):
+        if has_hsv_range(values):
+            self.set_range(*hsv_range(values))
+
+    def __call__(self, ctx):
+        ctx.mask = cv2.inRange(ctx.blurred, self.lower, self.upper,
+                               dst=ctx.buffer('mask', ctx.blurred.shape[:2]))
+
+
+class Morphology:
+    name = 'morphology'
+
+    def __init__(self, erode=2, dilate=2, ksize=3):
+        self.erode = erode
+        self.dilate = dilate
+        self.ksize = None
+        self.set_kernel(ksize)
+
+    def set_kernel(self, ksize):
+        if ksize != self.ksize:
+            self.ksize = ksize
+            self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize))
+
+    def configure(self, values):
+        self.erode = int(values.get('erode', self.erode))
+        self.dilate = int(values.get('dilate', self.dilate))
+        self.set_kernel(int(values.get('morph_kernel', self.ksize)))
+
+    def __call__(self, ctx):
+        # ping-pong between two buffers so no stage runs in place
+        eroded = cv2.erode(ctx.mask, self.kernel, dst=ctx.buffer('eroded', ctx.mask.shape),
+                           iterations=scaled_iterations(self.erode, ctx.scale))
+        ctx.mask = cv2.dilate(eroded, self.kernel, dst=ctx.buffer('mask', ctx.mask.shape),
+                              iterations=scaled_iterations(self.dilate, ctx.scale))
+
+
+class FindContours:
+    """Outline-based alternative to blobs.BlobStats (fills `ctx.contours`)."""
+    name = 'blobs'
+
+    def __init__(self, method=cv2.CHAIN_APPROX_SIMPLE):
+        self.method = method
+
+    def __call__(self, ctx):
+        contours, _ = cv2.findContours(ctx.mask, cv2.RETR_EXTERNAL, self.method)
+        if ctx.scale != 1.0 or ctx.roi is not None:
+            # back to display coordinates
+            contours = [ctx.to_display(c).astype(np.int32) for c in contours]
+        ctx.contours = contours
+
+
+class Pipeline:
+    """Ordered list of stages, each reading and writing a VisionContext.
+
+    Stages are looked up by name (`pipeline['threshold']`) so scripts can
+    retune them between frames or swap one out with `replace()`. A stage
+    that sets `ctx.done` skips the rest of the pass.
+
+    Given a BufferPool, every intermediate image is written into a reused
+    buffer; `steady_allocations` counts pool allocations after the first
+    frame and should stay at 0. The small per-blob statistics arrays are
+    still allocated by OpenCV on every frame.
+    """
+
+    def __init__(self, stages, pool=None):
+        self.stages = list(stages)
+        self.pool = pool
+        self.frames = 0
+        self.steady_allocations = 0
+        self.params_version = None
+
+    def __getitem__(self, name):
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def replace(self, name, stage):
+        self.stages[self.stages.index(self[name])] = stage
+
+    def sync(self, params):
+        """Push a ParamStore into the stages, only when its version changed.
+
+        Stages with a `configure(values)` method pick the keys they use
+        (HSV range, detect_scale, blur, erode/dilate, morph_kernel) and rebuild their
+        tables/kernels from them.
+        """
+        if params.version == self.params_version:
+            return False
+        self.params_version = params.version
+        values = params.values
+        for stage in self.stages:
+            configure = getattr(stage, 'configure', None)
+            if configure is not None:
+                configure(values)
+        return True
+
+    def preallocate(self, shape, params=None, dtype=np.uint8, scales=()):
+        """Allocate every pooled buffer up front with a blank input of `shape`.
+
+        Pass the ParamStore so buffers are sized for its detect_scale, and
+        `scales` for any other detection scale the pipeline may be switched
+        to later (e.g. governor.QUALITY_SCALES); below scale 1 the 'detect'
+        buffer only exists once a pass has run there.
+        """
+        if params is not None:
+            self.sync(params)
+        image = np.zeros(shape, dtype)
+        resize = self['resize']
+        current = resize.scale
+        for scale in scales:
+            resize.set_scale(scale)
+            self.run(image)
+        resize.set_scale(current)
+        self.run(image)
+        # these passes are the warm-up, not the steady state
+        self.steady_allocations = 0
+        return self
+
+    def run(self, image, upto=None):
+        """Run the stages on `image`; `upto` stops after the named stage (e.g. 'resize')."""
+        start = time.perf_counter()
+        before = self.pool.allocations if self.pool is not None else 0
+        ctx = VisionContext(image, self.pool)
+        for stage in self.stages:
+            stage(ctx)
+            if ctx.done or stage.name == upto:
+                break
+        if self.pool is not None and self.frames > 0:
+            self.steady_allocations += self.pool.allocations - before
+        self.frames += 1
+        ctx.elapsed = time.perf_counter() - start
+        return ctx
+
+
+def make_pipeline(width, height, lower, upper, conversion=DRONE_TO_HSV,
+                  blur=15, erode=2, dilate=2, pool=None, scale=1.0, engine=None, direct=False,
+                  blobs='largest'):
+    """The HSV colour segmentation shared by ctest.py and the flight scripts.
+
+    Thresholding (hsv_lut.LutThreshold) accepts an H Min above H Max for
+    hues that wrap past 179, e.g. red targets. `direct` maps camera pixels
+    straight to the mask through one 16 MB table (hsv_lut.DirectLutThreshold)
+    instead of converting and blurring; the HSV image is then only built
+    for the engine's histogram.
+    `scale` (e.g. 0.5 or 0.25) runs segmentation on a smaller frame; blur
+    and morphology shrink with it and blobs come back in display pixels.
+    The 'roi' stage searches the whole frame until given a window.
+    `blobs='largest'` keeps only the largest outline (blobs.LargestContour),
+    all a single-target script needs; `blobs='all'` labels every blob with
+    its statistics as arrays in one call (blobs.BlobStats).
+
+    `engine` (a camshift.CamShiftEngine) tracks by histogram back-projection
+    once locked; the threshold stages then only run to (re)acquire the target.
+    """
+    if direct:
+        segment = [DirectLutThreshold(lower, upper, code=conversion)]
+        if engine is not None:
+            segment.insert(0, ConvertColor(conversion))
+    else:
+        segment = [ConvertColor(conversion), GaussianBlur(blur), LutThreshold(lower, upper)]
+    stages = [
+        Resize(width, height, scale),
+        Crop(),
+        *segment,
+        Morphology(erode, dilate),
+        BlobStats() if blobs == 'all' else LargestContour(),
+    ]
+    if engine is not None:
+        stages.insert(2, engine)
+        stages.append(engine.learner())
+    return Pipeline(stages, pool)